@@ -2,10 +2,8 @@
 
 echo "Waiting for postgres..."
 
-while ! nc -z components-db 5442; do
-  sleep 0.1
-done
+python manage.py wait-db || exit 1
 
 echo "PostgreSQL started"
 
-gunicorn -b 0.0.0.0:5000 manage:app
+gunicorn -c gunicorn.conf.py wsgi:app
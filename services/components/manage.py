@@ -1,36 +1,47 @@
 # services/components/manage.py
 
 
+import json
+import subprocess
+import sys
+import time
 import unittest
+
+import click
 import coverage
 
 from flask.cli import FlaskGroup
+from sqlalchemy import exc
 
 from project import create_app, db
-from project.api.models import Component
-
-COV = coverage.coverage(
-    branch=True,
-    include='project/*',
-    omit=[
-        'project/tests/*',
-        'project/config.py',
-    ]
-)
-COV.start()
-
+from project import seed
+from project.api.bulk import copy_rows, deferred_indexes
+from project.api.models import Component, components_version
+from project.api.upsert import create_unique_index
+from project.api.versioning import bump_version, create_version
+from project.health import wait_for_db
+from project.importing import CheckpointMismatch, guess_format, import_file
+
+COV_INCLUDE = 'project/*'
+COV_OMIT = ['project/tests/*', 'project/config.py']
+COV = coverage.coverage(branch=True, include=COV_INCLUDE, omit=COV_OMIT)
+
+# the CLI's app; gunicorn serves wsgi:app, which skips this module
 app = create_app()
-cli = FlaskGroup(create_app=create_app)
+cli = FlaskGroup(create_app=lambda script_info=None: app)
 
 
 @cli.command()
 def cov():
     """Runs the unit tests with coverage."""
-    tests = unittest.TestLoader().discover('project/tests')
-    result = unittest.TextTestRunner(verbosity=2).run(tests)
-    if result.wasSuccessful():
-        COV.stop()
-        COV.save()
+    # trace a separate test process from its first import on, rather than
+    # every process that imports this module
+    status = subprocess.call([
+        sys.executable, '-m', 'coverage', 'run', '--branch',
+        f'--include={COV_INCLUDE}', f'--omit={",".join(COV_OMIT)}',
+        '-m', 'unittest', 'discover', '-v', '-s', 'project/tests'])
+    if status == 0:
+        COV.load()
         print('Coverage Summary:')
         COV.report()
         COV.html_report()
@@ -39,6 +50,23 @@ def cov():
     return 1
 
 
+@cli.command()
+@click.option('--timeout', default=60.0, show_default=True,
+              help='Seconds to keep retrying before giving up.')
+def wait_db(timeout):
+    """Waits until the database accepts queries, backing off
+    exponentially between attempts."""
+    try:
+        attempts = wait_for_db(
+            app.config['SQLALCHEMY_DATABASE_URI'], timeout,
+            connect_timeout=app.config['HEALTH_CHECK_TIMEOUT'],
+            log=click.echo)
+    except TimeoutError as e:
+        click.echo(str(e), err=True)
+        sys.exit(1)
+    click.echo(f'database ready after {attempts} attempt(s)')
+
+
 @cli.command()
 def recreate_db():
     db.drop_all()
@@ -47,8 +75,32 @@ def recreate_db():
 
 
 @cli.command()
-def test():
+def create_indexes():
+    """Adds the table_versions table and the unique index on components.name
+    to a database created before they were declared, after checking for
+    duplicate name values."""
+    create_version()
+    duplicates = create_unique_index(Component, 'name')
+    db.session.commit()
+    click.echo('version table table_versions is in place')
+    if duplicates:
+        click.echo(f'{len(duplicates)} name values occur more than once, '
+                   f'resolve them first: {", ".join(duplicates[:10])}',
+                   err=True)
+        sys.exit(1)
+    click.echo('unique index on components.name is in place')
+
+
+@cli.command()
+@click.option('--parallel', default=1, show_default=True,
+              help='Test processes, each with its own database.')
+def test(parallel):
     """ Runs the tests without code coverage"""
+    if parallel > 1:
+        from project.tests import parallel as runner
+        if not runner.run(parallel):
+            sys.exit(1)
+        return 0
     tests = unittest.TestLoader().discover('project/tests', pattern='test*.py')
     result = unittest.TextTestRunner(verbosity=2).run(tests)
     if result.wasSuccessful():
@@ -57,12 +109,121 @@ def test():
 
 
 @cli.command()
-def seed_db():
+@click.option('--count', type=int,
+              help='Generate this many rows instead of the two samples; '
+                   'run recreate-db first.')
+@click.option('--batch', default=10000, show_default=True,
+              help='Rows per COPY statement.')
+@click.option('--seed', 'seed_', default=0, show_default=True,
+              help='Random seed; the same seed generates the same rows.')
+def seed_db(count, batch, seed_):
     """Seeds the database."""
+    if count is not None:
+        start = time.perf_counter()
+        try:
+            with deferred_indexes('components'):
+                copied = copy_rows('components', seed.COLUMNS,
+                                   seed.generate(count, seed_), batch)
+            bump_version(components_version)
+            db.session.commit()
+        except exc.IntegrityError as e:
+            db.session.rollback()
+            click.echo(f'seeding failed, run recreate-db first: '
+                       f'{str(e).splitlines()[0]}', err=True)
+            sys.exit(1)
+        elapsed = time.perf_counter() - start
+        click.echo(f'{copied} components in {elapsed:.2f} s '
+                   f'({copied / elapsed:.0f} rows/s)')
+        return
     db.session.add(Component(name='aws', description="Amazon Web Services"))
     db.session.add(Component(name='Azure', description="Microsoft Azure"))
+    bump_version(components_version)
     db.session.commit()
 
 
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format_', type=click.Choice(['csv', 'ndjson']),
+              help='Input format [default: from the file extension]')
+@click.option('--batch', default=10000, show_default=True,
+              help='Records per COPY and merge.')
+@click.option('--update', is_flag=True,
+              help='Overwrite the description of components whose name '
+                   'exists, rather than skipping them.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Progress file to resume from [default: PATH.checkpoint]')
+@click.option('--restart', is_flag=True,
+              help='Ignore the checkpoint and start from the first record.')
+def import_data(path, format_, batch, update, checkpoint, restart):
+    """Imports components from a CSV or NDJSON file, merging on name.
+
+    Each record needs a name and a description.  An interrupted import
+    resumes from its checkpoint when run again.  Exits non-zero if any
+    record was invalid.
+    """
+    format_ = format_ or guess_format(path)
+    if format_ is None:
+        raise click.BadParameter(
+            'cannot tell the format from the file extension',
+            param_hint='--format')
+    try:
+        counts = import_file(
+            path, format_, Component, ('name', 'description'), 'name',
+            components_version, batch, update=update,
+            checkpoint=checkpoint or f'{path}.checkpoint', restart=restart,
+            log=click.echo, reject=lambda error: click.echo(error, err=True))
+    except CheckpointMismatch as e:
+        click.echo(f'{e}; pass --restart to start over', err=True)
+        sys.exit(1)
+    if counts['invalid']:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--rows', default=10000, show_default=True,
+              help='Rows to seed before the run.')
+@click.option('--endpoints', default='ping,single,list,post',
+              show_default=True, help='Comma-separated endpoints to load.')
+@click.option('--concurrency', default=16, show_default=True,
+              help='Concurrent keep-alive clients.')
+@click.option('--duration', default=10.0, show_default=True,
+              help='Seconds to load each endpoint for.')
+@click.option('--warmup', default=1.0, show_default=True,
+              help='Unmeasured seconds before each endpoint.')
+@click.option('--workers', type=int,
+              help='gunicorn workers [default: from gunicorn.conf.py]')
+@click.option('--config', default='project.config.TestingConfig',
+              show_default=True,
+              help='Config object; its database is dropped and reseeded.')
+@click.option('--output', type=click.File('w'), default='-',
+              help='File to write the JSON report to.')
+@click.option('--baseline', type=click.File(),
+              help='Earlier report to compare against.')
+@click.option('--tolerance', default=0.2, show_default=True,
+              help='Allowed fractional drop in rps or rise in p99.')
+def bench(rows, endpoints, concurrency, duration, warmup, workers, config,
+          output, baseline, tolerance):
+    """Load-tests the service under gunicorn and reports RPS and latency
+    percentiles as JSON."""
+    from project.tests.bench import load
+    endpoints = endpoints.split(',')
+    for endpoint in endpoints:
+        if endpoint not in load.ENDPOINTS:
+            raise click.BadParameter(
+                f'{endpoint} is not one of {", ".join(load.ENDPOINTS)}',
+                param_hint='--endpoints')
+    report = load.run(
+        app, Component, components_version, 'components', rows, endpoints,
+        concurrency, duration, warmup, workers, config)
+    json.dump(report, output, indent=2)
+    output.write('\n')
+    if baseline is not None:
+        regressions = load.compare(report, json.load(baseline), tolerance)
+        for regression in regressions:
+            click.echo(f'regression: {regression}', err=True)
+        if regressions:
+            sys.exit(1)
+
+
 if __name__ == '__main__':
     cli()
@@ -2,26 +2,64 @@
 
 
 from sqlalchemy import exc
-from flask import Blueprint, jsonify, request, render_template
+from flask import (Blueprint, Markup, abort, current_app, g, redirect,
+                   render_template, request, url_for)
 
-from project.api.models import Component
-from project import db
+from project.api.models import Component, components_version
+from project.api.bulk import bulk_insert
+from project.api.fields import get_fields, select_columns
+from project.api.lookup import get_ids, lookup
+from project.api.pagination import get_page_args, paginate
+from project.api.streaming import ndjson_response
+from project.api.upsert import insert_new
+from project.api.versioning import (bump_version, conditional,
+                                    current_version)
+from project.replicas import replica_reads
+from project.serializers import ROWS, jsonify, jsonify_rows
+from project import db, cache, db_probe
 
 
+INVALID_FIELDS = {
+    'status': 'fail',
+    'message': 'Invalid fields parameter.'
+}
+INVALID_IDS = {
+    'status': 'fail',
+    'message': 'Invalid ids parameter.'
+}
+
 components_blueprint = Blueprint('components',
                                  __name__,
                                  template_folder='./templates')
 
 
 @components_blueprint.route('/', methods=['GET', 'POST'])
+@replica_reads
 def index():
     if request.method == 'POST':
         name = request.form['name']
         description = request.form['description']
-        db.session.add(Component(name=name, description=description))
+        row = {'name': name, 'description': description}
+        insert_new(Component, 'name', [row])
+        bump_version(components_version)
         db.session.commit()
-    components = Component.query.all()
-    return render_template('index.html', components=components)
+        cache.clear()
+        return redirect(url_for('components.index'))
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        abort(400)
+    # keyed on the table version too, so other workers' copies go stale
+    # with the first write anywhere
+    key = ('index', limit, after, current_version(components_version))
+    listing = cache.get(key)
+    if listing is None:
+        query = db.session.query(Component.id, Component.name)
+        components, next_id = paginate(query, Component.id, limit, after)
+        listing = Markup(render_template(
+            'listing.html', components=components, next_id=next_id))
+        cache.set(key, listing)
+    return render_template('index.html', listing=listing)
 
 
 @components_blueprint.route('/components/ping', methods=['GET'])
@@ -32,6 +70,32 @@ def ping_pong():
     })
 
 
+@components_blueprint.route('/components/health/live', methods=['GET'])
+def health_live():
+    """The worker is up and serving requests"""
+    return jsonify({
+        'status': 'success',
+        'message': 'alive'
+    })
+
+
+@components_blueprint.route('/components/health/ready', methods=['GET'])
+def health_ready():
+    """The database answers queries; the probe is cached per worker for
+    HEALTH_CHECK_INTERVAL seconds"""
+    database = db_probe.check()
+    if not database['ok']:
+        return jsonify({
+            'status': 'fail',
+            'message': 'Database unavailable.',
+            'data': {'database': database}
+        }), 503
+    return jsonify({
+        'status': 'success',
+        'data': {'database': database}
+    })
+
+
 @components_blueprint.route('/components', methods=['POST'])
 def add_component():
     post_data = request.get_json()
@@ -44,22 +108,75 @@ def add_component():
     name = post_data.get('name')
     description = post_data.get('description')
     try:
-        component = Component.query.filter_by(name=name).first()
-        if not component:
-            db.session.add(Component(name=name, description=description))
+        row = {'name': name, 'description': description}
+        if insert_new(Component, 'name', [row]):
+            bump_version(components_version)
             db.session.commit()
+            cache.clear()
             response_object['status'] = 'success'
             response_object['message'] = f'{name} was added!'
             return jsonify(response_object), 201
         else:
             response_object['message'] = 'Sorry. Component already exists.'
             return jsonify(response_object), 400
-    except exc.IntegrityError as e:
+    except exc.IntegrityError:
         db.session.rollback()
         return jsonify(response_object), 400
 
 
+@components_blueprint.route('/components/bulk', methods=['POST'])
+def add_components_bulk():
+    """Add a list of components in one transaction"""
+    post_data = request.get_json()
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid payload.'
+    }
+    if (not isinstance(post_data, list) or not post_data or
+            len(post_data) > current_app.config['BULK_MAX_ITEMS']):
+        return jsonify(response_object), 400
+    try:
+        added, results = bulk_insert(
+            Component, ('name', 'description'), 'name',
+            'Sorry. Component already exists.', post_data)
+        if added:
+            bump_version(components_version)
+        db.session.commit()
+    except exc.IntegrityError:
+        db.session.rollback()
+        return jsonify(response_object), 400
+    if added:
+        cache.clear()
+    response_object['message'] = (
+        f'{added} of {len(results)} components were added.')
+    response_object['data'] = {'results': results}
+    if not added:
+        return jsonify(response_object), 400
+    response_object['status'] = 'success'
+    return jsonify(response_object), 201
+
+
+@components_blueprint.route('/components/_cache', methods=['GET'])
+def component_cache_stats():
+    """Report this worker's read-through cache counters"""
+    return jsonify({
+        'status': 'success',
+        'data': cache.stats()
+    })
+
+
+@components_blueprint.route('/components/_pool', methods=['GET'])
+def component_pool_stats():
+    """Report this worker's database connection pool statistics"""
+    return jsonify({
+        'status': 'success',
+        'data': db.engine.pool.to_json()
+    })
+
+
 @components_blueprint.route('/components/<component_id>', methods=['GET'])
+@replica_reads
+@conditional(components_version)
 def get_single_component(component_id):
     """Get single component details"""
     response_object = {
@@ -67,30 +184,78 @@ def get_single_component(component_id):
         'message': 'Component does not exist'
     }
     try:
-        component = Component.query.filter_by(id=int(component_id)).first()
-        if not component:
-            return jsonify(response_object), 404
-        else:
-            response_object = {
-                'status': 'success',
-                'data': {
-                    'id': component.id,
-                    'name': component.name,
-                    'description': component.description
-                }
-            }
-            return jsonify(response_object), 200
+        columns = get_fields(Component)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    keys = tuple(column.key for column in columns)
+    try:
+        key = ('component', int(component_id), keys, g.version)
+        data = cache.get(key)
+        if data is None:
+            row = select_columns(Component, columns).filter(
+                Component.id == int(component_id)).first()
+            if not row:
+                return jsonify(response_object), 404
+            data = dict(zip(keys, row))
+            cache.set(key, data)
+        response_object = {
+            'status': 'success',
+            'data': data
+        }
+        return jsonify(response_object), 200
     except ValueError:
         return jsonify(response_object), 404
 
 
 @components_blueprint.route('/components', methods=['GET'])
+@replica_reads
+@conditional(components_version)
 def get_all_components():
-    """Get all components"""
+    """Get one page of components, or the components listed in ?ids="""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid pagination parameters.'
+    }
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        return jsonify(response_object), 400
+    try:
+        columns = get_fields(Component)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    try:
+        ids = get_ids()
+    except ValueError:
+        return jsonify(INVALID_IDS), 400
+    if ids is not None:
+        components, missing = lookup(Component, columns, ids)
+        response_object = {
+            'status': 'success',
+            'data': {
+                'components': ROWS,
+                'missing': missing
+            }
+        }
+        return jsonify_rows(response_object, components, columns), 200
+    query = select_columns(Component, columns)
+    components, next_id = paginate(query, Component.id, limit, after)
     response_object = {
         'status': 'success',
         'data': {
-            'components': [component.to_json() for component in Component.query.all()]
+            'components': ROWS,
+            'next': next_id
         }
     }
-    return jsonify(response_object), 200
+    return jsonify_rows(response_object, components, columns), 200
+
+
+@components_blueprint.route('/components/export', methods=['GET'])
+def export_components():
+    """Stream every component as newline-delimited JSON"""
+    try:
+        columns = get_fields(Component)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    query = select_columns(Component, columns).order_by(Component.id)
+    return ndjson_response(query, columns)
@@ -0,0 +1,35 @@
+# services/components/project/api/fields.py
+
+
+from flask import request
+
+from project import db
+
+
+def get_fields(model):
+    """Parse the ?fields=a,b sparse fieldset into columns of `model`.
+
+    Without the argument every column in model.json_keys is returned.  The
+    columns keep json_keys order whatever order they were asked for in.
+    Raises ValueError for an empty fieldset or a name outside json_keys.
+    """
+    fields = request.args.get('fields')
+    if fields is None:
+        return [model.__table__.c[key] for key in model.json_keys]
+    keys = fields.split(',')
+    for key in keys:
+        if key not in model.json_keys:
+            raise ValueError(f'unknown field: {key!r}')
+    return [model.__table__.c[key] for key in model.json_keys if key in keys]
+
+
+def select_columns(model, columns):
+    """A column-only query for `columns`, without loading model instances.
+
+    The primary key is appended when it is not asked for, since pagination
+    needs it as the cursor; encoders built for `columns` ignore it.
+    """
+    query = db.session.query(*columns)
+    if 'id' not in [column.key for column in columns]:
+        query = query.add_columns(model.id)
+    return query
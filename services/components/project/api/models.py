@@ -5,12 +5,27 @@ from sqlalchemy.sql import func
 from project import db
 
 
+class TableVersion(db.Model):
+    """The version of each table, bumped by every transaction that writes
+    to it; see project.api.versioning"""
+
+    __tablename__ = "table_versions"
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+
+
+# the TableVersion row of the components table
+components_version = 'components'
+
+
 class Component(db.Model):
 
     __tablename__ = "components"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String(128), nullable=False)
+    name = db.Column(
+        db.String(128), nullable=False, unique=True, index=True)
     description = db.Column(db.String(256), nullable=False)
     created_date = db.Column(db.DateTime, default=func.now(), nullable=False)
 
@@ -18,6 +33,9 @@ class Component(db.Model):
         self.name = name
         self.description = description
 
+    # the columns to_json() exposes
+    json_keys = ('id', 'name', 'description')
+
     def to_json(self):
         return {
             'id': self.id,
@@ -0,0 +1,30 @@
+# services/components/project/api/streaming.py
+
+
+from flask import Response, current_app, stream_with_context
+
+from project.serializers import row_encoder
+
+
+def ndjson_response(query, columns):
+    """Stream `query`, tuples of `columns`, as newline-delimited JSON.
+
+    Rows are read from a server-side cursor EXPORT_BATCH_SIZE at a time and
+    each batch is flushed as one chunk, so memory stays flat however many
+    rows there are.
+    """
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    encode = row_encoder(columns, current_app.json_provider.ensure_ascii)
+
+    def generate():
+        lines = []
+        for row in query.yield_per(batch_size):
+            lines.append(encode(row))
+            if len(lines) == batch_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
@@ -0,0 +1,73 @@
+# services/components/project/api/versioning.py
+
+
+import functools
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from project import db
+from project.api.models import TableVersion
+
+
+def current_version(name):
+    """Return the version of table `name`, 0 if it was never written.
+
+    This reads through the session like the view's own queries, so a view
+    reading from a replica reads the version there too.  Read it before
+    the rows: the version is bumped in the same transaction as the write,
+    so rows read afterwards are at least as new as the version.
+    """
+    table = TableVersion.__table__
+    version = db.session.execute(
+        select([table.c.version]).where(table.c.name == name)).scalar()
+    return version or 0
+
+
+def create_version():
+    """Create the table_versions table if the database lacks it.
+
+    create_all only creates it with a fresh schema; without it every read
+    and write of the versioned tables fails.
+    """
+    TableVersion.__table__.create(db.session.connection(), checkfirst=True)
+
+
+def bump_version(name):
+    """Advance the version of table `name` within the write's transaction.
+
+    Call it before committing the write, so readers see the new version
+    and the new rows together.  The row stays locked until the commit,
+    which orders concurrent writers to the table.
+    """
+    table = TableVersion.__table__
+    statement = insert(table).values(name=name, version=1)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'version': table.c.version + 1}))
+
+
+def conditional(name):
+    """Tag 200 responses with the table version as a weak ETag and answer a
+    matching If-None-Match with 304 before the view runs.
+
+    The view finds the version in `g.version`, to key what it caches on;
+    another process may have changed the table without clearing this
+    worker's cache.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.version = current_version(name)
+            etag = f'{name}-{g.version}'
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,213 @@
+# services/components/project/asgi.py
+
+
+import os
+from urllib.parse import parse_qsl
+
+import asyncpg
+from flask.helpers import get_debug_flag
+from werkzeug.utils import import_string
+
+
+RESOURCE = 'components'
+COLUMNS = ('id', 'name', 'description')
+NOT_FOUND = 'Component does not exist'
+# ids are bound as bigint; ids outside it cannot match any row, and
+# ?ids= outside it are rejected like the Flask app rejects them
+BIGINT_MIN, BIGINT_MAX = -2 ** 63, 2 ** 63 - 1
+INVALID_FIELDS = {
+    'status': 'fail',
+    'message': 'Invalid fields parameter.'
+}
+INVALID_IDS = {
+    'status': 'fail',
+    'message': 'Invalid ids parameter.'
+}
+
+
+class AsyncApp:
+    """ASGI twin of the Flask app for the read routes.
+
+    Serves /<resource>, /<resource>/<id> and /<resource>/ping from an
+    asyncpg pool with the same response bodies as the Flask views, so a
+    proxy can send read traffic to either one.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.pool = None
+        self.json_provider = import_string(config.JSON_PROVIDER)()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        status, body = await self.dispatch(scope)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        self.pool = await asyncpg.create_pool(
+            self.config.SQLALCHEMY_DATABASE_URI,
+            min_size=1,
+            max_size=(self.config.SQLALCHEMY_POOL_SIZE +
+                      self.config.SQLALCHEMY_MAX_OVERFLOW))
+
+    async def shutdown(self):
+        await self.pool.close()
+
+    def dumps(self, data):
+        """Encode `data` exactly as jsonify would for the same settings."""
+        return self.json_provider.dumps(data, get_debug_flag()).encode()
+
+    async def dispatch(self, scope):
+        parts = scope['path'].split('/')
+        if len(parts) not in (2, 3) or parts[1] != RESOURCE:
+            return 404, self.dumps({'status': 'fail', 'message': 'Not found'})
+        if scope['method'] != 'GET':
+            return 405, self.dumps({
+                'status': 'fail', 'message': 'Method not allowed'})
+        args = {}
+        query = scope['query_string'].decode()
+        for key, value in parse_qsl(query, keep_blank_values=True):
+            args.setdefault(key, value)
+        if len(parts) == 2:
+            return await self.get_all(args)
+        if parts[2] == 'ping':
+            return 200, self.dumps({'status': 'success', 'message': 'pong!'})
+        return await self.get_single(parts[2], args)
+
+    @staticmethod
+    def get_fields(args):
+        """Validate ?fields= like project.api.fields.get_fields."""
+        fields = args.get('fields')
+        if fields is None:
+            return COLUMNS
+        keys = fields.split(',')
+        for key in keys:
+            if key not in COLUMNS:
+                raise ValueError(f'unknown field: {key!r}')
+        return tuple(key for key in COLUMNS if key in keys)
+
+    def get_ids(self, args):
+        """Validate ?ids= like project.api.lookup.get_ids."""
+        ids = args.get('ids')
+        if ids is None:
+            return None
+        ids = list(dict.fromkeys(int(id_) for id_ in ids.split(',')))
+        if len(ids) > self.config.LOOKUP_MAX_IDS:
+            raise ValueError(f'too many ids: {len(ids)}')
+        for id_ in ids:
+            if not BIGINT_MIN <= id_ <= BIGINT_MAX:
+                raise ValueError(f'id out of range: {id_}')
+        return ids
+
+    @staticmethod
+    def select(columns):
+        # the names are validated against COLUMNS; id is always read as
+        # the pagination cursor
+        names = columns if 'id' in columns else columns + ('id',)
+        return f'SELECT {", ".join(names)} FROM {RESOURCE}'
+
+    async def get_single(self, resource_id, args):
+        try:
+            columns = self.get_fields(args)
+        except ValueError:
+            return 400, self.dumps(INVALID_FIELDS)
+        response_object = {
+            'status': 'fail',
+            'message': NOT_FOUND
+        }
+        try:
+            resource_id = int(resource_id)
+        except ValueError:
+            return 404, self.dumps(response_object)
+        row = None
+        if BIGINT_MIN <= resource_id <= BIGINT_MAX:
+            # asyncpg would infer int4 from the column and reject larger ids
+            row = await self.pool.fetchrow(
+                f'{self.select(columns)} WHERE id = $1::bigint', resource_id)
+        if row is None:
+            return 404, self.dumps(response_object)
+        return 200, self.dumps({
+            'status': 'success',
+            'data': {key: row[key] for key in columns}
+        })
+
+    async def get_all(self, args):
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid pagination parameters.'
+        }
+        try:
+            limit = int(args.get('limit', self.config.PAGE_SIZE))
+            if not 0 < limit <= self.config.MAX_PAGE_SIZE:
+                raise ValueError(f'limit out of range: {limit}')
+            after = args.get('after')
+            if after is not None:
+                after = int(after)
+        except ValueError:
+            return 400, self.dumps(response_object)
+        try:
+            columns = self.get_fields(args)
+        except ValueError:
+            return 400, self.dumps(INVALID_FIELDS)
+        try:
+            ids = self.get_ids(args)
+        except ValueError:
+            return 400, self.dumps(INVALID_IDS)
+        if ids is not None:
+            return await self.lookup(columns, ids)
+        if after is None:
+            rows = await self.pool.fetch(
+                f'{self.select(columns)} ORDER BY id LIMIT $1', limit + 1)
+        else:
+            # clamped into bigint, which leaves the comparison unchanged
+            after = min(max(after, BIGINT_MIN), BIGINT_MAX)
+            rows = await self.pool.fetch(
+                f'{self.select(columns)} WHERE id > $2::bigint '
+                f'ORDER BY id LIMIT $1', limit + 1, after)
+        next_id = rows[limit - 1]['id'] if len(rows) > limit else None
+        return 200, self.dumps({
+            'status': 'success',
+            'data': {
+                RESOURCE: [{key: row[key] for key in columns}
+                           for row in rows[:limit]],
+                'next': next_id
+            }
+        })
+
+    async def lookup(self, columns, ids):
+        rows = await self.pool.fetch(
+            f'{self.select(columns)} WHERE id = ANY($1::bigint[])', ids)
+        found = {row['id']: row for row in rows}
+        return 200, self.dumps({
+            'status': 'success',
+            'data': {
+                RESOURCE: [{key: found[id_][key] for key in columns}
+                           for id_ in ids if id_ in found],
+                'missing': [id_ for id_ in ids if id_ not in found]
+            }
+        })
+
+
+def create_asgi_app(config=None):
+    """Build the asyncio app from the same config objects as create_app."""
+    return AsyncApp(import_string(config or os.getenv('APP_SETTINGS')))
@@ -0,0 +1,68 @@
+# services/components/project/cache.py
+
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache:
+    """Bounded in-process LRU cache whose entries also expire after a TTL.
+
+    Sized from CACHE_MAX_SIZE and CACHE_TTL (seconds) by init_app().  Each
+    gunicorn worker holds its own copy, so clear() only reaches the local
+    worker; the TTL bounds how stale any other worker can be.
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = 0
+        self.ttl = 0
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config['CACHE_MAX_SIZE']
+        self.ttl = app.config['CACHE_TTL']
+        self.clear()
+
+    def get(self, key):
+        """Return the live value for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
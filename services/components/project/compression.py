@@ -0,0 +1,129 @@
+# services/components/project/compression.py
+
+
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class GzipEncoder:
+    """Incremental gzip stream; flush() ends a chunk the client can decode
+    without waiting for the rest of the body."""
+
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    @staticmethod
+    def compress_all(data, level):
+        return gzip.compress(data, level)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Incremental brotli stream, same interface as GzipEncoder."""
+
+    name = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    @staticmethod
+    def compress_all(data, quality):
+        return brotli.compress(data, quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+# most preferred first, for clients that accept several equally
+ENCODERS = {'br': BrotliEncoder, 'gzip': GzipEncoder}
+
+
+class Compress:
+    """Content-Encoding negotiation for responses.
+
+    Bodies of COMPRESS_MIMETYPES are brotli (when the module is installed)
+    or gzip encoded, whichever the client ranks higher, if they are at least
+    COMPRESS_MIN_SIZE bytes; smaller ones cost more CPU than they save on
+    the wire.  Streamed responses are always compressed, one flushed chunk
+    per chunk the view yields, so the client still sees rows as they are
+    read.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 0
+        self.mimetypes = ()
+        self.levels = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = app.config['COMPRESS_MIMETYPES']
+        self.levels = {
+            'gzip': app.config['COMPRESS_LEVEL'],
+            'br': app.config['COMPRESS_BROTLI_QUALITY']
+        }
+        app.after_request(self.after_request)
+
+    def encoder(self):
+        """The encoder class to use for the current request, or None."""
+        names = [name for name in ENCODERS
+                 if name != 'br' or brotli is not None]
+        name = request.accept_encodings.best_match(names)
+        return ENCODERS.get(name)
+
+    def after_request(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or
+                'Content-Encoding' in response.headers):
+            return response
+        encoder = self.encoder()
+        if encoder is None:
+            return response
+        level = self.levels[encoder.name]
+        if response.is_streamed:
+            response.response = self._stream(
+                encoder(level), response.response, response.iter_encoded())
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(encoder.compress_all(data, level))
+        response.headers['Content-Encoding'] = encoder.name
+        return response
+
+    @staticmethod
+    def _stream(encoder, body, chunks):
+        try:
+            for chunk in chunks:
+                yield encoder.compress(chunk) + encoder.flush()
+            yield encoder.finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
@@ -9,19 +9,67 @@ class BaseConfig:
     TESTING = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = 'my_precious'
+    JSON_PROVIDER = 'project.serializers.FastJSONProvider'
+    # connection pool, per worker process: keep workers * (POOL_SIZE +
+    # MAX_OVERFLOW) summed over all services below max_connections
+    SQLALCHEMY_POOL_SIZE = 5
+    SQLALCHEMY_MAX_OVERFLOW = 5
+    SQLALCHEMY_POOL_TIMEOUT = 10
+    SQLALCHEMY_POOL_RECYCLE = 1800
+    SQLALCHEMY_POOL_PRE_PING = True
+    PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    LOOKUP_MAX_IDS = 1000
+    EXPORT_BATCH_SIZE = 1000
+    BULK_MAX_ITEMS = 1000
+    BULK_INSERT_BATCH_SIZE = 500
+    CACHE_MAX_SIZE = 1024
+    CACHE_TTL = 30
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+    COMPRESS_MIMETYPES = ('application/json', 'application/x-ndjson',
+                          'text/html')
+    # seconds; statements slower than this are logged, None turns it off
+    SLOW_QUERY_THRESHOLD = 0.1
+    # log the stack of a statement run this many times in one request, in
+    # this share of requests
+    REPEATED_QUERY_THRESHOLD = 5
+    REPEATED_QUERY_SAMPLE_RATE = 1.0
+    # seconds a readiness probe result is reused for, per worker
+    HEALTH_CHECK_INTERVAL = 5
+    # seconds a probe waits to connect before counting as failed
+    HEALTH_CHECK_TIMEOUT = 2
+    # read replicas for GET handlers, each with a pool like the primary's;
+    # none sends everything to the primary
+    DATABASE_REPLICA_URLS = []
+    # seconds a replica probe result is reused for, per worker and replica
+    REPLICA_CHECK_INTERVAL = 5
+    # seconds a client that wrote keeps reading from the primary
+    READ_YOUR_WRITES_WINDOW = 5
 
 
 class DevelopmentConfig(BaseConfig):
     """Development configuration"""
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_POOL_SIZE = 2
+    SQLALCHEMY_MAX_OVERFLOW = 2
 
 
 class TestingConfig(BaseConfig):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
+    SQLALCHEMY_POOL_SIZE = 2
+    SQLALCHEMY_MAX_OVERFLOW = 2
 
 
 class ProductionConfig(BaseConfig):
     """Production configuration"""
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 10))
+    REPEATED_QUERY_SAMPLE_RATE = 0.01
+    DATABASE_REPLICA_URLS = [
+        url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+        if url]
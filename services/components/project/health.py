@@ -0,0 +1,136 @@
+# services/components/project/health.py
+
+
+import math
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+
+def probe(engine):
+    """Run one trivial query through `engine`; return (ok, error)."""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except exc.SQLAlchemyError as e:
+        # a pool timeout has no driver error behind it
+        error = e.orig if isinstance(e, exc.DBAPIError) else e
+        return False, ' '.join(str(error).split())
+    return True, None
+
+
+def probe_engine(url, timeout):
+    """Return an engine to probe the database at `url` through.
+
+    It has no pool, so a probe never queues behind the app's own
+    checkouts, and it gives up connecting after `timeout` seconds instead
+    of the OS's TCP timeout when the host stops answering.
+    """
+    return create_engine(url, poolclass=NullPool,
+                         connect_args={'connect_timeout': timeout})
+
+
+class DatabaseProbe:
+    """Readiness check whose result is reused for HEALTH_CHECK_INTERVAL
+    seconds.
+
+    However often orchestrators ask, each worker sends the database at
+    most one probe per interval.  The lock is not held while the query
+    runs: the callers that arrive meanwhile get the last result, and only
+    those that arrive before the first probe has finished wait for it.
+    The app's probe has its own engine, see probe_engine, so it neither
+    waits for nor takes a connection from the app's pool.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self.interval = 0
+        self.engine = None
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.interval = app.config['HEALTH_CHECK_INTERVAL']
+        self.engine = probe_engine(app.config['SQLALCHEMY_DATABASE_URI'],
+                                   app.config['HEALTH_CHECK_TIMEOUT'])
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._checked = None
+            self._result = None
+            self._probing = False
+
+    def fail(self, error):
+        """Record a failure seen elsewhere, as if a probe had just found
+        it."""
+        with self._lock:
+            self._set_result((False, error))
+
+    def _set_result(self, result):
+        self._result = result
+        self._checked = time.monotonic()
+        self._done.notify_all()
+
+    def check(self, engine=None):
+        """Return {'ok', 'error', 'age'} for the database behind `engine`,
+        the probe's own by default, age being the seconds since the probe
+        ran."""
+        with self._lock:
+            run = not self._probing and (
+                self._checked is None or
+                time.monotonic() - self._checked >= self.interval)
+            if run:
+                self._probing = True
+        if run:
+            result = (False, 'probe did not finish')
+            try:
+                result = probe(engine or self.engine)
+            finally:
+                with self._lock:
+                    self._probing = False
+                    self._set_result(result)
+        with self._lock:
+            while self._result is None:
+                self._done.wait()
+            ok, error = self._result
+            return {'ok': ok, 'error': error,
+                    'age': round(time.monotonic() - self._checked, 3)}
+
+
+def wait_for_db(url, timeout=60.0, delay=0.1, max_delay=5.0,
+                connect_timeout=2, log=None):
+    """Block until the database at `url` answers a query, retrying with
+    exponential backoff; return the number of attempts.
+
+    Each attempt gives up connecting after `connect_timeout` seconds, or
+    what is left of `timeout` if that is less.  Raises TimeoutError once
+    `timeout` seconds have passed.
+    """
+    deadline = time.monotonic() + timeout
+    attempts = 0
+    while True:
+        attempts += 1
+        remaining = deadline - time.monotonic()
+        # libpq takes whole seconds, and 0 would mean no limit
+        engine = probe_engine(
+            url, max(1, math.ceil(min(remaining, connect_timeout))))
+        try:
+            ok, error = probe(engine)
+        finally:
+            engine.dispose()
+        if ok:
+            return attempts
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f'database not ready after {attempts} attempts: {error}')
+        if log is not None:
+            log(f'database not ready ({error}); retrying in '
+                f'{min(delay, remaining):.1f} s')
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
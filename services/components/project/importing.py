@@ -0,0 +1,215 @@
+# services/components/project/importing.py
+
+"""Bulk import of CSV and NDJSON files, run through `manage.py import-data`.
+
+Records are read one at a time and validated.  Each batch of valid ones is
+copied into a temporary staging table and merged into the model's table
+on its natural key, all in one transaction.  After every commit the number
+of records consumed is saved to a checkpoint file, so an interrupted
+import resumes after the last committed batch.  Replaying a batch whose
+checkpoint was lost is harmless, because the merge is keyed.
+"""
+
+
+import csv
+import itertools
+import json
+import os
+import time
+
+from sqlalchemy import literal_column, or_, select, sql, text
+from sqlalchemy.dialects.postgresql import insert
+
+from project import db
+from project.api.bulk import copy_rows
+from project.api.versioning import bump_version
+
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+STAGING = 'import_staging'
+
+
+class CheckpointMismatch(Exception):
+    """The checkpoint was written for another file, or the file changed."""
+
+
+def guess_format(path):
+    """Return 'csv' or 'ndjson' from the extension of `path`, or None."""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def read_records(path, format):
+    """Yield (line, record, error) for each record in the file at `path`.
+
+    `record` is a dict, or None when the record could not be parsed, in
+    which case `error` says why.  Only one record is held at a time.
+    """
+    # utf-8-sig drops the byte order mark spreadsheets like to write
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if format == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record, None
+            return
+        for line, data in enumerate(f, 1):
+            if not data.strip():
+                continue
+            try:
+                record = json.loads(data)
+            except ValueError as e:
+                yield line, None, f'invalid JSON ({e})'
+            else:
+                yield line, record, None
+
+
+def validate(record, columns):
+    """Return why `record` cannot be imported into `columns`, or None."""
+    if not isinstance(record, dict):
+        return 'not an object'
+    for column in columns:
+        value = record.get(column.name)
+        if not isinstance(value, str) or not value:
+            return f'{column.name} is missing or not a string'
+        if column.type.length and len(value) > column.type.length:
+            return (f'{column.name} is longer than '
+                    f'{column.type.length} characters')
+        if '\x00' in value:
+            return f'{column.name} holds a NUL character'
+    return None
+
+
+def merge_statement(model, fields, key, update):
+    """INSERT ... SELECT from the staging table into `model`, returning
+    whether each row merged was inserted rather than updated.
+
+    Column defaults of `model`, such as created_date, are filled in by the
+    SELECT.  A conflict on `key` skips the row, or with `update`
+    overwrites the other fields where they differ.
+    """
+    table = model.__table__
+    staged = sql.table(STAGING, *[sql.column(field) for field in fields])
+    statement = insert(table).from_select(
+        fields, select([staged.c[field] for field in fields]))
+    if update:
+        others = [field for field in fields if field != key]
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={field: statement.excluded[field] for field in others},
+            where=or_(*[table.c[field] != statement.excluded[field]
+                        for field in others]))
+    else:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=[table.c[key]])
+    # a row version no transaction has yet replaced is a fresh insert
+    return statement.returning(literal_column('xmax = 0'))
+
+
+def merge_batch(model, fields, statement, version, rows):
+    """Stage `rows` with COPY and merge them, bumping the table `version`
+    if any changed; return (added, updated)."""
+    quote = db.engine.dialect.identifier_preparer.quote
+    db.session.execute(text(
+        f'CREATE TEMPORARY TABLE {STAGING} AS '
+        f'SELECT {", ".join(quote(field) for field in fields)} '
+        f'FROM {quote(model.__tablename__)} WITH NO DATA'))
+    copy_rows(STAGING, fields, rows, len(rows))
+    inserted = [fresh for fresh, in db.session.execute(statement)]
+    db.session.execute(text(f'DROP TABLE {STAGING}'))
+    if inserted:
+        bump_version(version)
+    db.session.commit()
+    added = sum(inserted)
+    return added, len(inserted) - added
+
+
+def load_checkpoint(path, source):
+    """Return the saved state for `source`, or None if there is none."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state['source'] != source:
+        raise CheckpointMismatch(
+            f'{path} was written for {state["source"]["path"]}, or the '
+            f'file has changed since')
+    return state
+
+
+def save_checkpoint(path, state):
+    """Replace the checkpoint at `path` in one step."""
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def import_file(path, format, model, fields, key, version, batch_size,
+                update=False, checkpoint=None, restart=False, log=None,
+                reject=None):
+    """Merge the records of the file at `path` into `model` on `key`.
+
+    `fields` are the required string fields of each record.  A later
+    record for a key already seen is skipped, or with `update` overwrites
+    it.  Progress goes to `log` after every batch, and each invalid record
+    to `reject` with its line number.  Returns the counts.
+    """
+    columns = [model.__table__.c[field] for field in fields]
+    position = fields.index(key)
+    statement = merge_statement(model, fields, key, update)
+    stat = os.stat(path)
+    source = {'path': os.path.abspath(path), 'size': stat.st_size,
+              'mtime': stat.st_mtime}
+    state = None
+    if checkpoint is not None and not restart:
+        state = load_checkpoint(checkpoint, source)
+    if state is None:
+        state = {'source': source, 'records': 0, 'added': 0,
+                 'updated': 0, 'skipped': 0, 'invalid': 0}
+    elif log is not None:
+        log(f'resuming after record {state["records"]}')
+    records = itertools.islice(
+        read_records(path, format), state['records'], None)
+    start = time.perf_counter()
+    read = 0
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        rows = {}
+        valid = 0
+        for line, record, error in batch:
+            error = error or validate(record, columns)
+            if error is not None:
+                state['invalid'] += 1
+                if reject is not None:
+                    reject(f'line {line}: {error}')
+                continue
+            valid += 1
+            row = tuple(record[field] for field in fields)
+            if update:
+                # ON CONFLICT cannot touch a row twice in one statement
+                rows.pop(row[position], None)
+            rows.setdefault(row[position], row)
+        added, updated = (
+            merge_batch(model, fields, statement, version,
+                        list(rows.values()))
+            if rows else (0, 0))
+        read += len(batch)
+        state['records'] += len(batch)
+        state['added'] += added
+        state['updated'] += updated
+        # repeated in the file, or already in the table
+        state['skipped'] += valid - added - updated
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, state)
+        if log is not None:
+            log(progress(state, read / (time.perf_counter() - start)))
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return state
+
+
+def progress(state, rate):
+    return (f'{state["records"]} records: {state["added"]} added, '
+            f'{state["updated"]} updated, {state["skipped"]} skipped, '
+            f'{state["invalid"]} invalid ({rate:.0f} records/s)')
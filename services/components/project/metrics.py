@@ -0,0 +1,206 @@
+# services/components/project/metrics.py
+
+
+import bisect
+import collections
+import os
+import random
+import threading
+import time
+import traceback
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# upper bounds of the histogram buckets: seconds, and statements per request
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# longest parameters repr written to the slow query log
+MAX_PARAMETERS_REPR = 500
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Histogram:
+    """Prometheus-style histogram, one series per label tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def expose(self):
+        """The histogram in the Prometheus text exposition format."""
+        lines = [f'# HELP {self.name} {self.help}',
+                 f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            for labels, (counts, total) in series:
+                pairs = [f'{key}="{value}"'
+                         for key, value in zip(self.labels, labels)]
+                count = 0
+                for bound, n in zip(self.buckets + ('+Inf',), counts):
+                    count += n
+                    le = ','.join(pairs + [f'le="{bound}"'])
+                    lines.append(f'{self.name}_bucket{{{le}}} {count}')
+                selector = ','.join(pairs)
+                lines.append(f'{self.name}_sum{{{selector}}} {total}')
+                lines.append(f'{self.name}_count{{{selector}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def record_time(name, seconds):
+    """Add `seconds` to the current request's `name` timing, if any."""
+    if has_app_context():
+        timing = g.get('timing')
+        if timing is not None:
+            timing[name] += seconds
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    # kept on the execution context, which is dropped along with it when
+    # the statement fails; only the dialect's first-connect checks run
+    # without one
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    if context is None or not has_app_context():
+        return
+    elapsed = time.perf_counter() - context.query_start
+    timing = g.get('timing')
+    if timing is None:
+        return
+    timing['db'] += elapsed
+    timing['queries'] += 1
+    if timing['slow_query'] is not None and elapsed >= timing['slow_query']:
+        current_app.logger.warning(
+            'slow query (%.1f ms) in %s %s: %s; parameters: %s',
+            elapsed * 1000, request.method, _endpoint(), statement,
+            repr(parameters)[:MAX_PARAMETERS_REPR])
+    repeats = timing['repeats']
+    if repeats is not None:
+        repeats[statement] += 1
+        if repeats[statement] == timing['repeat_limit']:
+            current_app.logger.warning(
+                'statement repeated %d times in %s %s: %s\n%s',
+                repeats[statement], request.method, _endpoint(), statement,
+                _project_stack())
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule else 'none'
+
+
+def _project_stack():
+    """The calling stack, cut down to the frames in this package."""
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(PROJECT_DIR) and
+              frame.filename != __file__]
+    return ''.join(traceback.format_list(frames or traceback.extract_stack()))
+
+
+class Metrics:
+    """Per-request timing: wall time, SQL statement count and time, and
+    serialization time.
+
+    Every response carries them in a Server-Timing header, and /metrics
+    serves per-endpoint histograms of them in the Prometheus text format.
+    The figures are per process; with several gunicorn workers each one
+    reports its own, so scrape them per worker or sum across them.
+
+    Statements slower than SLOW_QUERY_THRESHOLD seconds are logged with
+    their endpoint and parameters.  In a REPEATED_QUERY_SAMPLE_RATE share of
+    requests, a statement run REPEATED_QUERY_THRESHOLD times is logged with
+    the stack that ran it, which is what an N+1 query pattern looks like.
+    """
+
+    def __init__(self, app=None):
+        self.duration = Histogram(
+            'http_request_duration_seconds', 'Request wall time.',
+            ('endpoint', 'method', 'status'), DURATION_BUCKETS)
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds',
+            'Time spent in SQL statements per request.',
+            ('endpoint',), DURATION_BUCKETS)
+        self.db_statements = Histogram(
+            'http_request_db_statements',
+            'SQL statements executed per request.',
+            ('endpoint',), COUNT_BUCKETS)
+        self.serialize_duration = Histogram(
+            'http_request_serialize_duration_seconds',
+            'Time spent encoding response bodies per request.',
+            ('endpoint',), DURATION_BUCKETS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # listening on the Engine class covers every engine, including ones
+        # created after this; contains() keeps repeated init_app calls from
+        # counting each statement twice
+        if not event.contains(Engine, 'before_cursor_execute',
+                              before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute',
+                         before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute',
+                         after_cursor_execute)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.add_url_rule('/metrics', 'metrics', self.expose)
+
+    def before_request(self):
+        config = current_app.config
+        sampled = random.random() < config['REPEATED_QUERY_SAMPLE_RATE']
+        g.timing = {
+            'start': time.perf_counter(),
+            'db': 0.0,
+            'queries': 0,
+            'serialize': 0.0,
+            'slow_query': config['SLOW_QUERY_THRESHOLD'],
+            'repeats': collections.Counter() if sampled else None,
+            'repeat_limit': config['REPEATED_QUERY_THRESHOLD']
+        }
+
+    def after_request(self, response):
+        timing = g.pop('timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing['start']
+        endpoint = _endpoint()
+        self.duration.observe(
+            (endpoint, request.method, str(response.status_code)), total)
+        self.db_duration.observe((endpoint,), timing['db'])
+        self.db_statements.observe((endpoint,), timing['queries'])
+        self.serialize_duration.observe((endpoint,), timing['serialize'])
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={timing["db"] * 1000:.2f};'
+            f'desc="{timing["queries"]} queries", '
+            f'serialize;dur={timing["serialize"] * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}')
+        return response
+
+    def expose(self):
+        """Report this worker's request histograms for Prometheus"""
+        body = ''.join(histogram.expose() for histogram in (
+            self.duration, self.db_duration, self.db_statements,
+            self.serialize_duration))
+        return Response(body, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,57 @@
+# services/components/project/seed.py
+
+"""Deterministic sample components for `manage.py seed-db --count`."""
+
+
+import datetime
+import random
+
+
+PRODUCTS = (
+    ('aws', 'Amazon Web Services'),
+    ('Azure', 'Microsoft Azure'),
+    ('GCP', 'Google Cloud Platform'),
+    ('RHEL', 'Red Hat Enterprise Linux'),
+    ('Windows Server', 'Microsoft Windows Server'),
+    ('PostgreSQL', 'PostgreSQL database'),
+    ('MySQL', 'MySQL database'),
+    ('Redis', 'Redis cache'),
+    ('nginx', 'nginx web server'),
+    ('Kubernetes', 'Kubernetes cluster'),
+    ('Okta', 'Okta identity provider'),
+    ('Splunk', 'Splunk log management'),
+    ('GitHub', 'GitHub source control'),
+    ('Jenkins', 'Jenkins build server'))
+ENVIRONMENTS = (
+    'production', 'staging', 'development', 'test', 'disaster recovery')
+# creation dates are drawn from a pool spread over the year before EPOCH
+EPOCH = datetime.datetime(2018, 6, 1)
+DATES = 4096
+
+COLUMNS = ('name', 'description', 'created_date')
+
+
+def generate(count, seed=0):
+    """Yield `count` components as tuples in COLUMNS order.
+
+    The same seed always yields the same rows.  The row number is part of
+    every name, so the names are unique.
+    """
+    rng = random.Random(seed)
+
+    def pick(options):
+        # what random.choices does, and several times quicker than choice
+        return options[int(rng.random() * len(options))]
+
+    # formatting a timestamp per row would cost more than the rest of it
+    dates = [
+        str(EPOCH - datetime.timedelta(seconds=rng.randrange(365 * 86400)))
+        for _ in range(DATES)]
+    for i in range(count):
+        short, product = pick(PRODUCTS)
+        environment = pick(ENVIRONMENTS)
+        yield (
+            f'{short} {environment} {i}',
+            f'{product}, {environment}',
+            pick(dates),
+        )
@@ -0,0 +1,146 @@
+# services/components/project/serializers.py
+
+
+import functools
+import json
+import time
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from flask import current_app
+from flask.json import JSONEncoder
+from sqlalchemy import Boolean, Integer, String
+
+from project.metrics import record_time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# stands in for a pre-encoded array of rows inside a response object
+ROWS = '\x00rows\x00'
+ENCODED_ROWS = json.dumps(ROWS)
+# JSON for False and True, indexed by the value
+BOOLEANS = ('false', 'true')
+
+
+class JSONProvider:
+    """Encodes response bodies with the stdlib json module, byte for byte
+    like flask.jsonify.
+
+    `ensure_ascii` tells row_encoder whether strings are written with \\u
+    escapes, so rows encoded in place come out like the rest of the body.
+    """
+
+    ensure_ascii = True
+
+    def dumps(self, data, pretty=False):
+        if pretty:
+            return json.dumps(data, cls=JSONEncoder, indent=2,
+                              separators=(', ', ': '), sort_keys=True,
+                              ensure_ascii=self.ensure_ascii) + '\n'
+        return json.dumps(data, cls=JSONEncoder, separators=(',', ':'),
+                          sort_keys=True,
+                          ensure_ascii=self.ensure_ascii) + '\n'
+
+
+class FastJSONProvider(JSONProvider):
+    """Uses orjson for compact bodies when it is installed.
+
+    orjson writes non-ASCII characters as UTF-8 rather than \\u escapes,
+    so while it is installed every body does, pretty-printed (debug) ones
+    and rows from row_encoder included.  The decoded documents are the
+    same as flask.jsonify's.  Pretty-printed bodies keep the stdlib layout.
+    """
+
+    ensure_ascii = orjson is None
+
+    def dumps(self, data, pretty=False):
+        if orjson is None or pretty:
+            return super().dumps(data, pretty)
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode() + '\n'
+
+
+def row_encoder(columns, ensure_ascii=True):
+    """Build a function that encodes one result tuple as a JSON object.
+
+    `columns` are the table columns the tuples hold, in order.  Keys come out
+    sorted, like jsonify.  The %-template holding them and an encoder for
+    each value, picked from its column type, are worked out once, so the
+    per-row work is one %-format and no dict is built per row.  Without
+    `ensure_ascii` non-ASCII characters are written as they are, as
+    json.dumps does.
+    """
+    dumps = functools.partial(json.dumps, ensure_ascii=ensure_ascii)
+    encode_string = (encode_basestring_ascii if ensure_ascii else
+                     encode_basestring)
+    order = sorted(range(len(columns)), key=lambda i: columns[i].key)
+    template = []
+    encoders = []
+    for i in order:
+        column = columns[i]
+        key = json.dumps(column.key)
+        if column.nullable:
+            template.append(f'{key}:%s')
+            encoders.append((i, dumps))
+        elif isinstance(column.type, Integer):
+            template.append(f'{key}:%d')
+            encoders.append((i, int))
+        elif isinstance(column.type, Boolean):
+            template.append(f'{key}:%s')
+            encoders.append((i, BOOLEANS.__getitem__))
+        elif isinstance(column.type, String):
+            template.append(f'{key}:%s')
+            encoders.append((i, encode_string))
+        else:
+            template.append(f'{key}:%s')
+            encoders.append((i, dumps))
+    template = '{' + ','.join(template) + '}'
+    encoders = tuple(encoders)
+
+    def encode_row(row):
+        return template % tuple([encode(row[i]) for i, encode in encoders])
+    return encode_row
+
+
+def _pretty():
+    return (current_app.config['JSONIFY_PRETTYPRINT_REGULAR'] or
+            current_app.debug)
+
+
+def jsonify(data):
+    """flask.jsonify through the app's configured JSON provider."""
+    start = time.perf_counter()
+    body = current_app.json_provider.dumps(data, _pretty())
+    record_time('serialize', time.perf_counter() - start)
+    return current_app.response_class(
+        body, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+def jsonify_rows(data, rows, columns):
+    """jsonify `data` with `rows`, tuples of `columns`, encoded in place of
+    the ROWS placeholder.
+
+    Pretty-printed responses fall back to building a dict per row so the
+    layout stays exactly what jsonify produces.
+    """
+    if _pretty():
+        objects = [dict(zip((c.key for c in columns), row)) for row in rows]
+        return jsonify(_replace_rows(data, objects))
+    start = time.perf_counter()
+    encode = row_encoder(columns, current_app.json_provider.ensure_ascii)
+    body = current_app.json_provider.dumps(data).replace(
+        ENCODED_ROWS, '[' + ','.join(map(encode, rows)) + ']', 1)
+    record_time('serialize', time.perf_counter() - start)
+    return current_app.response_class(
+        body, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+
+def _replace_rows(data, objects):
+    if data == ROWS:
+        return objects
+    if isinstance(data, dict):
+        return {key: _replace_rows(value, objects)
+                for key, value in data.items()}
+    return data
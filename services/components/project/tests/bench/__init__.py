@@ -0,0 +1 @@
+# services/components/project/tests/bench/__init__.py
@@ -0,0 +1,47 @@
+# services/components/project/tests/bench/bench_compression.py
+
+"""Bytes on the wire and CPU cost of each encoding by response size.
+
+    python -m project.tests.bench.bench_compression
+"""
+
+
+import timeit
+
+from project.api.models import Component
+from project.compression import BrotliEncoder, GzipEncoder, brotli
+from project.serializers import row_encoder
+from project.tests.bench.bench_serialization import sample
+
+
+SIZES = (1, 10, 100, 1000, 10000)
+
+
+def main():
+    columns = [Component.__table__.c[key] for key in Component.json_keys]
+    encode = row_encoder(columns)
+    encoders = [('gzip-1', GzipEncoder, 1), ('gzip-6', GzipEncoder, 6),
+                ('gzip-9', GzipEncoder, 9)]
+    if brotli is not None:
+        encoders += [('br-4', BrotliEncoder, 4), ('br-11', BrotliEncoder, 11)]
+    print(f'{"rows":>6} {"encoding":<8} {"bytes":>10} {"ratio":>6} '
+          f'{"ms":>8}')
+    for size in SIZES:
+        rows = [tuple(sample(column, i) for column in columns)
+                for i in range(size)]
+        body = ('[' + ','.join(map(encode, rows)) + ']').encode()
+        print(f'{size:>6} {"identity":<8} {len(body):>10} {1:>6.2f} '
+              f'{0:>8.3f}')
+        for name, encoder, level in encoders:
+            compressed = encoder.compress_all(body, level)
+            number = max(1, 10000 // size)
+            seconds = min(timeit.repeat(
+                lambda: encoder.compress_all(body, level),
+                number=number, repeat=3)) / number
+            print(f'{size:>6} {name:<8} {len(compressed):>10} '
+                  f'{len(body) / len(compressed):>6.2f} '
+                  f'{seconds * 1000:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
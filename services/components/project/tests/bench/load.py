@@ -0,0 +1,238 @@
+# services/components/project/tests/bench/load.py
+
+"""HTTP load test for one service, run through `python manage.py bench`.
+
+Seeds the database, serves the app under gunicorn on a free local port,
+drives concurrent keep-alive clients at each endpoint for a fixed time and
+reports throughput and latency percentiles as JSON.
+"""
+
+
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from project import db
+from project.api.versioning import bump_version
+from project.tests.bench.bench_serialization import sample
+
+
+ENDPOINTS = ('ping', 'single', 'list', 'post')
+PERCENTILES = (50, 95, 99)
+
+
+def seed(model, version, count, batch_size=1000):
+    """Recreate the tables and insert `count` generated rows."""
+    db.drop_all()
+    db.create_all()
+    columns = writable_columns(model)
+    for start in range(0, count, batch_size):
+        stop = min(count, start + batch_size)
+        db.session.execute(model.__table__.insert(), [
+            {column.key: sample(column, i) for column in columns}
+            for i in range(start, stop)])
+    bump_version(version)
+    db.session.commit()
+
+
+def writable_columns(model):
+    return [model.__table__.c[key] for key in model.json_keys
+            if key != 'id']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """gunicorn serving `app_module` on a free local port while in use."""
+
+    def __init__(self, app_module, config, workers=None, timeout=30):
+        self.port = free_port()
+        self.env = dict(os.environ, APP_SETTINGS=config,
+                        GUNICORN_BIND=f'127.0.0.1:{self.port}')
+        if workers:
+            self.env['GUNICORN_WORKERS'] = str(workers)
+        # a worker recycled mid-run drops its keep-alive connections; the
+        # jitter alone would still recycle it
+        self.env.setdefault('GUNICORN_MAX_REQUESTS', '0')
+        self.env.setdefault('GUNICORN_MAX_REQUESTS_JITTER', '0')
+        self.app_module = app_module
+        self.timeout = timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn.app.wsgiapp',
+             '-c', 'gunicorn.conf.py', self.app_module],
+            env=self.env, stdout=subprocess.DEVNULL)
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup')
+            try:
+                socket.create_connection(('127.0.0.1', self.port)).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError('gunicorn did not start listening in time')
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+def request_maker(endpoint, resource, model, rows):
+    """A function returning (method, path, body) for each call to
+    `endpoint`."""
+    if endpoint == 'ping':
+        return lambda: ('GET', f'/{resource}/ping', None)
+    if endpoint == 'single':
+        return lambda: (
+            'GET', f'/{resource}/{random.randint(1, max(rows, 1))}', None)
+    if endpoint == 'list':
+        return lambda: (
+            'GET', f'/{resource}?after={random.randint(0, rows)}', None)
+    columns = writable_columns(model)
+    # new rows only: every POST gets keys no seeded or earlier row has
+    counter = itertools.count(rows)
+
+    def post():
+        i = next(counter)
+        row = {column.key: sample(column, i) for column in columns}
+        return 'POST', f'/{resource}', json.dumps(row)
+    return post
+
+
+class Client(threading.Thread):
+    """One keep-alive connection sending requests until `deadline`."""
+
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, port, make_request, deadline):
+        super().__init__(daemon=True)
+        self.port = port
+        self.make_request = make_request
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        while time.perf_counter() < self.deadline:
+            method, path, body = self.make_request()
+            start = time.perf_counter()
+            try:
+                response = self.send(connection, method, path, body)
+            except (OSError, http.client.HTTPException):
+                # the server may drop an idle keep-alive connection just as
+                # a request goes out; retry once on a new one, as browsers
+                # and urllib3 do
+                connection.close()
+                try:
+                    response = self.send(connection, method, path, body)
+                except (OSError, http.client.HTTPException):
+                    self.errors += 1
+                    connection.close()
+                    continue
+            self.latencies.append(time.perf_counter() - start)
+            if response.status >= 400:
+                self.errors += 1
+        connection.close()
+
+    def send(self, connection, method, path, body):
+        connection.request(method, path, body, self.headers)
+        response = connection.getresponse()
+        response.read()
+        return response
+
+
+def drive(port, make_request, concurrency, duration):
+    """Run `concurrency` clients for `duration` seconds and summarize."""
+    start = time.perf_counter()
+    clients = [Client(port, make_request, start + duration)
+               for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+    latencies = [latency for client in clients
+                 for latency in client.latencies]
+    return summarize(latencies, sum(c.errors for c in clients), elapsed)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1)
+    }
+    for percentile in PERCENTILES:
+        result[f'p{percentile}_ms'] = percentile_ms(latencies, percentile)
+    result['max_ms'] = percentile_ms(latencies, 100)
+    return result
+
+
+def percentile_ms(latencies, percentile):
+    """Nearest-rank percentile of sorted `latencies`, in milliseconds."""
+    if not latencies:
+        return None
+    rank = max(1, -(-len(latencies) * percentile // 100))
+    return round(latencies[rank - 1] * 1000, 2)
+
+
+def compare(report, baseline, tolerance):
+    """List the endpoints whose throughput fell or whose p99 latency rose
+    by more than `tolerance` (a fraction) against `baseline`."""
+    regressions = []
+    for endpoint, result in report['results'].items():
+        before = baseline['results'].get(endpoint)
+        if before is None:
+            continue
+        if result['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(
+                f'{endpoint}: rps {before["rps"]} -> {result["rps"]}')
+        if (result['p99_ms'] is not None and before['p99_ms'] is not None and
+                result['p99_ms'] > before['p99_ms'] * (1 + tolerance)):
+            regressions.append(
+                f'{endpoint}: p99 {before["p99_ms"]} -> '
+                f'{result["p99_ms"]} ms')
+    return regressions
+
+
+def run(app, model, version, resource, rows, endpoints, concurrency,
+        duration, warmup, workers, config, app_module='wsgi:app'):
+    """Seed, serve and load-test `resource`; return the JSON report."""
+    app.config.from_object(config)
+    with app.app_context():
+        seed(model, version, rows)
+        db.session.remove()
+        db.engine.dispose()
+    report = {
+        'service': resource,
+        'rows': rows,
+        'concurrency': concurrency,
+        'duration': duration,
+        'workers': workers,
+        'results': {}
+    }
+    with Server(app_module, config, workers) as server:
+        for endpoint in endpoints:
+            make_request = request_maker(endpoint, resource, model, rows)
+            if warmup:
+                drive(server.port, make_request, concurrency, warmup)
+            report['results'][endpoint] = drive(
+                server.port, make_request, concurrency, duration)
+    return report
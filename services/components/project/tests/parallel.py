@@ -0,0 +1,111 @@
+# services/components/project/tests/parallel.py
+
+"""Run the test suite split across processes, run through
+`python manage.py test --parallel N`.
+
+Whole test classes are dealt out to N shards.  Each shard runs in its own
+process against its own database, DATABASE_TEST_URL with `_<shard>`
+appended to the name, which is created on first use.
+"""
+
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+
+
+def shard_url(url, index):
+    url = make_url(url)
+    url.database = f'{url.database}_{index}'
+    return str(url)
+
+
+def create_database(url):
+    """Create the database named in `url` unless it exists."""
+    url = make_url(url)
+    name = url.database
+    url.database = 'postgres'
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+    try:
+        with engine.connect() as connection:
+            exists = connection.execute(
+                text('SELECT 1 FROM pg_database WHERE datname = :name'),
+                name=name).scalar()
+            if not exists:
+                connection.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        engine.dispose()
+
+
+def discover():
+    return unittest.TestLoader().discover('project/tests', pattern='test*.py')
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def shard(suite, index, count):
+    """The part of `suite` that shard `index` of `count` runs.
+
+    Classes stay together so their fixtures run once; the largest go first,
+    each to the shard with the fewest tests so far.
+    """
+    classes = {}
+    for test in iter_tests(suite):
+        classes.setdefault(type(test), []).append(test)
+    shards = [[] for _ in range(count)]
+    for tests in sorted(classes.values(), key=len, reverse=True):
+        min(shards, key=len).extend(tests)
+    return unittest.TestSuite(shards[index])
+
+
+def run(count):
+    """Run the suite in `count` processes; return True if every shard
+    passed.
+
+    Each shard writes to its own temporary file rather than a pipe, which
+    would stall it once full until the shards before it were read; the
+    output is printed once all have exited.
+    """
+    url = os.environ['DATABASE_TEST_URL']
+    processes = []
+    for index in range(count):
+        database = shard_url(url, index)
+        create_database(database)
+        output = tempfile.TemporaryFile()
+        processes.append((output, subprocess.Popen(
+            [sys.executable, '-m', 'project.tests.parallel',
+             str(index), str(count)],
+            env=dict(os.environ, DATABASE_TEST_URL=database),
+            stdout=output, stderr=subprocess.STDOUT)))
+    passed = True
+    for _, process in processes:
+        passed = process.wait() == 0 and passed
+    for index, (output, _) in enumerate(processes):
+        with output:
+            output.seek(0)
+            print(f'shard {index + 1}/{count}:')
+            sys.stdout.write(output.read().decode())
+    return passed
+
+
+def main(argv=None):
+    """Run one shard: `python -m project.tests.parallel INDEX COUNT`."""
+    index, count = map(int, sys.argv[1:] if argv is None else argv)
+    tests = shard(discover(), index, count)
+    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
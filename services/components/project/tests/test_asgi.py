@@ -0,0 +1,114 @@
+# services/components/project/tests/test_asgi.py
+
+
+import asyncio
+import unittest
+
+from project import db
+from project.api.models import Component
+from project.asgi import create_asgi_app
+from project.serializers import FastJSONProvider, JSONProvider
+from project.tests.base import BaseTestCase
+
+
+def add_component(name, description):
+    component = Component(name=name, description=description)
+    db.session.add(component)
+    db.session.commit()
+    return component
+
+
+class TestAsyncApp(BaseTestCase):
+    """Tests for the asyncio variant of the Components Service."""
+
+    # the async app reads through its own asyncpg connections
+    transactional = False
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.asgi = create_asgi_app('project.config.TestingConfig')
+        self.loop.run_until_complete(self.asgi.startup())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.asgi.shutdown())
+        self.loop.close()
+        super().tearDown()
+
+    def get(self, path, query_string=b''):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string
+        }
+        self.loop.run_until_complete(self.asgi(scope, receive, send))
+        return messages[0]['status'], messages[1]['body']
+
+    def assertSameResponse(self, path, query_string=b''):
+        """Ensure the async app answers exactly like the Flask app."""
+        url = path + ('?' + query_string.decode() if query_string else '')
+        response = self.client.get(url)
+        status, body = self.get(path, query_string)
+        self.assertEqual(status, response.status_code)
+        self.assertEqual(body, response.data)
+
+    def test_ping(self):
+        """Ensure the /ping route matches the Flask app."""
+        self.assertSameResponse('/components/ping')
+
+    def test_single_component(self):
+        """Ensure get single component matches the Flask app."""
+        component = add_component('aws', 'Amazon Web Services')
+        self.assertSameResponse(f'/components/{component.id}')
+        self.assertSameResponse('/components/999')
+        self.assertSameResponse('/components/blah')
+        # past int4, and past int8
+        self.assertSameResponse('/components/99999999999')
+        self.assertSameResponse('/components/99999999999999999999')
+        self.assertSameResponse(
+            f'/components/{component.id}', b'fields=description')
+        self.assertSameResponse(f'/components/{component.id}', b'fields=')
+
+    def test_all_components(self):
+        """Ensure get all components matches the Flask app page by page."""
+        add_component('aws', 'Amazon Web Services')
+        add_component('Azure', 'Microsoft Azure')
+        add_component('gcp', 'Google Cloud Platform')
+        self.assertSameResponse('/components')
+        self.assertSameResponse('/components', b'limit=2')
+        self.assertSameResponse('/components', b'limit=2&after=2')
+        self.assertSameResponse('/components', b'limit=0')
+        self.assertSameResponse('/components', b'after=blah')
+        self.assertSameResponse('/components', b'after=99999999999')
+        self.assertSameResponse('/components', b'after=-99999999999999999999')
+        self.assertSameResponse('/components', b'ids=1,99999999999999999999')
+        self.assertSameResponse('/components', b'ids=1,3000000000')
+        self.assertSameResponse('/components', b'fields=name&limit=1&after=1')
+        self.assertSameResponse('/components', b'fields=id,description')
+        self.assertSameResponse('/components', b'fields=bogus')
+        self.assertSameResponse('/components', b'ids=3,99,1&fields=name')
+        self.assertSameResponse('/components', b'ids=1,x')
+
+    def test_non_ascii(self):
+        """Ensure non-ASCII characters are escaped like the Flask app
+        escapes them, whichever JSON provider is configured."""
+        component = add_component('Zürich DC', 'Rechenzentrum Zürich')
+        provider = self.app.json_provider
+        self.addCleanup(setattr, self.app, 'json_provider', provider)
+        for provider in (JSONProvider(), FastJSONProvider()):
+            self.app.json_provider = self.asgi.json_provider = provider
+            self.assertSameResponse(f'/components/{component.id}')
+            self.assertSameResponse('/components')
+
+
+if __name__ == '__main__':
+    unittest.main()
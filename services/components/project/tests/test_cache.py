@@ -0,0 +1,54 @@
+# services/components/project/tests/test_cache.py
+
+
+import time
+import unittest
+
+from project.cache import Cache
+
+
+class TestCache(unittest.TestCase):
+    """Tests for the read-through cache."""
+
+    def setUp(self):
+        self.cache = Cache()
+        self.cache.max_size = 2
+        self.cache.ttl = 30
+
+    def test_get_counts_hits_and_misses(self):
+        """Ensure get returns stored values and counts hits and misses."""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_evicts_least_recently_used(self):
+        """Ensure the least recently used entry is evicted when full."""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Ensure entries older than the TTL are not returned."""
+        self.cache.ttl = 0.01
+        self.cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_clear(self):
+        """Ensure clear drops every entry."""
+        self.cache.set('a', 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,13 @@
 import json
 import unittest
 
+from sqlalchemy import exc
+
 from project import db
-from project.api.models import Component
+from project.api.models import Component, TableVersion, components_version
+from project.api.upsert import create_unique_index
+from project.api.versioning import (bump_version, create_version,
+                                    current_version)
 from project.tests.base import BaseTestCase
 
 
@@ -96,6 +101,84 @@ class TestComponentService(BaseTestCase):
                 'Sorry. That component already exists.', data['message'])
             self.assertIn('fail', data['status'])
 
+    def test_component_name_is_unique(self):
+        """Ensure the database rejects a duplicate name."""
+        add_component('aws', 'Amazon Web Services')
+        with self.assertRaises(exc.IntegrityError):
+            add_component('aws', 'Amazon Web Services')
+        db.session.rollback()
+
+    def test_create_unique_index(self):
+        """Ensure the unique index on name is added to a table that lacks
+        it, but not while duplicate names exist."""
+        index = next(index for index in Component.__table__.indexes
+                     if index.unique)
+        index.drop(db.session.connection())
+        first = add_component('aws', 'Amazon Web Services')
+        add_component('aws', 'Amazon Web Services')
+        self.assertEqual(create_unique_index(Component, 'name'), ['aws'])
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(create_unique_index(Component, 'name'), [])
+        with self.assertRaises(exc.IntegrityError):
+            add_component('aws', 'Amazon Web Services')
+        db.session.rollback()
+
+    def test_create_version(self):
+        """Ensure the version table is created when the database lacks it,
+        and left alone when it has it."""
+        TableVersion.__table__.drop(db.session.connection())
+        create_version()
+        self.assertEqual(current_version(components_version), 0)
+        bump_version(components_version)
+        create_version()
+        self.assertEqual(current_version(components_version), 1)
+        bump_version(components_version)
+        self.assertEqual(current_version(components_version), 2)
+
+    def test_add_components_bulk(self):
+        """Ensure a list of components is added with one result per item."""
+        add_component('aws', 'Amazon Web Services')
+        with self.client:
+            response = self.client.post(
+                '/components/bulk',
+                data=json.dumps([
+                    {'name': 'Azure', 'description': 'Microsoft Azure'},
+                    {'name': 'aws', 'description': 'Amazon'},
+                    {'name': 'Azure', 'description': 'Azure again'},
+                    {'name': 'gcp'},
+                ]),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertIn('1 of 4 components were added.', data['message'])
+            self.assertIn('success', data['status'])
+            results = data['data']['results']
+            self.assertEqual(
+                [result['status'] for result in results],
+                ['success', 'fail', 'fail', 'fail'])
+            self.assertIn('Azure was added!', results[0]['message'])
+            for result in results[1:3]:
+                self.assertIn(
+                    'Sorry. Component already exists.', result['message'])
+            self.assertIn('Invalid payload.', results[3]['message'])
+        self.assertEqual(Component.query.count(), 2)
+
+    def test_add_components_bulk_invalid_json(self):
+        """Ensure error is thrown if the bulk payload is not a list."""
+        with self.client:
+            for payload in [{}, [], 'blah']:
+                response = self.client.post(
+                    '/components/bulk',
+                    data=json.dumps(payload),
+                    content_type='application/json',
+                )
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid payload.', data['message'])
+                self.assertIn('fail', data['status'])
+
     def test_single_component(self):
         """Ensure get single component behaves correctly."""
         component = add_component('aws', 'Amazon Web Services')
@@ -107,6 +190,43 @@ class TestComponentService(BaseTestCase):
             self.assertIn('Amazon Web Services', data['data']['description'])
             self.assertIn('success', data['status'])
 
+    def test_single_component_cached(self):
+        """Ensure get single component is cached until a write."""
+        component = add_component('aws', 'Amazon Web Services')
+        with self.client:
+            response = self.client.get('/components/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get(f'/components/{component.id}')
+            self.client.get(f'/components/{component.id}')
+            response = self.client.get('/components/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data']['hits'] - before['hits'], 1)
+            self.assertEqual(data['data']['misses'] - before['misses'], 1)
+            self.assertEqual(data['data']['size'], 1)
+            self.client.post(
+                '/components',
+                data=json.dumps(
+                    {'name': 'Azure', 'description': 'Microsoft Azure'}),
+                content_type='application/json',
+            )
+            response = self.client.get('/components/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['size'], 0)
+
+    def test_component_pool_stats(self):
+        """Ensure the /_pool route reports connection pool statistics."""
+        with self.client:
+            self.client.get('/components')
+            response = self.client.get('/components/_pool')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(data['data']['size'], 2)
+            self.assertGreater(data['data']['checkouts'], 0)
+            latency = data['data']['checkout_latency']
+            self.assertEqual(latency['buckets']['+Inf'], latency['count'])
+
     def test_single_component_no_id(self):
         """Ensure error is thrown if an id is not provided."""
         with self.client:
@@ -144,6 +264,188 @@ class TestComponentService(BaseTestCase):
             self.assertIn(desc_val, data_val)
             self.assertIn('success', data['status'])
 
+    def test_all_components_paginated(self):
+        """Ensure get all components pages through the table by id."""
+        add_component('aws', 'Amazon Web Services')
+        add_component('Azure', 'Microsoft Azure')
+        add_component('gcp', 'Google Cloud Platform')
+        with self.client:
+            response = self.client.get('/components?limit=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['components']), 2)
+            self.assertIn('aws', data['data']['components'][0]['name'])
+            self.assertIn('Azure', data['data']['components'][1]['name'])
+            self.assertEqual(
+                data['data']['next'], data['data']['components'][1]['id'])
+            response = self.client.get(
+                f'/components?limit=2&after={data["data"]["next"]}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['components']), 1)
+            self.assertIn('gcp', data['data']['components'][0]['name'])
+            self.assertIsNone(data['data']['next'])
+
+    def test_all_components_invalid_pagination(self):
+        """Ensure error is thrown if the pagination arguments are invalid."""
+        with self.client:
+            for query in ['limit=0', 'limit=blah', 'limit=100000', 'after=x']:
+                response = self.client.get(f'/components?{query}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(
+                    'Invalid pagination parameters.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_all_components_fields(self):
+        """Ensure ?fields= returns only the requested columns."""
+        component = add_component('AC-2', 'Account Management')
+        add_component('AU-2', 'Audit Events')
+        with self.client:
+            response = self.client.get(
+                '/components?fields=description,id&limit=1')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                data['data']['components'],
+                [{'id': component.id, 'description': 'Account Management'}])
+            response = self.client.get(
+                '/components?fields=name&after=' + str(data['data']['next']))
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['components'], [{'name': 'AU-2'}])
+            self.assertIsNone(data['data']['next'])
+
+    def test_single_component_fields(self):
+        """Ensure ?fields= on get single component returns only those
+        columns."""
+        component = add_component('AC-2', 'Account Management')
+        with self.client:
+            response = self.client.get(
+                f'/components/{component.id}?fields=name')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data'], {'name': 'AC-2'})
+            response = self.client.get(f'/components/{component.id}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(
+                data['data']['description'], 'Account Management')
+
+    def test_components_invalid_fields(self):
+        """Ensure error is thrown if ?fields= names an unknown column."""
+        component = add_component('AC-2', 'Account Management')
+        with self.client:
+            for path in ['/components', f'/components/{component.id}',
+                         '/components/export']:
+                for fields in ['', 'id,password', 'created_date']:
+                    response = self.client.get(f'{path}?fields={fields}')
+                    data = json.loads(response.data.decode())
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(
+                        'Invalid fields parameter.', data['message'])
+                    self.assertIn('fail', data['status'])
+
+    def test_all_components_by_ids(self):
+        """Ensure ?ids= returns those components in order and reports the missing
+        ones."""
+        first = add_component('AC-2', 'Account Management')
+        second = add_component('AU-2', 'Audit Events')
+        with self.client:
+            response = self.client.get(
+                f'/components?ids={second.id},3000000000,{first.id},'
+                f'{second.id}&fields=name')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(
+                data['data']['components'],
+                [{'name': 'AU-2'}, {'name': 'AC-2'}])
+            self.assertEqual(data['data']['missing'], [3000000000])
+
+    def test_all_components_invalid_ids(self):
+        """Ensure error is thrown if ?ids= is malformed, out of range or too
+        long."""
+        too_many = ','.join(str(i) for i in range(1, 1002))
+        with self.client:
+            for ids in ['', '1,blah', '1,,2', '1,99999999999999999999',
+                        too_many]:
+                response = self.client.get(f'/components?ids={ids}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid ids parameter.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_export_components(self):
+        """Ensure export streams one JSON object per component per line."""
+        add_component('aws', 'Amazon Web Services')
+        add_component('Azure', 'Microsoft Azure')
+        response = self.client.get('/components/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('aws', json.loads(lines[0])['name'])
+        self.assertIn('Azure', json.loads(lines[1])['name'])
+
+    def test_all_components_not_modified(self):
+        """Ensure get all components answers a matching ETag with 304 until the
+        table changes."""
+        add_component('aws', 'Amazon Web Services')
+        with self.client:
+            response = self.client.get('/components')
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+            response = self.client.get(
+                '/components', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            self.client.post(
+                '/components/bulk',
+                data=json.dumps([{}]),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                '/components', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+
+    def test_single_component_etag_changes_on_write(self):
+        """Ensure a write changes the ETag of get single component."""
+        component = add_component('aws', 'Amazon Web Services')
+        with self.client:
+            response = self.client.get(f'/components/{component.id}')
+            etag = response.headers['ETag']
+            self.client.post(
+                '/components',
+                data=json.dumps(
+                    {'name': 'Azure', 'description': 'Microsoft Azure'}),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                f'/components/{component.id}', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_query_budget(self):
+        """Ensure the JSON endpoints stay within their SQL statement budgets,
+        whatever the number of rows."""
+        ids = [add_component(f'component{i}', f'Component {i}').id
+               for i in range(20)]
+        with self.assertMaxQueries(2):
+            self.client.get('/components')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/components?ids={ids[0]},{ids[1]},{ids[2]}')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/components/{ids[0]}')
+        with self.assertMaxQueries(1):
+            self.client.get(f'/components/{ids[0]}')
+        with self.assertMaxQueries(2):
+            self.client.post(
+                '/components',
+                data=json.dumps(
+                    {'name': 'admin', 'description': 'Administrators'}),
+                content_type='application/json',
+            )
+
     def test_main_no_components(self):
         """Ensure the main route behaves correctly when no components have been
         added to the database."""
@@ -178,6 +480,50 @@ class TestComponentService(BaseTestCase):
             self.assertNotIn(b'<p>No components!</p>', response.data)
             self.assertIn(b'aws', response.data)
 
+    def test_main_paginated(self):
+        """Ensure the main route shows one page at a time with a link to
+        the next."""
+        first = add_component('aws', 'Amazon Web Services')
+        add_component('Azure', 'Authorizing Official')
+        with self.client:
+            response = self.client.get('/?limit=1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'aws', response.data)
+            self.assertNotIn(b'Azure', response.data)
+            self.assertIn(f'after={first.id}'.encode(), response.data)
+            response = self.client.get(f'/?limit=1&after={first.id}')
+            self.assertIn(b'Azure', response.data)
+            self.assertNotIn(b'Next page', response.data)
+            response = self.client.get('/?limit=blah')
+            self.assertEqual(response.status_code, 400)
+
+    def test_main_cached(self):
+        """Ensure the main route reuses the rendered page until a
+        write."""
+        add_component('aws', 'Amazon Web Services')
+        with self.client:
+            response = self.client.get('/components/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get('/')
+            response = self.client.get('/')
+            self.assertIn(b'aws', response.data)
+            response = self.client.get('/components/_cache')
+            data = json.loads(response.data.decode())['data']
+            self.assertEqual(data['hits'] - before['hits'], 1)
+            self.client.post(
+                '/',
+                data=dict(name='Azure', description='Authorizing Official'))
+            response = self.client.get('/')
+            self.assertIn(b'Azure', response.data)
+
+    def test_main_add_component_redirects(self):
+        """Ensure the form post redirects back to the main route."""
+        with self.client:
+            response = self.client.post(
+                '/', data=dict(name='aws', description='Amazon Web Services'))
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response.location.endswith('/'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,139 @@
+# services/components/project/tests/test_compression.py
+
+
+import gzip
+import json
+import unittest
+import zlib
+
+from flask import Flask, Response, jsonify
+
+from project import compression
+from project.compression import Compress
+from project.tests.base import BaseTestCase
+
+
+ROWS = [{'id': i, 'description': 'a long repeated description'}
+        for i in range(100)]
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config.from_object('project.config.TestingConfig')
+    Compress(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'status': 'success'})
+
+    @app.route('/stream')
+    def stream():
+        def generate():
+            for row in ROWS:
+                yield json.dumps(row) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    @app.route('/text')
+    def text():
+        return Response('x' * 2048, mimetype='text/plain')
+
+    return app
+
+
+class TestCompress(unittest.TestCase):
+    """Tests for response compression."""
+
+    def setUp(self):
+        self.client = create_test_app().test_client()
+
+    def test_large_response_is_gzipped(self):
+        """Ensure large JSON bodies are gzipped when the client accepts it."""
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']),
+                         len(response.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), ROWS)
+
+    def test_not_compressed_without_accept_encoding(self):
+        """Ensure bodies are left alone when the client does not ask."""
+        response = self.client.get('/big')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(response.data.decode()), ROWS)
+
+    def test_small_response_not_compressed(self):
+        """Ensure bodies under COMPRESS_MIN_SIZE are sent as they are."""
+        response = self.client.get(
+            '/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('success', response.data.decode())
+
+    def test_other_mimetypes_not_compressed(self):
+        """Ensure only COMPRESS_MIMETYPES are compressed."""
+        response = self.client.get(
+            '/text', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_stream_is_gzipped_incrementally(self):
+        """Ensure streamed bodies are gzipped one flushed chunk at a time."""
+        response = self.client.get(
+            '/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        decompressor = zlib.decompressobj(31)
+        chunks = iter(response.response)
+        first = decompressor.decompress(next(chunks)).decode()
+        self.assertEqual(json.loads(first), ROWS[0])
+        body = first + b''.join(
+            decompressor.decompress(chunk) for chunk in chunks).decode()
+        response.close()
+        lines = body.splitlines()
+        self.assertEqual([json.loads(line) for line in lines], ROWS)
+
+    def test_quality_values(self):
+        """Ensure the encoding the client ranks highest is used, and none
+        the client refuses."""
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'br;q=0.1, gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'br;q=0, gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(json.loads(response.data.decode()), ROWS)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_ranked_higher(self):
+        """Ensure brotli wins when the client ranks gzip lower."""
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'gzip;q=0.5, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Ensure brotli is used when it is installed and accepted."""
+        response = self.client.get(
+            '/big', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(
+            json.loads(compression.brotli.decompress(response.data)), ROWS)
+
+
+class TestCompressApp(BaseTestCase):
+    """Tests for compression in the service app."""
+
+    def test_app_negotiates_encoding(self):
+        """Ensure the service app varies its responses on Accept-Encoding."""
+        response = self.client.get(
+            '/components/ping', headers={'Accept-Encoding': 'gzip'})
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertNotIn('Content-Encoding', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# services/components/project/tests/test_harness.py
+
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from project.tests.bench.harness import Suite, autorange, compare, main
+
+
+class FakeTimer:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def timeit(self, number):
+        return number * self.seconds
+
+
+class TestHarness(unittest.TestCase):
+    """Tests for the micro-benchmark harness."""
+
+    def test_run(self):
+        """Ensure every benchmark is timed per call."""
+        suite = Suite('test')
+        suite.add('noop', lambda: None)
+        with open(os.devnull, 'w') as out:
+            results = suite.run(repeat=2, out=out)
+        self.assertEqual(list(results), ['noop'])
+        self.assertGreater(results['noop']['number'], 1)
+        self.assertLessEqual(
+            results['noop']['best_us'], results['noop']['median_us'])
+
+    def test_run_around(self):
+        """Ensure a benchmark with `around` is timed inside its context."""
+        suite = Suite('test')
+        calls = []
+
+        @contextlib.contextmanager
+        def around():
+            calls.append('enter')
+            yield
+            calls.append('exit')
+        suite.add('plain', lambda: None)
+        suite.add('wrapped', lambda: calls.append('call'), around=around)
+        with open(os.devnull, 'w') as out:
+            suite.run(repeat=1, out=out)
+        self.assertEqual(calls[0], 'enter')
+        self.assertEqual(calls[-1], 'exit')
+        self.assertEqual(calls.count('enter'), 1)
+
+    def test_autorange(self):
+        """Ensure slow benchmarks are timed one call at a time."""
+        self.assertEqual(autorange(FakeTimer(1.0)), 1)
+        self.assertEqual(autorange(FakeTimer(0.15)), 2)
+        self.assertEqual(autorange(FakeTimer(0.001)), 200)
+
+    def test_compare(self):
+        """Ensure only slowdowns past the threshold are flagged."""
+        baseline = {'a': {'best_us': 10.0}, 'b': {'best_us': 10.0}}
+        results = {
+            'a': {'best_us': 10.5},
+            'b': {'best_us': 12.0},
+            'c': {'best_us': 99.0}
+        }
+        self.assertEqual(compare(results, baseline, 0.1), [('b', 10.0, 12.0)])
+
+    def test_main_saves_and_compares(self):
+        """Ensure main writes a baseline and fails against a faster one."""
+        suite = Suite('test')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            suite.run = lambda repeat, only: {
+                'noop': {'best_us': 1.0, 'median_us': 1.0, 'number': 1}}
+            self.assertEqual(main(suite, ['--save', path]), 0)
+            with open(path) as f:
+                self.assertEqual(json.load(f)['noop']['best_us'], 1.0)
+            suite.run = lambda repeat, only: {
+                'noop': {'best_us': 2.0, 'median_us': 2.0, 'number': 1}}
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(suite, ['--compare', path]), 1)
+            self.assertIn('slower: noop', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
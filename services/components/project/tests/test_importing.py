@@ -0,0 +1,178 @@
+# services/components/project/tests/test_importing.py
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from project import db
+from project.api.models import Component, components_version
+from project.importing import (
+    CheckpointMismatch, import_file, read_records, save_checkpoint,
+    validate)
+from project.tests.base import BaseTestCase
+
+
+FIELDS = ('name', 'description')
+CSV = ('\ufeffname,description,owner\n'
+       'aws,Amazon Web Services,red\n'
+       'Okta,"Okta\nidentity provider",blue\n'
+       ',Nameless,red\n'
+       'aws,AWS GovCloud,red\n'
+       'Splunk,Splunk log management,blue\n')
+
+
+def add_component(name, description):
+    component = Component(name=name, description=description)
+    db.session.add(component)
+    db.session.commit()
+    return component
+
+
+class TempDirMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            f.write(data)
+        return path
+
+
+class TestReadRecords(TempDirMixin, unittest.TestCase):
+    """Tests for reading and validating import files."""
+
+    def test_csv(self):
+        """Ensure CSV records come with the line they end on, byte order
+        mark stripped."""
+        records = list(read_records(self.write('components.csv', CSV), 'csv'))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], (2, {
+            'name': 'aws', 'description': 'Amazon Web Services',
+            'owner': 'red'}, None))
+        self.assertEqual(records[1][0], 4)
+        self.assertEqual(records[1][1]['description'],
+                         'Okta\nidentity provider')
+
+    def test_ndjson(self):
+        """Ensure blank lines are skipped and bad JSON reported."""
+        path = self.write('components.ndjson', '{"name": "a"}\n\n{oops\n')
+        records = list(read_records(path, 'ndjson'))
+        self.assertEqual(records[0], (1, {'name': 'a'}, None))
+        self.assertEqual(records[1][:2], (3, None))
+        self.assertIn('invalid JSON', records[1][2])
+
+    def test_validate(self):
+        """Ensure records missing a field, or with values the column cannot
+        hold, are rejected."""
+        columns = [Component.__table__.c[field] for field in FIELDS]
+        self.assertIsNone(validate(
+            {'name': 'a', 'description': 'b'}, columns))
+        self.assertIn('description is missing', validate(
+            {'name': 'a'}, columns))
+        self.assertIn('name is missing', validate(
+            {'name': 7, 'description': 'b'}, columns))
+        self.assertIn('longer than 256', validate(
+            {'name': 'a', 'description': 'b' * 257}, columns))
+        self.assertIn('NUL', validate(
+            {'name': 'a\x00', 'description': 'b'}, columns))
+        self.assertEqual(validate([1], columns), 'not an object')
+
+
+class TestImport(TempDirMixin, BaseTestCase):
+    """Tests for merging import files into the components table."""
+
+    def import_csv(self, **kwargs):
+        rejected = []
+        counts = import_file(
+            self.write('components.csv', CSV), 'csv', Component, FIELDS,
+            'name', components_version, 2, reject=rejected.append, **kwargs)
+        return counts, rejected
+
+    def test_import(self):
+        """Ensure valid records are added and repeated names skipped."""
+        add_component('Splunk', 'Splunk log management')
+        counts, rejected = self.import_csv()
+        self.assertEqual(
+            {key: counts[key] for key in
+             ('records', 'added', 'updated', 'skipped', 'invalid')},
+            {'records': 5, 'added': 2, 'updated': 0, 'skipped': 2,
+             'invalid': 1})
+        self.assertEqual(rejected, ['line 5: name is missing or not '
+                                    'a string'])
+        self.assertEqual(Component.query.count(), 3)
+        self.assertEqual(Component.query.filter_by(
+            name='aws').one().description, 'Amazon Web Services')
+
+    def test_import_update(self):
+        """Ensure --update overwrites changed rows, the last record for a
+        name winning."""
+        add_component('Splunk', 'Splunk log management')
+        add_component('Okta', 'Okta')
+        counts, _ = self.import_csv(update=True)
+        self.assertEqual((counts['added'], counts['updated'],
+                          counts['skipped']), (1, 2, 1))
+        self.assertEqual(Component.query.filter_by(
+            name='aws').one().description, 'AWS GovCloud')
+        self.assertEqual(Component.query.filter_by(
+            name='Okta').one().description, 'Okta\nidentity provider')
+
+    def test_import_update_detail(self):
+        """Ensure a component changed by an import is served fresh, though the
+        import cannot clear the workers' caches."""
+        component = add_component('Okta', 'Okta')
+        response = self.client.get(f'/components/{component.id}')
+        etag = response.headers['ETag']
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['description'], 'Okta')
+        self.import_csv(update=True)
+        response = self.client.get(f'/components/{component.id}',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['description'],
+                         'Okta\nidentity provider')
+
+    def test_resume(self):
+        """Ensure an import resumes after the records its checkpoint
+        covers, and removes the checkpoint when done."""
+        path = self.write('components.csv', CSV)
+        checkpoint = f'{path}.checkpoint'
+        stat = os.stat(path)
+        save_checkpoint(checkpoint, {
+            'source': {'path': os.path.abspath(path),
+                       'size': stat.st_size, 'mtime': stat.st_mtime},
+            'records': 4, 'added': 2, 'updated': 0, 'skipped': 1,
+            'invalid': 1})
+        counts = import_file(path, 'csv', Component, FIELDS, 'name',
+                             components_version, 2, checkpoint=checkpoint)
+        self.assertEqual((counts['records'], counts['added']), (5, 3))
+        self.assertEqual(
+            [component.name for component in Component.query.all()],
+            ['Splunk'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_checkpoint_mismatch(self):
+        """Ensure a checkpoint written for another file is refused."""
+        path = self.write('components.csv', CSV)
+        with open(f'{path}.checkpoint', 'w') as f:
+            json.dump({'source': {'path': 'other.csv'}, 'records': 4}, f)
+        with self.assertRaises(CheckpointMismatch):
+            import_file(path, 'csv', Component, FIELDS, 'name',
+                        components_version, 2,
+                        checkpoint=f'{path}.checkpoint')
+        self.assertEqual(Component.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
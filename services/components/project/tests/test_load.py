@@ -0,0 +1,48 @@
+# services/components/project/tests/test_load.py
+
+
+import unittest
+
+from project.tests.bench.load import compare, percentile_ms, summarize
+
+
+class TestLoad(unittest.TestCase):
+    """Tests for the load test report helpers."""
+
+    def test_percentiles(self):
+        """Ensure percentiles use the nearest rank."""
+        latencies = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(percentile_ms(latencies, 50), 50)
+        self.assertEqual(percentile_ms(latencies, 99), 99)
+        self.assertEqual(percentile_ms(latencies, 100), 100)
+        self.assertEqual(percentile_ms([0.004], 95), 4)
+        self.assertIsNone(percentile_ms([], 50))
+
+    def test_summarize(self):
+        """Ensure a summary reports throughput and percentiles."""
+        result = summarize([0.003, 0.001, 0.002, 0.004], 1, 2.0)
+        self.assertEqual(result['requests'], 4)
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(result['rps'], 2.0)
+        self.assertEqual(result['p50_ms'], 2)
+        self.assertEqual(result['max_ms'], 4)
+
+    def test_compare(self):
+        """Ensure regressions beyond the tolerance are reported."""
+        baseline = {'results': {
+            'ping': {'rps': 1000, 'p99_ms': 10},
+            'list': {'rps': 100, 'p99_ms': 50}
+        }}
+        report = {'results': {
+            'ping': {'rps': 900, 'p99_ms': 11},
+            'list': {'rps': 70, 'p99_ms': 80},
+            'post': {'rps': 10, 'p99_ms': 100}
+        }}
+        self.assertEqual(compare(report, baseline, 0.2), [
+            'list: rps 100 -> 70',
+            'list: p99 50 -> 80 ms'
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,6 @@
+# services/components/wsgi.py
+
+
+from project import create_app
+
+app = create_app()
@@ -0,0 +1,3 @@
+#!/bin/sh
+
+gunicorn -c gunicorn.conf.py wsgi:app
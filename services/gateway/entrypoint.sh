@@ -0,0 +1,3 @@
+#!/bin/sh
+
+python manage.py run -h 0.0.0.0
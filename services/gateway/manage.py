@@ -0,0 +1,52 @@
+# services/gateway/manage.py
+
+
+import subprocess
+import sys
+import unittest
+import coverage
+
+from flask.cli import FlaskGroup
+
+from project import create_app
+
+COV_INCLUDE = 'project/*'
+COV_OMIT = ['project/tests/*', 'project/config.py']
+COV = coverage.coverage(branch=True, include=COV_INCLUDE, omit=COV_OMIT)
+
+# the CLI's app; gunicorn serves wsgi:app, which skips this module
+app = create_app()
+cli = FlaskGroup(create_app=lambda script_info=None: app)
+
+
+@cli.command()
+def cov():
+    """Runs the unit tests with coverage."""
+    # trace a separate test process from its first import on, rather than
+    # every process that imports this module
+    status = subprocess.call([
+        sys.executable, '-m', 'coverage', 'run', '--branch',
+        f'--include={COV_INCLUDE}', f'--omit={",".join(COV_OMIT)}',
+        '-m', 'unittest', 'discover', '-v', '-s', 'project/tests'])
+    if status == 0:
+        COV.load()
+        print('Coverage Summary:')
+        COV.report()
+        COV.html_report()
+        COV.erase()
+        return 0
+    return 1
+
+
+@cli.command()
+def test():
+    """ Runs the tests without code coverage"""
+    tests = unittest.TestLoader().discover('project/tests', pattern='test*.py')
+    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    if result.wasSuccessful():
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    cli()
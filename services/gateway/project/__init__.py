@@ -0,0 +1,36 @@
+# services/gateway/project/__init__.py
+
+
+import os
+
+from flask import Flask
+
+from project.upstream import Upstreams
+
+
+# instantiate the upstream service clients
+upstreams = Upstreams()
+
+
+def create_app(script_info=None):
+
+    # instantiate the app
+    app = Flask(__name__)
+
+    # set config
+    app_settings = os.getenv('APP_SETTINGS')
+    app.config.from_object(app_settings)
+
+    # set up extensions
+    upstreams.init_app(app)
+
+    # register blueprints
+    from project.api.gateway import gateway_blueprint
+    app.register_blueprint(gateway_blueprint)
+
+    # shell context for flask cli
+    @app.shell_context_processor
+    def ctx():
+        return {'app': app}
+
+    return app
@@ -0,0 +1 @@
+# services/gateway/project/api/__init__.py
@@ -0,0 +1,86 @@
+# services/gateway/project/api/gateway.py
+
+
+from flask import Blueprint, jsonify, request
+
+from project import upstreams
+from project.upstream import UpstreamError
+
+
+# the backing services, each named after the resource it serves
+RESOURCES = ('users', 'roles', 'components')
+
+gateway_blueprint = Blueprint('gateway', __name__)
+
+
+@gateway_blueprint.route('/gateway/ping', methods=['GET'])
+def ping_pong():
+    return jsonify({
+        'status': 'success',
+        'message': 'pong!'
+    })
+
+
+@gateway_blueprint.route('/gateway/status', methods=['GET'])
+def upstream_status():
+    """Ping every upstream service concurrently"""
+    results = upstreams.fetch_all(
+        {name: (f'/{name}/ping', None) for name in RESOURCES})
+    data = {}
+    for name, result in results.items():
+        if isinstance(result, UpstreamError):
+            data[name] = {'status': 'fail', 'message': str(result)}
+            continue
+        status, body, seconds = result
+        data[name] = {
+            'status': body.get('status') if status == 200 else 'fail',
+            'elapsed_ms': round(seconds * 1000, 1)
+        }
+    healthy = all(item['status'] == 'success' for item in data.values())
+    response_object = {
+        'status': 'success' if healthy else 'fail',
+        'data': data
+    }
+    return jsonify(response_object), 200 if healthy else 503
+
+
+@gateway_blueprint.route('/gateway/overview', methods=['GET'])
+def overview():
+    """Get the first page of users, roles and components in one call
+
+    An upstream that fails or times out comes back as null, with the reason
+    under `errors`, rather than failing the whole response.
+    """
+    params = {}
+    if 'limit' in request.args:
+        params['limit'] = request.args['limit']
+    results = upstreams.fetch_all(
+        {name: (f'/{name}', params) for name in RESOURCES})
+    data = {'next': {}}
+    errors = {}
+    for name, result in results.items():
+        if not isinstance(result, UpstreamError):
+            status, body, seconds = result
+            if status == 400:
+                return jsonify(body), 400
+            if status == 200:
+                data[name] = body['data'][name]
+                data['next'][name] = body['data']['next']
+                continue
+            result = UpstreamError(f'status {status}')
+        data[name] = None
+        data['next'][name] = None
+        errors[name] = str(result)
+    if len(errors) == len(results):
+        response_object = {
+            'status': 'fail',
+            'message': 'No upstream service answered.',
+            'errors': errors
+        }
+        return jsonify(response_object), 502
+    response_object = {
+        'status': 'success',
+        'data': data,
+        'errors': errors
+    }
+    return jsonify(response_object), 200
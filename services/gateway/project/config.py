@@ -0,0 +1,38 @@
+# services/gateway/project/config.py
+
+
+import os
+
+
+class BaseConfig:
+    """Base configuration"""
+    TESTING = False
+    SECRET_KEY = 'my_precious'
+    # base URL of each backing service, keyed by the resource it serves
+    UPSTREAMS = {
+        'users': os.environ.get('USERS_SERVICE_URL', 'http://users:5000'),
+        'roles': os.environ.get('ROLES_SERVICE_URL', 'http://roles:5000'),
+        'components': os.environ.get(
+            'COMPONENTS_SERVICE_URL', 'http://components:5000')
+    }
+    # seconds each upstream call may take, connect included; a name in
+    # UPSTREAM_TIMEOUTS overrides UPSTREAM_TIMEOUT for that upstream
+    UPSTREAM_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', 2.0))
+    UPSTREAM_CONNECT_TIMEOUT = 0.5
+    UPSTREAM_TIMEOUTS = {}
+    # keep-alive connections kept open to each upstream, per worker
+    UPSTREAM_POOL_SIZE = 10
+
+
+class DevelopmentConfig(BaseConfig):
+    """Development configuration"""
+
+
+class TestingConfig(BaseConfig):
+    """Testing configuration"""
+    TESTING = True
+    UPSTREAM_TIMEOUT = 0.5
+
+
+class ProductionConfig(BaseConfig):
+    """Production configuration"""
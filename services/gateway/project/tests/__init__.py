@@ -0,0 +1 @@
+# services/gateway/project/tests/__init__.py
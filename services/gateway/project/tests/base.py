@@ -0,0 +1,81 @@
+# services/gateway/project/tests/base.py
+
+
+import threading
+import time
+
+from flask import Flask, jsonify, request
+from flask_testing import TestCase
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from project import create_app
+from project.api.gateway import RESOURCES
+
+app = create_app()
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args):
+        pass
+
+
+class StandIn:
+    """A local stand-in for one backing service, served over real HTTP.
+
+    Answers /<name> and /<name>/ping like the real service, after `delay`
+    seconds, and records the client port of every request so tests can
+    tell whether connections were reused.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.delay = 0
+        self.ports = []
+        standin = Flask(name)
+        standin.add_url_rule(f'/{name}', 'get_all', self.get_all)
+        standin.add_url_rule(f'/{name}/ping', 'ping', self.ping)
+        self.server = make_server(
+            '127.0.0.1', 0, standin, threaded=True,
+            request_handler=KeepAliveRequestHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def answer(self):
+        self.ports.append(request.environ['REMOTE_PORT'])
+        time.sleep(self.delay)
+
+    def ping(self):
+        self.answer()
+        return jsonify({'status': 'success', 'message': 'pong!'})
+
+    def get_all(self):
+        self.answer()
+        if request.args.get('limit') == '0':
+            return jsonify({
+                'status': 'fail',
+                'message': 'Invalid pagination parameters.'
+            }), 400
+        return jsonify({
+            'status': 'success',
+            'data': {self.name: [{'id': 1}], 'next': None}
+        })
+
+
+standins = {name: StandIn(name) for name in RESOURCES}
+
+
+class BaseTestCase(TestCase):
+    def create_app(self):
+        app.config.from_object('project.config.TestingConfig')
+        app.config['UPSTREAMS'] = {
+            name: standin.url for name, standin in standins.items()}
+        return app
+
+    def setUp(self):
+        for standin in standins.values():
+            standin.delay = 0
+            standin.ports.clear()
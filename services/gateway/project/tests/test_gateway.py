@@ -0,0 +1,100 @@
+# services/gateway/project/tests/test_gateway.py
+
+
+import json
+import socket
+import time
+import unittest
+
+from project.tests.base import BaseTestCase, standins
+
+
+class TestGatewayService(BaseTestCase):
+    """Tests for the Gateway Service."""
+
+    def test_ping(self):
+        """Ensure the /ping route behaves correctly."""
+        response = self.client.get('/gateway/ping')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pong!', data['message'])
+        self.assertIn('success', data['status'])
+
+    def test_status(self):
+        """Ensure /status pings every upstream service."""
+        response = self.client.get('/gateway/status')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('success', data['status'])
+        for name in standins:
+            self.assertEqual(data['data'][name]['status'], 'success')
+            self.assertIn('elapsed_ms', data['data'][name])
+
+    def test_overview(self):
+        """Ensure /overview merges a page from every upstream service."""
+        response = self.client.get('/gateway/overview?limit=1')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('success', data['status'])
+        self.assertEqual(data['errors'], {})
+        for name in standins:
+            self.assertEqual(data['data'][name], [{'id': 1}])
+            self.assertIsNone(data['data']['next'][name])
+
+    def test_overview_is_concurrent(self):
+        """Ensure upstream calls run at the same time, not one by one."""
+        for standin in standins.values():
+            standin.delay = 0.2
+        start = time.perf_counter()
+        response = self.client.get('/gateway/overview')
+        elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.2 * len(standins))
+
+    def test_overview_reuses_connections(self):
+        """Ensure upstream connections are kept alive between requests."""
+        self.client.get('/gateway/overview')
+        self.client.get('/gateway/overview')
+        for standin in standins.values():
+            self.assertEqual(len(standin.ports), 2)
+            self.assertEqual(standin.ports[0], standin.ports[1])
+
+    def test_overview_upstream_timeout(self):
+        """Ensure a slow upstream is cut off without failing the rest."""
+        standins['roles'].delay = 1
+        response = self.client.get('/gateway/overview')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('success', data['status'])
+        self.assertEqual(data['errors'], {'roles': 'timed out'})
+        self.assertIsNone(data['data']['roles'])
+        self.assertEqual(data['data']['users'], [{'id': 1}])
+
+    def test_overview_all_upstreams_down(self):
+        """Ensure /overview fails when no upstream service answers."""
+        # a port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        upstreams = self.app.config['UPSTREAMS']
+        self.app.config['UPSTREAMS'] = {
+            name: f'http://127.0.0.1:{port}' for name in upstreams}
+        try:
+            response = self.client.get('/gateway/overview')
+        finally:
+            self.app.config['UPSTREAMS'] = upstreams
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('fail', data['status'])
+        self.assertEqual(data['errors']['users'], 'unavailable')
+
+    def test_overview_invalid_pagination(self):
+        """Ensure an upstream's 400 is passed back to the client."""
+        response = self.client.get('/gateway/overview?limit=0')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid pagination parameters.', data['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
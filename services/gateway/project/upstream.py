@@ -0,0 +1,85 @@
+# services/gateway/project/upstream.py
+
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from flask import current_app
+
+
+class UpstreamError(Exception):
+    """An upstream call that produced no usable response."""
+
+
+class Upstreams:
+    """Pooled keep-alive HTTP clients for the backing services.
+
+    Each upstream host gets a urllib3 connection pool of UPSTREAM_POOL_SIZE
+    connections that stay open between requests.  fetch_all() issues its
+    calls from a thread pool and waits for them together, so a composite
+    request takes as long as its slowest upstream, not the sum of them, and
+    every call is cut off after its own timeout.
+    """
+
+    def __init__(self, app=None):
+        self.http = None
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        size = app.config['UPSTREAM_POOL_SIZE']
+        count = len(app.config['UPSTREAMS'])
+        self.http = urllib3.PoolManager(
+            num_pools=count, maxsize=size, retries=False,
+            headers={'Connection': 'keep-alive'})
+        self.executor = ThreadPoolExecutor(max_workers=size * count)
+
+    def timeout(self, name):
+        config = current_app.config
+        total = config['UPSTREAM_TIMEOUTS'].get(
+            name, config['UPSTREAM_TIMEOUT'])
+        return urllib3.Timeout(
+            connect=min(config['UPSTREAM_CONNECT_TIMEOUT'], total),
+            total=total)
+
+    def fetch_all(self, calls):
+        """Run `calls`, {name: (path, params)}, against the upstream of each
+        name concurrently.
+
+        Returns {name: (status, body, seconds)}, or {name: UpstreamError}
+        for the calls that timed out, failed to connect or did not answer
+        with JSON.
+        """
+        futures = {}
+        for name, (path, params) in calls.items():
+            url = current_app.config['UPSTREAMS'][name] + path
+            futures[name] = self.executor.submit(
+                self._fetch, url, params, self.timeout(name))
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except UpstreamError as error:
+                results[name] = error
+        return results
+
+    def _fetch(self, url, params, timeout):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(
+                'GET', url, fields=params, timeout=timeout)
+        except urllib3.exceptions.NewConnectionError:
+            # a subclass of ConnectTimeoutError in urllib3 1.x
+            raise UpstreamError('unavailable')
+        except urllib3.exceptions.TimeoutError:
+            raise UpstreamError('timed out')
+        except urllib3.exceptions.HTTPError:
+            raise UpstreamError('unavailable')
+        try:
+            body = json.loads(response.data.decode())
+        except ValueError:
+            raise UpstreamError(f'invalid response ({response.status})')
+        return response.status, body, time.perf_counter() - start
@@ -0,0 +1,6 @@
+# services/gateway/wsgi.py
+
+
+from project import create_app
+
+app = create_app()
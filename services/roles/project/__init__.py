@@ -4,11 +4,29 @@
 import os
 
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from werkzeug.utils import import_string
+
+from project.cache import Cache
+from project.compression import Compress
+from project.health import DatabaseProbe
+from project.metrics import Metrics
+from project.pool import PooledSQLAlchemy
 
 
 # # instantiate the db
-db = SQLAlchemy()
+db = PooledSQLAlchemy()
+
+# instantiate the read-through cache
+cache = Cache()
+
+# instantiate response compression
+compress = Compress()
+
+# instantiate request timing and the /metrics endpoint
+metrics = Metrics()
+
+# instantiate the cached readiness probe
+db_probe = DatabaseProbe()
 
 
 def create_app(script_info=None):
@@ -20,8 +38,17 @@ def create_app(script_info=None):
     app_settings = os.getenv('APP_SETTINGS')
     app.config.from_object(app_settings)
 
+    # set up the JSON provider used by project.serializers.jsonify
+    app.json_provider = import_string(app.config['JSON_PROVIDER'])()
+
     # set up extensions
     db.init_app(app)
+    cache.init_app(app)
+    # after_request hooks run last-registered first: set up metrics before
+    # compress so the recorded time includes compressing the body
+    metrics.init_app(app)
+    compress.init_app(app)
+    db_probe.init_app(app)
 
     # register blueprints
     from project.api.roles import roles_blueprint
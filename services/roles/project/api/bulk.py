@@ -0,0 +1,141 @@
+# services/roles/project/api/bulk.py
+
+
+import contextlib
+import io
+import itertools
+
+from flask import current_app
+from sqlalchemy import text
+
+from project import db
+from project.api.upsert import insert_new
+
+
+# indexes on a table that no constraint (such as the primary key) owns
+PLAIN_INDEXES = text(
+    'SELECT c.relname, pg_get_indexdef(i.indexrelid) '
+    'FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+    'WHERE i.indrelid = CAST(:table AS regclass) AND NOT EXISTS '
+    '(SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)')
+
+# COPY's text format: backslash escapes, \N for NULL, t/f for booleans
+COPY_ESCAPES = str.maketrans(
+    {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def bulk_insert(model, fields, key, duplicate_message, items):
+    """Insert a list of payload dicts into `model` in one transaction.
+
+    `fields` are the required string payload keys and `key` the natural key
+    used for duplicate detection.  Rows go out as multi-row
+    INSERT ... ON CONFLICT statements of BULK_INSERT_BATCH_SIZE rows, and
+    any row the database skipped is reported as a duplicate.  Returns the
+    number of rows added and one result per item, in order, matching what
+    the single-item POST would answer for it.  The caller commits.
+    """
+    results = [None] * len(items)
+    rows = {}
+    for i, item in enumerate(items):
+        if (not isinstance(item, dict) or
+                not all(isinstance(item.get(field), str)
+                        for field in fields)):
+            results[i] = {'status': 'fail', 'message': 'Invalid payload.'}
+        elif item[key] in rows:
+            results[i] = {'status': 'fail', 'message': duplicate_message}
+        else:
+            rows[item[key]] = i
+    batch_size = current_app.config['BULK_INSERT_BATCH_SIZE']
+    indexes = list(rows.values())
+    added = set()
+    for start in range(0, len(indexes), batch_size):
+        added |= insert_new(model, key, [
+            {field: items[i][field] for field in fields}
+            for i in indexes[start:start + batch_size]
+        ])
+    for value, i in rows.items():
+        if value in added:
+            results[i] = {
+                'status': 'success', 'message': f'{value} was added!'}
+        else:
+            results[i] = {'status': 'fail', 'message': duplicate_message}
+    return len(added), results
+
+
+def copy_value(value):
+    """`value` in COPY's text format, before escaping."""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    return str(value)
+
+
+def escape(value):
+    if value is None:
+        return '\\N'
+    return copy_value(value).translate(COPY_ESCAPES)
+
+
+def copy_text(rows, width):
+    """Encode `rows` of `width` values each in COPY's text format."""
+    text = '\n'.join([
+        '\t'.join([value if value.__class__ is str else copy_value(value)
+                   for value in row])
+        for row in rows]) + '\n'
+    # escaping value by value is slow and rarely needed: a batch holding
+    # only the tabs and newlines put there by the joins, and no backslash
+    # or carriage return, is already valid
+    if (text.count('\t') == len(rows) * (width - 1) and
+            text.count('\n') == len(rows) and
+            '\\' not in text and '\r' not in text):
+        return text
+    return ''.join('\t'.join(map(escape, row)) + '\n' for row in rows)
+
+
+def copy_rows(table, columns, rows, batch_size):
+    """Stream `rows`, tuples in `columns` order, into `table` with
+    COPY ... FROM STDIN.
+
+    Each COPY statement carries `batch_size` rows, so memory stays flat
+    however long `rows` is.  COPY runs on the session's connection, inside
+    its transaction, and skips the model layer: column defaults are not
+    applied.  Returns the number of rows copied.  The caller commits.
+    """
+    quote = db.engine.dialect.identifier_preparer.quote
+    statement = (f'COPY {quote(table)} '
+                 f'({", ".join(quote(column) for column in columns)}) '
+                 f'FROM STDIN')
+    rows = iter(rows)
+    total = 0
+    cursor = db.session.connection().connection.cursor()
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return total
+            cursor.copy_expert(
+                statement, io.StringIO(copy_text(batch, len(columns))))
+            total += len(batch)
+    finally:
+        cursor.close()
+
+
+@contextlib.contextmanager
+def deferred_indexes(table):
+    """Drop the plain indexes of `table` for the block and rebuild them
+    after it.
+
+    Building an index over rows already loaded is several times faster
+    than updating it row by row during a large COPY.  Both happen in the
+    session's transaction, which holds the table locked until it ends.
+    """
+    indexes = db.session.execute(PLAIN_INDEXES, {'table': table}).fetchall()
+    quote = db.engine.dialect.identifier_preparer.quote
+    for name, _ in indexes:
+        db.session.execute(f'DROP INDEX {quote(name)}')
+    yield
+    for _, definition in indexes:
+        db.session.execute(definition)
@@ -0,0 +1,45 @@
+# services/roles/project/api/lookup.py
+
+
+from flask import current_app, request
+from sqlalchemy import BigInteger, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from project.api.fields import select_columns
+
+
+# the ids are bound as bigint
+BIGINT_MIN, BIGINT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def get_ids():
+    """Parse the ?ids=1,2,3 batch lookup argument.
+
+    Returns None without the argument, otherwise the ids with duplicates
+    dropped and request order kept.  Raises ValueError if an id is not an
+    integer, is outside bigint, or there are more than LOOKUP_MAX_IDS of
+    them.
+    """
+    ids = request.args.get('ids')
+    if ids is None:
+        return None
+    ids = list(dict.fromkeys(int(id_) for id_ in ids.split(',')))
+    if len(ids) > current_app.config['LOOKUP_MAX_IDS']:
+        raise ValueError(f'too many ids: {len(ids)}')
+    for id_ in ids:
+        if not BIGINT_MIN <= id_ <= BIGINT_MAX:
+            raise ValueError(f'id out of range: {id_}')
+    return ids
+
+
+def lookup(model, columns, ids):
+    """Fetch `columns` of the `model` rows with `ids` in one query.
+
+    Returns the rows in the order of `ids` and the ids that matched no row.
+    """
+    query = select_columns(model, columns).filter(
+        model.id == any_(literal(ids, ARRAY(BigInteger))))
+    found = {row.id: row for row in query}
+    rows = [found[id_] for id_ in ids if id_ in found]
+    missing = [id_ for id_ in ids if id_ not in found]
+    return rows, missing
@@ -2,24 +2,62 @@
 
 
 from sqlalchemy import exc
-from flask import Blueprint, jsonify, request, render_template
+from flask import (Blueprint, Markup, abort, current_app, g, redirect,
+                   render_template, request, url_for)
 
-from project.api.models import Role
-from project import db
+from project.api.models import Role, roles_version
+from project.api.bulk import bulk_insert
+from project.api.fields import get_fields, select_columns
+from project.api.lookup import get_ids, lookup
+from project.api.pagination import get_page_args, paginate
+from project.api.streaming import ndjson_response
+from project.api.upsert import insert_new
+from project.api.versioning import (bump_version, conditional,
+                                    current_version)
+from project.replicas import replica_reads
+from project.serializers import ROWS, jsonify, jsonify_rows
+from project import db, cache, db_probe
 
 
+INVALID_FIELDS = {
+    'status': 'fail',
+    'message': 'Invalid fields parameter.'
+}
+INVALID_IDS = {
+    'status': 'fail',
+    'message': 'Invalid ids parameter.'
+}
+
 roles_blueprint = Blueprint('roles', __name__, template_folder='./templates')
 
 
 @roles_blueprint.route('/', methods=['GET', 'POST'])
+@replica_reads
 def index():
     if request.method == 'POST':
         name = request.form['name']
         description = request.form['description']
-        db.session.add(Role(name=name, description=description))
+        row = {'name': name, 'description': description}
+        insert_new(Role, 'name', [row])
+        bump_version(roles_version)
         db.session.commit()
-    roles = Role.query.all()
-    return render_template('index.html', roles=roles)
+        cache.clear()
+        return redirect(url_for('roles.index'))
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        abort(400)
+    # keyed on the table version too, so other workers' copies go stale
+    # with the first write anywhere
+    key = ('index', limit, after, current_version(roles_version))
+    listing = cache.get(key)
+    if listing is None:
+        query = db.session.query(Role.id, Role.name)
+        roles, next_id = paginate(query, Role.id, limit, after)
+        listing = Markup(render_template(
+            'listing.html', roles=roles, next_id=next_id))
+        cache.set(key, listing)
+    return render_template('index.html', listing=listing)
 
 
 @roles_blueprint.route('/roles/ping', methods=['GET'])
@@ -30,6 +68,32 @@ def ping_pong():
     })
 
 
+@roles_blueprint.route('/roles/health/live', methods=['GET'])
+def health_live():
+    """The worker is up and serving requests"""
+    return jsonify({
+        'status': 'success',
+        'message': 'alive'
+    })
+
+
+@roles_blueprint.route('/roles/health/ready', methods=['GET'])
+def health_ready():
+    """The database answers queries; the probe is cached per worker for
+    HEALTH_CHECK_INTERVAL seconds"""
+    database = db_probe.check()
+    if not database['ok']:
+        return jsonify({
+            'status': 'fail',
+            'message': 'Database unavailable.',
+            'data': {'database': database}
+        }), 503
+    return jsonify({
+        'status': 'success',
+        'data': {'database': database}
+    })
+
+
 @roles_blueprint.route('/roles', methods=['POST'])
 def add_role():
     post_data = request.get_json()
@@ -42,22 +106,75 @@ def add_role():
     name = post_data.get('name')
     description = post_data.get('description')
     try:
-        role = Role.query.filter_by(name=name).first()
-        if not role:
-            db.session.add(Role(name=name, description=description))
+        row = {'name': name, 'description': description}
+        if insert_new(Role, 'name', [row]):
+            bump_version(roles_version)
             db.session.commit()
+            cache.clear()
             response_object['status'] = 'success'
             response_object['message'] = f'{name} was added!'
             return jsonify(response_object), 201
         else:
             response_object['message'] = 'Sorry. That role already exists.'
             return jsonify(response_object), 400
-    except exc.IntegrityError as e:
+    except exc.IntegrityError:
         db.session.rollback()
         return jsonify(response_object), 400
 
 
+@roles_blueprint.route('/roles/bulk', methods=['POST'])
+def add_roles_bulk():
+    """Add a list of roles in one transaction"""
+    post_data = request.get_json()
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid payload.'
+    }
+    if (not isinstance(post_data, list) or not post_data or
+            len(post_data) > current_app.config['BULK_MAX_ITEMS']):
+        return jsonify(response_object), 400
+    try:
+        added, results = bulk_insert(
+            Role, ('name', 'description'), 'name',
+            'Sorry. That role already exists.', post_data)
+        if added:
+            bump_version(roles_version)
+        db.session.commit()
+    except exc.IntegrityError:
+        db.session.rollback()
+        return jsonify(response_object), 400
+    if added:
+        cache.clear()
+    response_object['message'] = (
+        f'{added} of {len(results)} roles were added.')
+    response_object['data'] = {'results': results}
+    if not added:
+        return jsonify(response_object), 400
+    response_object['status'] = 'success'
+    return jsonify(response_object), 201
+
+
+@roles_blueprint.route('/roles/_cache', methods=['GET'])
+def role_cache_stats():
+    """Report this worker's read-through cache counters"""
+    return jsonify({
+        'status': 'success',
+        'data': cache.stats()
+    })
+
+
+@roles_blueprint.route('/roles/_pool', methods=['GET'])
+def role_pool_stats():
+    """Report this worker's database connection pool statistics"""
+    return jsonify({
+        'status': 'success',
+        'data': db.engine.pool.to_json()
+    })
+
+
 @roles_blueprint.route('/roles/<role_id>', methods=['GET'])
+@replica_reads
+@conditional(roles_version)
 def get_single_role(role_id):
     """Get single role details"""
     response_object = {
@@ -65,30 +182,78 @@ def get_single_role(role_id):
         'message': 'Role does not exist'
     }
     try:
-        role = Role.query.filter_by(id=int(role_id)).first()
-        if not role:
-            return jsonify(response_object), 404
-        else:
-            response_object = {
-                'status': 'success',
-                'data': {
-                    'id': role.id,
-                    'name': role.name,
-                    'description': role.description
-                }
-            }
-            return jsonify(response_object), 200
+        columns = get_fields(Role)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    keys = tuple(column.key for column in columns)
+    try:
+        key = ('role', int(role_id), keys, g.version)
+        data = cache.get(key)
+        if data is None:
+            row = select_columns(Role, columns).filter(
+                Role.id == int(role_id)).first()
+            if not row:
+                return jsonify(response_object), 404
+            data = dict(zip(keys, row))
+            cache.set(key, data)
+        response_object = {
+            'status': 'success',
+            'data': data
+        }
+        return jsonify(response_object), 200
     except ValueError:
         return jsonify(response_object), 404
 
 
 @roles_blueprint.route('/roles', methods=['GET'])
+@replica_reads
+@conditional(roles_version)
 def get_all_roles():
-    """Get all roles"""
+    """Get one page of roles, or the roles listed in ?ids="""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid pagination parameters.'
+    }
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        return jsonify(response_object), 400
+    try:
+        columns = get_fields(Role)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    try:
+        ids = get_ids()
+    except ValueError:
+        return jsonify(INVALID_IDS), 400
+    if ids is not None:
+        roles, missing = lookup(Role, columns, ids)
+        response_object = {
+            'status': 'success',
+            'data': {
+                'roles': ROWS,
+                'missing': missing
+            }
+        }
+        return jsonify_rows(response_object, roles, columns), 200
+    query = select_columns(Role, columns)
+    roles, next_id = paginate(query, Role.id, limit, after)
     response_object = {
         'status': 'success',
         'data': {
-            'roles': [role.to_json() for role in Role.query.all()]
+            'roles': ROWS,
+            'next': next_id
         }
     }
-    return jsonify(response_object), 200
+    return jsonify_rows(response_object, roles, columns), 200
+
+
+@roles_blueprint.route('/roles/export', methods=['GET'])
+def export_roles():
+    """Stream every role as newline-delimited JSON"""
+    try:
+        columns = get_fields(Role)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    query = select_columns(Role, columns).order_by(Role.id)
+    return ndjson_response(query, columns)
@@ -0,0 +1,57 @@
+# services/roles/project/seed.py
+
+"""Deterministic sample roles for `manage.py seed-db --count`."""
+
+
+import datetime
+import random
+
+
+TITLES = (
+    ('ISSO', 'Information System Security Officer'),
+    ('ISSM', 'Information System Security Manager'),
+    ('AO', 'Authorizing Official'),
+    ('SO', 'System Owner'),
+    ('SCA', 'Security Control Assessor'),
+    ('CCP', 'Common Control Provider'),
+    ('PO', 'Privacy Officer'),
+    ('CISO', 'Chief Information Security Officer'),
+    ('Admin', 'System Administrator'),
+    ('Dev', 'Developer'),
+    ('Auditor', 'Auditor'),
+    ('Viewer', 'Read-only User'))
+SYSTEMS = (
+    'Payroll', 'HR Portal', 'Data Lake', 'Identity', 'Billing',
+    'Public Website', 'Case Management', 'Email', 'VPN', 'CRM',
+    'Grants', 'Procurement', 'Help Desk', 'Document Store')
+# creation dates are drawn from a pool spread over the year before EPOCH
+EPOCH = datetime.datetime(2018, 6, 1)
+DATES = 4096
+
+COLUMNS = ('name', 'description', 'created_date')
+
+
+def generate(count, seed=0):
+    """Yield `count` roles as tuples in COLUMNS order.
+
+    The same seed always yields the same rows.  The row number is part of
+    every name, so the names are unique.
+    """
+    rng = random.Random(seed)
+
+    def pick(options):
+        # what random.choices does, and several times quicker than choice
+        return options[int(rng.random() * len(options))]
+
+    # formatting a timestamp per row would cost more than the rest of it
+    dates = [
+        str(EPOCH - datetime.timedelta(seconds=rng.randrange(365 * 86400)))
+        for _ in range(DATES)]
+    for i in range(count):
+        short, title = pick(TITLES)
+        system = pick(SYSTEMS)
+        yield (
+            f'{short} {system} {i}',
+            f'{title}, {system}',
+            pick(dates),
+        )
@@ -0,0 +1 @@
+# services/roles/project/tests/bench/__init__.py
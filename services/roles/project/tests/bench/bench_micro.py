@@ -0,0 +1,142 @@
+# services/roles/project/tests/bench/bench_micro.py
+
+"""Micro-benchmarks of the model serialization and query paths.
+
+Run against the TestingConfig database, which is dropped and reseeded:
+
+    python -m project.tests.bench.bench_micro --save baseline.json
+    python -m project.tests.bench.bench_micro --compare baseline.json
+"""
+
+
+import itertools
+import sys
+
+from flask import jsonify
+from sqlalchemy import select
+
+from project import create_app, db
+from project.api.models import Role, roles_version
+from project.api.upsert import insert_new
+from project.api.versioning import bump_version
+from project.serializers import ROWS, jsonify_rows
+from project.tests.bench.bench_serialization import sample
+from project.tests.bench.harness import Suite, main
+from project.tests.bench.load import seed, writable_columns
+
+
+# one default page
+PAGE = 100
+SEED_ROWS = 1000
+
+app = create_app()
+app.config.from_object('project.config.TestingConfig')
+context = app.test_request_context()
+columns = [Role.__table__.c[key] for key in Role.json_keys]
+counter = itertools.count(SEED_ROWS)
+state = {}
+
+suite = Suite('roles')
+
+
+def new_row():
+    i = next(counter)
+    return {column.key: sample(column, i)
+            for column in writable_columns(Role)}
+
+
+def setup():
+    context.push()
+    seed(Role, roles_version, SEED_ROWS)
+    query = Role.query.order_by(Role.id).limit(PAGE)
+    state['roles'] = query.all()
+    query = db.session.query(*columns).order_by(Role.id).limit(PAGE)
+    state['rows'] = query.all()
+    state['dicts'] = [role.to_json() for role in state['roles']]
+    state['id'] = state['roles'][PAGE // 2].id
+
+
+def teardown():
+    db.session.remove()
+    db.drop_all()
+    context.pop()
+
+
+@suite.benchmark(f'to_json x{PAGE}')
+def to_json():
+    [role.to_json() for role in state['roles']]
+
+
+@suite.benchmark(f'jsonify envelope x{PAGE}')
+def jsonify_envelope():
+    jsonify({
+        'status': 'success',
+        'data': {'roles': state['dicts'], 'next': None}
+    })
+
+
+@suite.benchmark(f'jsonify_rows envelope x{PAGE}')
+def jsonify_rows_envelope():
+    jsonify_rows({
+        'status': 'success',
+        'data': {'roles': ROWS, 'next': None}
+    }, state['rows'], columns)
+
+
+@suite.benchmark('filter_by().first()')
+def filter_by_first():
+    db.session.expunge_all()
+    Role.query.filter_by(id=state['id']).first()
+
+
+@suite.benchmark('get()')
+def get():
+    db.session.expunge_all()
+    Role.query.get(state['id'])
+
+
+@suite.benchmark('get() identity map hit')
+def get_identity_map():
+    # the identity map holds objects weakly: keep this one alive
+    state['role'] = Role.query.get(state['id'])
+
+
+@suite.benchmark(f'orm hydration x{PAGE}')
+def orm_hydration():
+    db.session.expunge_all()
+    Role.query.order_by(Role.id).limit(PAGE).all()
+
+
+@suite.benchmark(f'column tuples x{PAGE}')
+def column_tuples():
+    db.session.query(*columns).order_by(Role.id).limit(PAGE).all()
+
+
+@suite.benchmark(f'core execute x{PAGE}')
+def core_execute():
+    db.session.execute(
+        select(columns).order_by(Role.id).limit(PAGE)).fetchall()
+
+
+@suite.benchmark('add: session.add + commit')
+def add_orm():
+    row = new_row()
+    db.session.add(Role(name=row['name'], description=row['description']))
+    db.session.commit()
+
+
+@suite.benchmark('add: insert_new + commit')
+def add_insert_new():
+    insert_new(Role, 'name', [new_row()])
+    db.session.commit()
+
+
+@suite.benchmark('add: insert_new + bump_version + commit')
+def add_endpoint_path():
+    insert_new(Role, 'name', [new_row()])
+    bump_version(roles_version)
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    sys.exit(main(suite, setup=setup, teardown=teardown))
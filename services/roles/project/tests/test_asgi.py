@@ -0,0 +1,113 @@
+# services/roles/project/tests/test_asgi.py
+
+
+import asyncio
+import unittest
+
+from project import db
+from project.api.models import Role
+from project.asgi import create_asgi_app
+from project.serializers import FastJSONProvider, JSONProvider
+from project.tests.base import BaseTestCase
+
+
+def add_role(name, description):
+    role = Role(name=name, description=description)
+    db.session.add(role)
+    db.session.commit()
+    return role
+
+
+class TestAsyncApp(BaseTestCase):
+    """Tests for the asyncio variant of the Roles Service."""
+
+    # the async app reads through its own asyncpg connections
+    transactional = False
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.asgi = create_asgi_app('project.config.TestingConfig')
+        self.loop.run_until_complete(self.asgi.startup())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.asgi.shutdown())
+        self.loop.close()
+        super().tearDown()
+
+    def get(self, path, query_string=b''):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string
+        }
+        self.loop.run_until_complete(self.asgi(scope, receive, send))
+        return messages[0]['status'], messages[1]['body']
+
+    def assertSameResponse(self, path, query_string=b''):
+        """Ensure the async app answers exactly like the Flask app."""
+        url = path + ('?' + query_string.decode() if query_string else '')
+        response = self.client.get(url)
+        status, body = self.get(path, query_string)
+        self.assertEqual(status, response.status_code)
+        self.assertEqual(body, response.data)
+
+    def test_ping(self):
+        """Ensure the /ping route matches the Flask app."""
+        self.assertSameResponse('/roles/ping')
+
+    def test_single_role(self):
+        """Ensure get single role matches the Flask app."""
+        role = add_role('ISSO', 'Information System Security Officer')
+        self.assertSameResponse(f'/roles/{role.id}')
+        self.assertSameResponse('/roles/999')
+        self.assertSameResponse('/roles/blah')
+        # past int4, and past int8
+        self.assertSameResponse('/roles/99999999999')
+        self.assertSameResponse('/roles/99999999999999999999')
+        self.assertSameResponse(f'/roles/{role.id}', b'fields=description')
+        self.assertSameResponse(f'/roles/{role.id}', b'fields=')
+
+    def test_all_roles(self):
+        """Ensure get all roles matches the Flask app page by page."""
+        add_role('ISSO', 'Information System Security Officer')
+        add_role('AO', 'Authorizing Official')
+        add_role('SO', 'System Owner')
+        self.assertSameResponse('/roles')
+        self.assertSameResponse('/roles', b'limit=2')
+        self.assertSameResponse('/roles', b'limit=2&after=2')
+        self.assertSameResponse('/roles', b'limit=0')
+        self.assertSameResponse('/roles', b'after=blah')
+        self.assertSameResponse('/roles', b'after=99999999999')
+        self.assertSameResponse('/roles', b'after=-99999999999999999999')
+        self.assertSameResponse('/roles', b'ids=1,99999999999999999999')
+        self.assertSameResponse('/roles', b'ids=1,3000000000')
+        self.assertSameResponse('/roles', b'fields=name&limit=1&after=1')
+        self.assertSameResponse('/roles', b'fields=id,description')
+        self.assertSameResponse('/roles', b'fields=bogus')
+        self.assertSameResponse('/roles', b'ids=3,99,1&fields=name')
+        self.assertSameResponse('/roles', b'ids=1,x')
+
+    def test_non_ascii(self):
+        """Ensure non-ASCII characters are escaped like the Flask app
+        escapes them, whichever JSON provider is configured."""
+        role = add_role('Responsable', 'Responsable de la sécurité')
+        provider = self.app.json_provider
+        self.addCleanup(setattr, self.app, 'json_provider', provider)
+        for provider in (JSONProvider(), FastJSONProvider()):
+            self.app.json_provider = self.asgi.json_provider = provider
+            self.assertSameResponse(f'/roles/{role.id}')
+            self.assertSameResponse('/roles')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# services/roles/project/tests/test_importing.py
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from project import db
+from project.api.models import Role, roles_version
+from project.importing import (
+    CheckpointMismatch, import_file, read_records, save_checkpoint,
+    validate)
+from project.tests.base import BaseTestCase
+
+
+FIELDS = ('name', 'description')
+CSV = ('\ufeffname,description,owner\n'
+       'AO,Authorizing Official,red\n'
+       'SO,"System\nOwner",blue\n'
+       ',Nameless,red\n'
+       'AO,Approving Official,red\n'
+       'ISSO,Information System Security Officer,blue\n')
+
+
+def add_role(name, description):
+    role = Role(name=name, description=description)
+    db.session.add(role)
+    db.session.commit()
+    return role
+
+
+class TempDirMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            f.write(data)
+        return path
+
+
+class TestReadRecords(TempDirMixin, unittest.TestCase):
+    """Tests for reading and validating import files."""
+
+    def test_csv(self):
+        """Ensure CSV records come with the line they end on, byte order
+        mark stripped."""
+        records = list(read_records(self.write('roles.csv', CSV), 'csv'))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], (2, {
+            'name': 'AO', 'description': 'Authorizing Official',
+            'owner': 'red'}, None))
+        self.assertEqual(records[1][0], 4)
+        self.assertEqual(records[1][1]['description'], 'System\nOwner')
+
+    def test_ndjson(self):
+        """Ensure blank lines are skipped and bad JSON reported."""
+        path = self.write('roles.ndjson', '{"name": "a"}\n\n{oops\n')
+        records = list(read_records(path, 'ndjson'))
+        self.assertEqual(records[0], (1, {'name': 'a'}, None))
+        self.assertEqual(records[1][:2], (3, None))
+        self.assertIn('invalid JSON', records[1][2])
+
+    def test_validate(self):
+        """Ensure records missing a field, or with values the column cannot
+        hold, are rejected."""
+        columns = [Role.__table__.c[field] for field in FIELDS]
+        self.assertIsNone(validate(
+            {'name': 'a', 'description': 'b'}, columns))
+        self.assertIn('description is missing', validate(
+            {'name': 'a'}, columns))
+        self.assertIn('name is missing', validate(
+            {'name': 7, 'description': 'b'}, columns))
+        self.assertIn('longer than 256', validate(
+            {'name': 'a', 'description': 'b' * 257}, columns))
+        self.assertIn('NUL', validate(
+            {'name': 'a\x00', 'description': 'b'}, columns))
+        self.assertEqual(validate([1], columns), 'not an object')
+
+
+class TestImport(TempDirMixin, BaseTestCase):
+    """Tests for merging import files into the roles table."""
+
+    def import_csv(self, **kwargs):
+        rejected = []
+        counts = import_file(
+            self.write('roles.csv', CSV), 'csv', Role, FIELDS, 'name',
+            roles_version, 2, reject=rejected.append, **kwargs)
+        return counts, rejected
+
+    def test_import(self):
+        """Ensure valid records are added and repeated names skipped."""
+        add_role('ISSO', 'Information System Security Officer')
+        counts, rejected = self.import_csv()
+        self.assertEqual(
+            {key: counts[key] for key in
+             ('records', 'added', 'updated', 'skipped', 'invalid')},
+            {'records': 5, 'added': 2, 'updated': 0, 'skipped': 2,
+             'invalid': 1})
+        self.assertEqual(rejected, ['line 5: name is missing or not '
+                                    'a string'])
+        self.assertEqual(Role.query.count(), 3)
+        self.assertEqual(Role.query.filter_by(
+            name='AO').one().description, 'Authorizing Official')
+
+    def test_import_update(self):
+        """Ensure --update overwrites changed rows, the last record for a
+        name winning."""
+        add_role('ISSO', 'Information System Security Officer')
+        add_role('SO', 'Owner')
+        counts, _ = self.import_csv(update=True)
+        self.assertEqual((counts['added'], counts['updated'],
+                          counts['skipped']), (1, 2, 1))
+        self.assertEqual(Role.query.filter_by(
+            name='AO').one().description, 'Approving Official')
+        self.assertEqual(Role.query.filter_by(
+            name='SO').one().description, 'System\nOwner')
+
+    def test_import_update_detail(self):
+        """Ensure a role changed by an import is served fresh, though the
+        import cannot clear the workers' caches."""
+        role = add_role('SO', 'Owner')
+        response = self.client.get(f'/roles/{role.id}')
+        etag = response.headers['ETag']
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['description'], 'Owner')
+        self.import_csv(update=True)
+        response = self.client.get(f'/roles/{role.id}',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['description'], 'System\nOwner')
+
+    def test_resume(self):
+        """Ensure an import resumes after the records its checkpoint
+        covers, and removes the checkpoint when done."""
+        path = self.write('roles.csv', CSV)
+        checkpoint = f'{path}.checkpoint'
+        stat = os.stat(path)
+        save_checkpoint(checkpoint, {
+            'source': {'path': os.path.abspath(path),
+                       'size': stat.st_size, 'mtime': stat.st_mtime},
+            'records': 4, 'added': 2, 'updated': 0, 'skipped': 1,
+            'invalid': 1})
+        counts = import_file(path, 'csv', Role, FIELDS, 'name',
+                             roles_version, 2, checkpoint=checkpoint)
+        self.assertEqual((counts['records'], counts['added']), (5, 3))
+        self.assertEqual([role.name for role in Role.query.all()],
+                         ['ISSO'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_checkpoint_mismatch(self):
+        """Ensure a checkpoint written for another file is refused."""
+        path = self.write('roles.csv', CSV)
+        with open(f'{path}.checkpoint', 'w') as f:
+            json.dump({'source': {'path': 'other.csv'}, 'records': 4}, f)
+        with self.assertRaises(CheckpointMismatch):
+            import_file(path, 'csv', Role, FIELDS, 'name', roles_version,
+                        2, checkpoint=f'{path}.checkpoint')
+        self.assertEqual(Role.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,13 @@
 import json
 import unittest
 
+from sqlalchemy import exc
+
 from project import db
-from project.api.models import Role
+from project.api.models import Role, TableVersion, roles_version
+from project.api.upsert import create_unique_index
+from project.api.versioning import (bump_version, create_version,
+                                    current_version)
 from project.tests.base import BaseTestCase
 
 
@@ -96,6 +101,84 @@ class TestRoleService(BaseTestCase):
                 'Sorry. That role already exists.', data['message'])
             self.assertIn('fail', data['status'])
 
+    def test_role_name_is_unique(self):
+        """Ensure the database rejects a duplicate name."""
+        add_role('ISSO', 'Information System Security Officer')
+        with self.assertRaises(exc.IntegrityError):
+            add_role('ISSO', 'Information System Security Officer')
+        db.session.rollback()
+
+    def test_create_unique_index(self):
+        """Ensure the unique index on name is added to a table that lacks
+        it, but not while duplicate names exist."""
+        index = next(index for index in Role.__table__.indexes
+                     if index.unique)
+        index.drop(db.session.connection())
+        first = add_role('ISSO', 'Information System Security Officer')
+        add_role('ISSO', 'Information System Security Officer')
+        self.assertEqual(create_unique_index(Role, 'name'), ['ISSO'])
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(create_unique_index(Role, 'name'), [])
+        with self.assertRaises(exc.IntegrityError):
+            add_role('ISSO', 'Information System Security Officer')
+        db.session.rollback()
+
+    def test_create_version(self):
+        """Ensure the version table is created when the database lacks it,
+        and left alone when it has it."""
+        TableVersion.__table__.drop(db.session.connection())
+        create_version()
+        self.assertEqual(current_version(roles_version), 0)
+        bump_version(roles_version)
+        create_version()
+        self.assertEqual(current_version(roles_version), 1)
+        bump_version(roles_version)
+        self.assertEqual(current_version(roles_version), 2)
+
+    def test_add_roles_bulk(self):
+        """Ensure a list of roles is added with one result per item."""
+        add_role('ISSO', 'Information System Security Officer')
+        with self.client:
+            response = self.client.post(
+                '/roles/bulk',
+                data=json.dumps([
+                    {'name': 'AO', 'description': 'Authorizing Official'},
+                    {'name': 'ISSO', 'description': 'Security Officer'},
+                    {'name': 'AO', 'description': 'Another Official'},
+                    {'name': 'SO'},
+                ]),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertIn('1 of 4 roles were added.', data['message'])
+            self.assertIn('success', data['status'])
+            results = data['data']['results']
+            self.assertEqual(
+                [result['status'] for result in results],
+                ['success', 'fail', 'fail', 'fail'])
+            self.assertIn('AO was added!', results[0]['message'])
+            for result in results[1:3]:
+                self.assertIn(
+                    'Sorry. That role already exists.', result['message'])
+            self.assertIn('Invalid payload.', results[3]['message'])
+        self.assertEqual(Role.query.count(), 2)
+
+    def test_add_roles_bulk_invalid_json(self):
+        """Ensure error is thrown if the bulk payload is not a list."""
+        with self.client:
+            for payload in [{}, [], 'blah']:
+                response = self.client.post(
+                    '/roles/bulk',
+                    data=json.dumps(payload),
+                    content_type='application/json',
+                )
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid payload.', data['message'])
+                self.assertIn('fail', data['status'])
+
     def test_single_role(self):
         """Ensure get single role behaves correctly."""
         role = add_role('ISSO', 'Information System Security Officer')
@@ -108,6 +191,43 @@ class TestRoleService(BaseTestCase):
             self.assertIn(desc_val, data['data']['description'])
             self.assertIn('success', data['status'])
 
+    def test_single_role_cached(self):
+        """Ensure get single role is served from the cache until a write."""
+        role = add_role('ISSO', 'Information System Security Officer')
+        with self.client:
+            response = self.client.get('/roles/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get(f'/roles/{role.id}')
+            self.client.get(f'/roles/{role.id}')
+            response = self.client.get('/roles/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data']['hits'] - before['hits'], 1)
+            self.assertEqual(data['data']['misses'] - before['misses'], 1)
+            self.assertEqual(data['data']['size'], 1)
+            self.client.post(
+                '/roles',
+                data=json.dumps(
+                    {'name': 'AO', 'description': 'Authorizing Official'}),
+                content_type='application/json',
+            )
+            response = self.client.get('/roles/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['size'], 0)
+
+    def test_role_pool_stats(self):
+        """Ensure the /_pool route reports connection pool statistics."""
+        with self.client:
+            self.client.get('/roles')
+            response = self.client.get('/roles/_pool')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(data['data']['size'], 2)
+            self.assertGreater(data['data']['checkouts'], 0)
+            latency = data['data']['checkout_latency']
+            self.assertEqual(latency['buckets']['+Inf'], latency['count'])
+
     def test_single_role_no_id(self):
         """Ensure error is thrown if an id is not provided."""
         with self.client:
@@ -144,6 +264,182 @@ class TestRoleService(BaseTestCase):
             self.assertIn(desc_val, data['data']['roles'][1]['description'])
             self.assertIn('success', data['status'])
 
+    def test_all_roles_paginated(self):
+        """Ensure get all roles pages through the table by id."""
+        add_role('ISSO', 'Information System Security Officer')
+        add_role('AO', 'Authorizing Official')
+        add_role('SO', 'System Owner')
+        with self.client:
+            response = self.client.get('/roles?limit=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['roles']), 2)
+            self.assertIn('ISSO', data['data']['roles'][0]['name'])
+            self.assertIn('AO', data['data']['roles'][1]['name'])
+            self.assertEqual(
+                data['data']['next'], data['data']['roles'][1]['id'])
+            response = self.client.get(
+                f'/roles?limit=2&after={data["data"]["next"]}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['roles']), 1)
+            self.assertIn('SO', data['data']['roles'][0]['name'])
+            self.assertIsNone(data['data']['next'])
+
+    def test_all_roles_invalid_pagination(self):
+        """Ensure error is thrown if the pagination arguments are invalid."""
+        with self.client:
+            for query in ['limit=0', 'limit=blah', 'limit=100000', 'after=x']:
+                response = self.client.get(f'/roles?{query}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(
+                    'Invalid pagination parameters.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_all_roles_fields(self):
+        """Ensure ?fields= returns only the requested columns."""
+        role = add_role('admin', 'Administrator')
+        add_role('viewer', 'Read only')
+        with self.client:
+            response = self.client.get('/roles?fields=description,id&limit=1')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                data['data']['roles'],
+                [{'id': role.id, 'description': 'Administrator'}])
+            response = self.client.get(
+                '/roles?fields=name&after=' + str(data['data']['next']))
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['roles'], [{'name': 'viewer'}])
+            self.assertIsNone(data['data']['next'])
+
+    def test_single_role_fields(self):
+        """Ensure ?fields= on get single role returns only those columns."""
+        role = add_role('admin', 'Administrator')
+        with self.client:
+            response = self.client.get(f'/roles/{role.id}?fields=name')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data'], {'name': 'admin'})
+            response = self.client.get(f'/roles/{role.id}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['description'], 'Administrator')
+
+    def test_roles_invalid_fields(self):
+        """Ensure error is thrown if ?fields= names an unknown column."""
+        role = add_role('admin', 'Administrator')
+        with self.client:
+            for path in ['/roles', f'/roles/{role.id}', '/roles/export']:
+                for fields in ['', 'id,password', 'created_date']:
+                    response = self.client.get(f'{path}?fields={fields}')
+                    data = json.loads(response.data.decode())
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(
+                        'Invalid fields parameter.', data['message'])
+                    self.assertIn('fail', data['status'])
+
+    def test_all_roles_by_ids(self):
+        """Ensure ?ids= returns those roles in order and reports the missing
+        ones."""
+        first = add_role('admin', 'Administrator')
+        second = add_role('viewer', 'Read only')
+        with self.client:
+            response = self.client.get(
+                f'/roles?ids={second.id},3000000000,{first.id},{second.id}'
+                '&fields=name')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(
+                data['data']['roles'], [{'name': 'viewer'}, {'name': 'admin'}])
+            self.assertEqual(data['data']['missing'], [3000000000])
+
+    def test_all_roles_invalid_ids(self):
+        """Ensure error is thrown if ?ids= is malformed, out of range or too
+        long."""
+        too_many = ','.join(str(i) for i in range(1, 1002))
+        with self.client:
+            for ids in ['', '1,blah', '1,,2', '1,99999999999999999999',
+                        too_many]:
+                response = self.client.get(f'/roles?ids={ids}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid ids parameter.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_export_roles(self):
+        """Ensure export streams every role as one JSON object per line."""
+        add_role('ISSO', 'Information System Security Officer')
+        add_role('AO', 'Authorizing Official')
+        response = self.client.get('/roles/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('ISSO', json.loads(lines[0])['name'])
+        self.assertIn('AO', json.loads(lines[1])['name'])
+
+    def test_all_roles_not_modified(self):
+        """Ensure get all roles answers a matching ETag with 304 until the
+        table changes."""
+        add_role('ISSO', 'Information System Security Officer')
+        with self.client:
+            response = self.client.get('/roles')
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+            response = self.client.get(
+                '/roles', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            self.client.post(
+                '/roles/bulk',
+                data=json.dumps([{}]),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                '/roles', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+
+    def test_single_role_etag_changes_on_write(self):
+        """Ensure a write changes the ETag of get single role."""
+        role = add_role('ISSO', 'Information System Security Officer')
+        with self.client:
+            response = self.client.get(f'/roles/{role.id}')
+            etag = response.headers['ETag']
+            self.client.post(
+                '/roles',
+                data=json.dumps(
+                    {'name': 'AO', 'description': 'Authorizing Official'}),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                f'/roles/{role.id}', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_query_budget(self):
+        """Ensure the JSON endpoints stay within their SQL statement budgets,
+        whatever the number of rows."""
+        ids = [add_role(f'role{i}', f'Role {i}').id
+               for i in range(20)]
+        with self.assertMaxQueries(2):
+            self.client.get('/roles')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/roles?ids={ids[0]},{ids[1]},{ids[2]}')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/roles/{ids[0]}')
+        with self.assertMaxQueries(1):
+            self.client.get(f'/roles/{ids[0]}')
+        with self.assertMaxQueries(2):
+            self.client.post(
+                '/roles',
+                data=json.dumps(
+                    {'name': 'admin', 'description': 'Administrators'}),
+                content_type='application/json',
+            )
+
     def test_main_no_roles(self):
         """Ensure the main route behaves correctly when no roles have been
         added to the database."""
@@ -179,6 +475,49 @@ class TestRoleService(BaseTestCase):
             self.assertNotIn(b'<p>No roles!</p>', response.data)
             self.assertIn(b'ISSO', response.data)
 
+    def test_main_paginated(self):
+        """Ensure the main route shows one page at a time with a link to
+        the next."""
+        first = add_role('admin', 'Administrator')
+        add_role('viewer', 'Read only')
+        with self.client:
+            response = self.client.get('/?limit=1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'admin', response.data)
+            self.assertNotIn(b'viewer', response.data)
+            self.assertIn(f'after={first.id}'.encode(), response.data)
+            response = self.client.get(f'/?limit=1&after={first.id}')
+            self.assertIn(b'viewer', response.data)
+            self.assertNotIn(b'Next page', response.data)
+            response = self.client.get('/?limit=blah')
+            self.assertEqual(response.status_code, 400)
+
+    def test_main_cached(self):
+        """Ensure the main route reuses the rendered page until a
+        write."""
+        add_role('admin', 'Administrator')
+        with self.client:
+            response = self.client.get('/roles/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get('/')
+            response = self.client.get('/')
+            self.assertIn(b'admin', response.data)
+            response = self.client.get('/roles/_cache')
+            data = json.loads(response.data.decode())['data']
+            self.assertEqual(data['hits'] - before['hits'], 1)
+            self.client.post(
+                '/', data=dict(name='viewer', description='Read only'))
+            response = self.client.get('/')
+            self.assertIn(b'viewer', response.data)
+
+    def test_main_add_role_redirects(self):
+        """Ensure the form post redirects back to the main route."""
+        with self.client:
+            response = self.client.post(
+                '/', data=dict(name='admin', description='Administrator'))
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response.location.endswith('/'))
+
 
 if __name__ == '__main__':
     unittest.main()
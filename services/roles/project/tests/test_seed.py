@@ -0,0 +1,69 @@
+# services/roles/project/tests/test_seed.py
+
+
+import unittest
+
+from project import db, seed
+from project.api.bulk import (
+    PLAIN_INDEXES, copy_rows, copy_text, deferred_indexes)
+from project.api.models import Role
+from project.tests.base import BaseTestCase
+
+
+class TestGenerate(unittest.TestCase):
+    """Tests for the generated sample roles."""
+
+    def test_deterministic(self):
+        """Ensure a seed always generates the same roles, and another seed
+        different ones."""
+        self.assertEqual(list(seed.generate(50, 7)),
+                         list(seed.generate(50, 7)))
+        self.assertNotEqual(list(seed.generate(50, 7)),
+                            list(seed.generate(50, 8)))
+
+    def test_unique_names(self):
+        """Ensure generated names do not repeat."""
+        names = [row[0] for row in seed.generate(5000)]
+        self.assertEqual(len(set(names)), 5000)
+
+    def test_copy_text_escapes(self):
+        """Ensure values holding COPY's delimiters are escaped, and the
+        rest passed through."""
+        self.assertEqual(copy_text([('a', True), ('b', None)], 2),
+                         'a\tt\nb\t\\N\n')
+        self.assertEqual(copy_text([('a\tb', 'c\nd\\')], 2),
+                         'a\\tb\tc\\nd\\\\\n')
+
+
+class TestCopy(BaseTestCase):
+    """Tests for loading rows with COPY."""
+
+    def test_copy_rows(self):
+        """Ensure rows are copied in batches and the indexes rebuilt."""
+        indexes = db.session.execute(
+            PLAIN_INDEXES, {'table': 'roles'}).fetchall()
+        with deferred_indexes('roles'):
+            self.assertFalse(db.session.execute(
+                PLAIN_INDEXES, {'table': 'roles'}).fetchall())
+            copied = copy_rows(
+                'roles', seed.COLUMNS, seed.generate(250), 100)
+        self.assertEqual(copied, 250)
+        self.assertEqual(Role.query.count(), 250)
+        self.assertEqual(db.session.execute(
+            PLAIN_INDEXES, {'table': 'roles'}).fetchall(), indexes)
+        name, description, _ = next(seed.generate(1))
+        role = Role.query.filter_by(name=name).one()
+        self.assertEqual(role.description, description)
+
+    def test_copy_rows_escaped(self):
+        """Ensure strings holding tabs, newlines and backslashes arrive
+        intact."""
+        description = 'tab\there\nnew line\\back\rslash'
+        copy_rows('roles', seed.COLUMNS,
+                  [('odd', description, '2018-01-01 00:00:00')], 10)
+        role = Role.query.filter_by(name='odd').one()
+        self.assertEqual(role.description, description)
+
+
+if __name__ == '__main__':
+    unittest.main()
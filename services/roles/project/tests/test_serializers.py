@@ -0,0 +1,100 @@
+# services/roles/project/tests/test_serializers.py
+
+
+import json
+import unittest
+
+from flask import jsonify
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+from project.serializers import (
+    ROWS, FastJSONProvider, JSONProvider, jsonify_rows, row_encoder)
+from project.tests.base import BaseTestCase
+
+
+COLUMNS = [
+    Column('id', Integer, nullable=False),
+    Column('name', String(128), nullable=False),
+    Column('active', Boolean, nullable=False),
+    Column('note', String(128), nullable=True),
+    Column('created', DateTime, nullable=True)
+]
+ROWS_IN = [
+    (1, 'plain', True, None, None),
+    (2, 'quote " and \\ and é中', False, 'nøte\n', None)
+]
+
+
+def as_dict(row):
+    return dict(zip((column.key for column in COLUMNS), row))
+
+
+class UTF8JSONProvider(JSONProvider):
+    """Writes non-ASCII characters unescaped, as orjson does."""
+
+    ensure_ascii = False
+
+
+class TestSerializers(BaseTestCase):
+    """Tests for the JSON serialization helpers."""
+
+    def use_provider(self, provider):
+        self.addCleanup(setattr, self.app, 'json_provider',
+                        self.app.json_provider)
+        self.app.json_provider = provider
+
+    def test_row_encoder_matches_json_dumps(self):
+        """Ensure row_encoder encodes a row exactly as json.dumps would."""
+        encode = row_encoder(COLUMNS)
+        for row in ROWS_IN:
+            self.assertEqual(
+                encode(row),
+                json.dumps(as_dict(row), sort_keys=True,
+                           separators=(',', ':')))
+
+    def test_jsonify_rows_matches_jsonify(self):
+        """Ensure jsonify_rows produces the same body as flask.jsonify."""
+        data = {'status': 'success', 'data': {'items': ROWS, 'next': None}}
+        expected = {'status': 'success',
+                    'data': {'items': [as_dict(row) for row in ROWS_IN],
+                             'next': None}}
+        # only the stdlib provider escapes like flask.jsonify
+        self.use_provider(JSONProvider())
+        self.addCleanup(setattr, self.app, 'debug', self.app.debug)
+        for debug in (False, True):
+            self.app.debug = debug
+            response = jsonify_rows(data, ROWS_IN, COLUMNS)
+            self.assertEqual(response.get_data(),
+                             jsonify(expected).get_data())
+            self.assertEqual(response.mimetype, 'application/json')
+
+    def test_row_encoder_unescaped(self):
+        """Ensure row_encoder leaves non-ASCII characters unescaped when
+        asked, exactly as json.dumps would."""
+        encode = row_encoder(COLUMNS, ensure_ascii=False)
+        self.assertIn('é中', encode(ROWS_IN[1]))
+        for row in ROWS_IN:
+            self.assertEqual(
+                encode(row),
+                json.dumps(as_dict(row), sort_keys=True,
+                           separators=(',', ':'), ensure_ascii=False))
+
+    def test_jsonify_rows_matches_provider(self):
+        """Ensure rows are escaped like the rest of the body, whichever
+        JSON provider is configured."""
+        data = {'status': 'success', 'note': 'josé', 'items': ROWS}
+        expected = {'status': 'success', 'note': 'josé',
+                    'items': [as_dict(row) for row in ROWS_IN]}
+        self.addCleanup(setattr, self.app, 'debug', self.app.debug)
+        for provider in (JSONProvider(), FastJSONProvider(),
+                         UTF8JSONProvider()):
+            self.use_provider(provider)
+            for debug in (False, True):
+                self.app.debug = debug
+                response = jsonify_rows(data, ROWS_IN, COLUMNS)
+                self.assertEqual(response.get_data(as_text=True),
+                                 provider.dumps(expected, debug))
+
+
+if __name__ == '__main__':
+    unittest.main()
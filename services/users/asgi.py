@@ -0,0 +1,6 @@
+# services/users/asgi.py
+
+
+from project.asgi import create_asgi_app
+
+app = create_asgi_app()
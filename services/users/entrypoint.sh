@@ -2,9 +2,7 @@
 
 echo "Waiting for postgres..."
 
-while ! nc -z users-db 5432; do
-  sleep 0.1
-done
+python manage.py wait-db || exit 1
 
 echo "PostgreSQL started"
 
@@ -0,0 +1,50 @@
+# services/users/gunicorn.conf.py
+
+
+import os
+
+
+def env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+# cores this container may actually run on, not every core on the host
+cores = len(os.sched_getaffinity(0))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# sync, gthread or gevent; gevent also needs gevent and psycogreen installed
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', cores * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# load the app once in the master so workers share its pages copy-on-write
+preload_app = env_flag('GUNICORN_PRELOAD', 'true')
+
+# recycle workers now and then, staggered so they do not all restart at
+# once; 0 turns recycling off, which needs the jitter off too since gunicorn
+# recycles after max_requests + jitter requests
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+if max_requests == 0:
+    max_requests_jitter = 0
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """Give every worker its own database connections.
+
+    With preload_app the engine, and any connection opened while loading,
+    belongs to the master; dispose of it so the worker opens fresh sockets
+    instead of sharing the master's.
+    """
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    if server.cfg.preload_app:
+        from project import db
+        db.get_engine(server.app.wsgi()).dispose()
@@ -5,13 +5,28 @@ from sqlalchemy.sql import func
 from project import db
 
 
+class TableVersion(db.Model):
+    """The version of each table, bumped by every transaction that writes
+    to it; see project.api.versioning"""
+
+    __tablename__ = "table_versions"
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+
+
+# the TableVersion row of the users table
+users_version = 'users'
+
+
 class User(db.Model):
 
     __tablename__ = "users"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     username = db.Column(db.String(128), nullable=False)
-    email = db.Column(db.String(128), nullable=False)
+    email = db.Column(
+        db.String(128), nullable=False, unique=True, index=True)
     active = db.Column(db.Boolean(), default=True, nullable=False)
     created_date = db.Column(db.DateTime, default=func.now(), nullable=False)
 
@@ -19,6 +34,9 @@ class User(db.Model):
         self.username = username
         self.email = email
 
+    # the columns to_json() exposes
+    json_keys = ('id', 'username', 'email', 'active')
+
     def to_json(self):
         return {
             'id': self.id,
@@ -0,0 +1,33 @@
+# services/users/project/api/pagination.py
+
+
+from flask import current_app, request
+
+
+def get_page_args():
+    """Parse the ?limit=&after= keyset pagination arguments.
+
+    Raises ValueError if either argument is malformed or out of range.
+    """
+    limit = int(request.args.get('limit', current_app.config['PAGE_SIZE']))
+    if not 0 < limit <= current_app.config['MAX_PAGE_SIZE']:
+        raise ValueError(f'limit out of range: {limit}')
+    after = request.args.get('after')
+    if after is not None:
+        after = int(after)
+    return limit, after
+
+
+def paginate(query, column, limit, after=None):
+    """Return one page of `query` ordered by `column` and the next cursor.
+
+    One extra row is fetched to tell whether another page follows; the
+    cursor is the key of the last row on this page, or None at the end.
+    """
+    if after is not None:
+        query = query.filter(column > after)
+    rows = query.order_by(column).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], column.key)
@@ -0,0 +1,43 @@
+# services/users/project/api/upsert.py
+
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from project import db
+
+
+def insert_new(model, key, rows):
+    """Insert `rows` into `model`, skipping any whose `key` already exists.
+
+    This is a single INSERT ... ON CONFLICT (key) DO NOTHING RETURNING key
+    against the unique index on `key`, so duplicate detection holds under
+    concurrent writers.  Returns the set of keys that were actually new.
+    """
+    column = getattr(model, key)
+    statement = insert(model.__table__).values(rows).on_conflict_do_nothing(
+        index_elements=[column]).returning(column)
+    return {value for value, in db.session.execute(statement)}
+
+
+def create_unique_index(model, key):
+    """Create the unique index on `key` that insert_new relies on, if the
+    table lacks it.
+
+    create_all only adds indexes to the tables it creates, so a table
+    made before the index was declared has none, and every ON CONFLICT
+    (key) fails.  Returns the values of `key` that occur more than once,
+    in which case nothing is created until they are resolved.
+    """
+    column = getattr(model, key)
+    index = next(index for index in model.__table__.indexes
+                 if index.unique and list(index.columns.keys()) == [key])
+    exists = db.session.execute(
+        text('SELECT to_regclass(:name)'), {'name': index.name}).scalar()
+    if exists:
+        return []
+    duplicates = [value for value, in db.session.query(column).group_by(
+        column).having(func.count() > 1).order_by(column)]
+    if not duplicates:
+        index.create(db.session.connection())
+    return duplicates
@@ -2,24 +2,62 @@
 
 
 from sqlalchemy import exc
-from flask import Blueprint, jsonify, request, render_template
+from flask import (Blueprint, Markup, abort, current_app, g, redirect,
+                   render_template, request, url_for)
 
-from project.api.models import User
-from project import db
+from project.api.models import User, users_version
+from project.api.bulk import bulk_insert
+from project.api.fields import get_fields, select_columns
+from project.api.lookup import get_ids, lookup
+from project.api.pagination import get_page_args, paginate
+from project.api.streaming import ndjson_response
+from project.api.upsert import insert_new
+from project.api.versioning import (bump_version, conditional,
+                                    current_version)
+from project.replicas import replica_reads
+from project.serializers import ROWS, jsonify, jsonify_rows
+from project import db, cache, db_probe
 
 
+INVALID_FIELDS = {
+    'status': 'fail',
+    'message': 'Invalid fields parameter.'
+}
+INVALID_IDS = {
+    'status': 'fail',
+    'message': 'Invalid ids parameter.'
+}
+
 users_blueprint = Blueprint('users', __name__, template_folder='./templates')
 
 
 @users_blueprint.route('/', methods=['GET', 'POST'])
+@replica_reads
 def index():
     if request.method == 'POST':
         username = request.form['username']
         email = request.form['email']
-        db.session.add(User(username=username, email=email))
+        row = {'username': username, 'email': email}
+        insert_new(User, 'email', [row])
+        bump_version(users_version)
         db.session.commit()
-    users = User.query.all()
-    return render_template('index.html', users=users)
+        cache.clear()
+        return redirect(url_for('users.index'))
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        abort(400)
+    # keyed on the table version too, so other workers' copies go stale
+    # with the first write anywhere
+    key = ('index', limit, after, current_version(users_version))
+    listing = cache.get(key)
+    if listing is None:
+        query = db.session.query(User.id, User.username)
+        users, next_id = paginate(query, User.id, limit, after)
+        listing = Markup(render_template(
+            'listing.html', users=users, next_id=next_id))
+        cache.set(key, listing)
+    return render_template('index.html', listing=listing)
 
 
 @users_blueprint.route('/users/ping', methods=['GET'])
@@ -30,6 +68,32 @@ def ping_pong():
     })
 
 
+@users_blueprint.route('/users/health/live', methods=['GET'])
+def health_live():
+    """The worker is up and serving requests"""
+    return jsonify({
+        'status': 'success',
+        'message': 'alive'
+    })
+
+
+@users_blueprint.route('/users/health/ready', methods=['GET'])
+def health_ready():
+    """The database answers queries; the probe is cached per worker for
+    HEALTH_CHECK_INTERVAL seconds"""
+    database = db_probe.check()
+    if not database['ok']:
+        return jsonify({
+            'status': 'fail',
+            'message': 'Database unavailable.',
+            'data': {'database': database}
+        }), 503
+    return jsonify({
+        'status': 'success',
+        'data': {'database': database}
+    })
+
+
 @users_blueprint.route('/users', methods=['POST'])
 def add_user():
     post_data = request.get_json()
@@ -42,22 +106,75 @@ def add_user():
     username = post_data.get('username')
     email = post_data.get('email')
     try:
-        user = User.query.filter_by(email=email).first()
-        if not user:
-            db.session.add(User(username=username, email=email))
+        row = {'username': username, 'email': email}
+        if insert_new(User, 'email', [row]):
+            bump_version(users_version)
             db.session.commit()
+            cache.clear()
             response_object['status'] = 'success'
             response_object['message'] = f'{email} was added!'
             return jsonify(response_object), 201
         else:
             response_object['message'] = 'Sorry. That email already exists.'
             return jsonify(response_object), 400
-    except exc.IntegrityError as e:
+    except exc.IntegrityError:
         db.session.rollback()
         return jsonify(response_object), 400
 
 
+@users_blueprint.route('/users/bulk', methods=['POST'])
+def add_users_bulk():
+    """Add a list of users in one transaction"""
+    post_data = request.get_json()
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid payload.'
+    }
+    if (not isinstance(post_data, list) or not post_data or
+            len(post_data) > current_app.config['BULK_MAX_ITEMS']):
+        return jsonify(response_object), 400
+    try:
+        added, results = bulk_insert(
+            User, ('username', 'email'), 'email',
+            'Sorry. That email already exists.', post_data)
+        if added:
+            bump_version(users_version)
+        db.session.commit()
+    except exc.IntegrityError:
+        db.session.rollback()
+        return jsonify(response_object), 400
+    if added:
+        cache.clear()
+    response_object['message'] = (
+        f'{added} of {len(results)} users were added.')
+    response_object['data'] = {'results': results}
+    if not added:
+        return jsonify(response_object), 400
+    response_object['status'] = 'success'
+    return jsonify(response_object), 201
+
+
+@users_blueprint.route('/users/_cache', methods=['GET'])
+def user_cache_stats():
+    """Report this worker's read-through cache counters"""
+    return jsonify({
+        'status': 'success',
+        'data': cache.stats()
+    })
+
+
+@users_blueprint.route('/users/_pool', methods=['GET'])
+def user_pool_stats():
+    """Report this worker's database connection pool statistics"""
+    return jsonify({
+        'status': 'success',
+        'data': db.engine.pool.to_json()
+    })
+
+
 @users_blueprint.route('/users/<user_id>', methods=['GET'])
+@replica_reads
+@conditional(users_version)
 def get_single_user(user_id):
     """Get single user details"""
     response_object = {
@@ -65,31 +182,78 @@ def get_single_user(user_id):
         'message': 'User does not exist'
     }
     try:
-        user = User.query.filter_by(id=int(user_id)).first()
-        if not user:
-            return jsonify(response_object), 404
-        else:
-            response_object = {
-                'status': 'success',
-                'data': {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'active': user.active
-                }
-            }
-            return jsonify(response_object), 200
+        columns = get_fields(User)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    keys = tuple(column.key for column in columns)
+    try:
+        key = ('user', int(user_id), keys, g.version)
+        data = cache.get(key)
+        if data is None:
+            row = select_columns(User, columns).filter(
+                User.id == int(user_id)).first()
+            if not row:
+                return jsonify(response_object), 404
+            data = dict(zip(keys, row))
+            cache.set(key, data)
+        response_object = {
+            'status': 'success',
+            'data': data
+        }
+        return jsonify(response_object), 200
     except ValueError:
         return jsonify(response_object), 404
 
 
 @users_blueprint.route('/users', methods=['GET'])
+@replica_reads
+@conditional(users_version)
 def get_all_users():
-    """Get all users"""
+    """Get one page of users, or the users listed in ?ids="""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid pagination parameters.'
+    }
+    try:
+        limit, after = get_page_args()
+    except ValueError:
+        return jsonify(response_object), 400
+    try:
+        columns = get_fields(User)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    try:
+        ids = get_ids()
+    except ValueError:
+        return jsonify(INVALID_IDS), 400
+    if ids is not None:
+        users, missing = lookup(User, columns, ids)
+        response_object = {
+            'status': 'success',
+            'data': {
+                'users': ROWS,
+                'missing': missing
+            }
+        }
+        return jsonify_rows(response_object, users, columns), 200
+    query = select_columns(User, columns)
+    users, next_id = paginate(query, User.id, limit, after)
     response_object = {
         'status': 'success',
         'data': {
-            'users': [user.to_json() for user in User.query.all()]
+            'users': ROWS,
+            'next': next_id
         }
     }
-    return jsonify(response_object), 200
+    return jsonify_rows(response_object, users, columns), 200
+
+
+@users_blueprint.route('/users/export', methods=['GET'])
+def export_users():
+    """Stream every user as newline-delimited JSON"""
+    try:
+        columns = get_fields(User)
+    except ValueError:
+        return jsonify(INVALID_FIELDS), 400
+    query = select_columns(User, columns).order_by(User.id)
+    return ndjson_response(query, columns)
@@ -0,0 +1,164 @@
+# services/users/project/pool.py
+
+
+import bisect
+import threading
+import time
+
+import sqlalchemy
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from project.replicas import PRIMARY_COOKIE, ReplicaSet, RoutingSession
+
+
+# upper bounds, in seconds, of the checkout latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """Counters for one connection pool, fed by SQLAlchemy pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+
+    def listen(self, pool):
+        event.listen(pool, 'connect', self.on_connect)
+        event.listen(pool, 'checkout', self.on_checkout)
+        event.listen(pool, 'checkin', self.on_checkin)
+        event.listen(pool, 'invalidate', self.on_invalidate)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record,
+                    connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds, waited):
+        with self._lock:
+            self.latency[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.latency_sum += seconds
+            if waited:
+                self.waits += 1
+
+    def to_json(self):
+        with self._lock:
+            buckets = {}
+            count = 0
+            for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), self.latency):
+                count += n
+                buckets[str(bound)] = count
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'waits': self.waits,
+                'checkout_latency': {
+                    'buckets': buckets,
+                    'count': count,
+                    'sum': self.latency_sum
+                }
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout takes and counts the
+    checkouts that had to wait for a connection to be returned."""
+
+    def __init__(self, creator, **kwargs):
+        # a recreated pool inherits its predecessor's event listeners
+        recreated = '_dispatch' in kwargs
+        super().__init__(creator, **kwargs)
+        if not recreated:
+            self.stats = PoolStats()
+            self.stats.listen(self)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        waited = (self.checkedin() == 0 and self._max_overflow > -1 and
+                  self.overflow() >= self._max_overflow)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(time.perf_counter() - start, waited)
+
+    def to_json(self):
+        data = {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'max_overflow': self._max_overflow
+        }
+        data.update(self.stats.to_json())
+        return data
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy whose engines use InstrumentedQueuePool and honour
+    SQLALCHEMY_POOL_PRE_PING.
+
+    Sessions are RoutingSessions.  Views wrapped in replica_reads send
+    their reads to the DATABASE_REPLICA_URLS, which get engines and pools
+    like the primary's but are not binds, so create_all never touches
+    them.
+    """
+
+    def init_app(self, app):
+        super().init_app(app)
+        app.extensions['replicas'] = ReplicaSet(
+            [self.create_replica_engine(app, url)
+             for url in app.config['DATABASE_REPLICA_URLS']],
+            app.config['REPLICA_CHECK_INTERVAL'],
+            app.config['HEALTH_CHECK_TIMEOUT'])
+
+        @app.after_request
+        def read_own_writes(response):
+            # later requests from this client go to the primary until the
+            # replicas have caught up with what it wrote
+            if app.extensions['replicas'] and self.session.info.get('wrote'):
+                response.set_cookie(
+                    PRIMARY_COOKIE, '1', httponly=True,
+                    max_age=app.config['READ_YOUR_WRITES_WINDOW'])
+            return response
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_replica_engine(self, app, url):
+        info = make_url(url)
+        options = {'convert_unicode': True}
+        self.apply_pool_defaults(app, options)
+        self.apply_driver_hacks(app, info, options)
+        return sqlalchemy.create_engine(info, **options)
+
+    def apply_driver_hacks(self, app, info, options):
+        super().apply_driver_hacks(app, info, options)
+        options.setdefault('poolclass', InstrumentedQueuePool)
+        options['pool_pre_ping'] = app.config['SQLALCHEMY_POOL_PRE_PING']
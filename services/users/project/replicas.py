@@ -0,0 +1,107 @@
+# services/users/project/replicas.py
+
+
+import functools
+import itertools
+
+from flask import current_app, request
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+from project.health import DatabaseProbe, probe_engine
+
+
+# set on a response to a write; the client reads from the primary while
+# it lasts
+PRIMARY_COOKIE = 'read_primary'
+
+
+class ReplicaSet:
+    """Read replicas, handed out round-robin.
+
+    Each replica has its own cached probe, so a worker sends each replica
+    at most one probe per REPLICA_CHECK_INTERVAL.  Probes connect outside
+    the replica's pool and give up after HEALTH_CHECK_TIMEOUT seconds.  A
+    replica whose last probe failed is skipped until a later one succeeds.
+    A connection that breaks or cannot be made counts as a failed probe.
+    """
+
+    def __init__(self, engines, interval, timeout):
+        self.replicas = []
+        for engine in engines:
+            probe = DatabaseProbe()
+            probe.interval = interval
+            event.listen(engine, 'handle_error',
+                         functools.partial(self.on_error, probe))
+            self.replicas.append(
+                (engine, probe, probe_engine(engine.url, timeout)))
+        self._turn = itertools.count()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    @staticmethod
+    def on_error(probe, context):
+        # no connection means connecting was what failed
+        if context.is_disconnect or context.connection is None:
+            probe.fail(' '.join(str(context.original_exception).split()))
+
+    def choose(self):
+        """Return the engine of the next healthy replica, or None."""
+        count = len(self.replicas)
+        start = next(self._turn)
+        for i in range(count):
+            engine, probe, prober = self.replicas[(start + i) % count]
+            if probe.check(prober)['ok']:
+                return engine
+        return None
+
+
+class RoutingSession(SignallingSession):
+    """Session that reads from a replica while `info['replica']` is set.
+
+    Flushes and INSERT, UPDATE and DELETE statements always go to the
+    primary.  They also set `info['wrote']`, after which every read goes
+    to the primary too, so a request reads its own writes.
+    """
+
+    def replica(self):
+        """Return the engine of the replica this request reads from, or
+        None when it reads from the primary.
+
+        The replica is picked once and kept in `info['replica_engine']`
+        until the request ends, so a request holds connections on one
+        replica's pool only.
+        """
+        if not self.info.get('replica') or self.info.get('wrote'):
+            return None
+        if 'replica_engine' not in self.info:
+            self.info['replica_engine'] = (
+                self.app.extensions['replicas'].choose())
+        return self.info['replica_engine']
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+        elif mapper is not None or clause is not None:
+            engine = self.replica()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+def replica_reads(view):
+    """Let `view` read from a replica when it answers a GET, unless the
+    client wrote within the last READ_YOUR_WRITES_WINDOW seconds."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        session = current_app.extensions['sqlalchemy'].db.session
+        if request.method == 'GET' and PRIMARY_COOKIE not in request.cookies:
+            session.info['replica'] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            session.info.pop('replica', None)
+            session.info.pop('replica_engine', None)
+    return wrapper
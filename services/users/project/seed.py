@@ -0,0 +1,57 @@
+# services/users/project/seed.py
+
+"""Deterministic sample users for `manage.py seed-db --count`."""
+
+
+import datetime
+import random
+
+
+FIRST_NAMES = (
+    'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael',
+    'linda', 'william', 'elizabeth', 'david', 'barbara', 'richard', 'susan',
+    'joseph', 'jessica', 'thomas', 'sarah', 'charles', 'karen', 'maria',
+    'wei', 'ahmed', 'olga', 'hiroshi', 'fatima', 'carlos', 'priya', 'kwame',
+    'ingrid', 'mateo', 'aisha', 'dmitri', 'leila', 'santiago', 'mei')
+LAST_NAMES = (
+    'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller',
+    'davis', 'rodriguez', 'martinez', 'hernandez', 'lopez', 'gonzalez',
+    'wilson', 'anderson', 'thomas', 'taylor', 'moore', 'jackson', 'martin',
+    'lee', 'perez', 'thompson', 'white', 'harris', 'nguyen', 'kim', 'patel',
+    'chen', 'singh', 'okafor', 'ivanova', 'tanaka', 'haddad', 'novak')
+DOMAINS = (
+    'example.com', 'example.org', 'example.net', 'agency.example.gov',
+    'corp.example.com', 'mail.example.edu')
+# creation dates are drawn from a pool spread over the year before EPOCH
+EPOCH = datetime.datetime(2018, 6, 1)
+DATES = 4096
+ACTIVE_RATIO = 0.95
+
+COLUMNS = ('username', 'email', 'active', 'created_date')
+
+
+def generate(count, seed=0):
+    """Yield `count` users as tuples in COLUMNS order.
+
+    The same seed always yields the same rows.  The row number is part of
+    every username and email, so the emails are unique.
+    """
+    rng = random.Random(seed)
+
+    def pick(options):
+        # what random.choices does, and several times quicker than choice
+        return options[int(rng.random() * len(options))]
+
+    # formatting a timestamp per row would cost more than the rest of it
+    dates = [
+        str(EPOCH - datetime.timedelta(seconds=rng.randrange(365 * 86400)))
+        for _ in range(DATES)]
+    for i in range(count):
+        first = pick(FIRST_NAMES)
+        last = pick(LAST_NAMES)
+        yield (
+            f'{first}{last}{i}',
+            f'{first}.{last}.{i}@{pick(DOMAINS)}',
+            rng.random() < ACTIVE_RATIO,
+            pick(dates),
+        )
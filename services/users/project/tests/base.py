@@ -1,22 +1,90 @@
 # services/users/project/tests/base.py
 
 
+from contextlib import contextmanager
+
 from flask_testing import TestCase
+from sqlalchemy import event
 
-from project import create_app, db
+from project import create_app, db, cache
 
 app = create_app()
 
 
 class BaseTestCase(TestCase):
+    """Runs each test inside a transaction that is rolled back afterwards.
+
+    The schema is created once per process.  db.session is bound to one
+    connection for the duration of a test, and the session works inside a
+    SAVEPOINT that is reopened whenever it commits or rolls back, so the
+    code under test can do either and nothing outlives the test.  Tests
+    whose rows must be seen from other connections set `transactional` to
+    False; their tables are truncated afterwards instead.
+    """
+
+    transactional = True
+    schema_created = False
+
     def create_app(self):
         app.config.from_object('project.config.TestingConfig')
         return app
 
     def setUp(self):
-        db.create_all()
-        db.session.commit()
+        cache.clear()
+        if not BaseTestCase.schema_created:
+            db.drop_all()
+            db.create_all()
+            db.session.commit()
+            BaseTestCase.schema_created = True
+        if self.transactional:
+            self.connection = db.engine.connect()
+            self.transaction = self.connection.begin()
+            self.session = db.session
+            db.session = db.create_scoped_session(
+                {'bind': self.connection, 'binds': {}})
+            event.listen(db.session, 'after_transaction_end',
+                         self.restart_savepoint)
+            db.session.begin_nested()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        if self.transactional:
+            db.session = self.session
+            self.transaction.rollback()
+            self.connection.close()
+        else:
+            tables = ', '.join(
+                table.name for table in db.metadata.sorted_tables)
+            db.session.execute(f'TRUNCATE {tables} RESTART IDENTITY')
+            db.session.commit()
+            db.session.remove()
+
+    @staticmethod
+    def restart_savepoint(session, transaction):
+        if transaction.nested and not transaction._parent.nested:
+            session.expire_all()
+            session.begin_nested()
+
+    @contextmanager
+    def assertMaxQueries(self, count):
+        """Fail if the block issues more than `count` SQL statements, e.g.
+
+            with self.assertMaxQueries(2):
+                self.client.get('/users')
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context,
+                   executemany):
+            # savepoints come from the test transaction, not the code
+            if 'SAVEPOINT' not in statement:
+                statements.append(statement)
+        event.listen(db.engine, 'after_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', record)
+        self.assertLessEqual(
+            len(statements), count,
+            f'{len(statements)} statements, expected at most {count}:\n' +
+            '\n'.join(statements))
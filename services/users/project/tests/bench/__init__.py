@@ -0,0 +1 @@
+# services/users/project/tests/bench/__init__.py
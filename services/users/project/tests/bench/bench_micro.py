@@ -0,0 +1,142 @@
+# services/users/project/tests/bench/bench_micro.py
+
+"""Micro-benchmarks of the model serialization and query paths.
+
+Run against the TestingConfig database, which is dropped and reseeded:
+
+    python -m project.tests.bench.bench_micro --save baseline.json
+    python -m project.tests.bench.bench_micro --compare baseline.json
+"""
+
+
+import itertools
+import sys
+
+from flask import jsonify
+from sqlalchemy import select
+
+from project import create_app, db
+from project.api.models import User, users_version
+from project.api.upsert import insert_new
+from project.api.versioning import bump_version
+from project.serializers import ROWS, jsonify_rows
+from project.tests.bench.bench_serialization import sample
+from project.tests.bench.harness import Suite, main
+from project.tests.bench.load import seed, writable_columns
+
+
+# one default page
+PAGE = 100
+SEED_ROWS = 1000
+
+app = create_app()
+app.config.from_object('project.config.TestingConfig')
+context = app.test_request_context()
+columns = [User.__table__.c[key] for key in User.json_keys]
+counter = itertools.count(SEED_ROWS)
+state = {}
+
+suite = Suite('users')
+
+
+def new_row():
+    i = next(counter)
+    return {column.key: sample(column, i)
+            for column in writable_columns(User)}
+
+
+def setup():
+    context.push()
+    seed(User, users_version, SEED_ROWS)
+    query = User.query.order_by(User.id).limit(PAGE)
+    state['users'] = query.all()
+    query = db.session.query(*columns).order_by(User.id).limit(PAGE)
+    state['rows'] = query.all()
+    state['dicts'] = [user.to_json() for user in state['users']]
+    state['id'] = state['users'][PAGE // 2].id
+
+
+def teardown():
+    db.session.remove()
+    db.drop_all()
+    context.pop()
+
+
+@suite.benchmark(f'to_json x{PAGE}')
+def to_json():
+    [user.to_json() for user in state['users']]
+
+
+@suite.benchmark(f'jsonify envelope x{PAGE}')
+def jsonify_envelope():
+    jsonify({
+        'status': 'success',
+        'data': {'users': state['dicts'], 'next': None}
+    })
+
+
+@suite.benchmark(f'jsonify_rows envelope x{PAGE}')
+def jsonify_rows_envelope():
+    jsonify_rows({
+        'status': 'success',
+        'data': {'users': ROWS, 'next': None}
+    }, state['rows'], columns)
+
+
+@suite.benchmark('filter_by().first()')
+def filter_by_first():
+    db.session.expunge_all()
+    User.query.filter_by(id=state['id']).first()
+
+
+@suite.benchmark('get()')
+def get():
+    db.session.expunge_all()
+    User.query.get(state['id'])
+
+
+@suite.benchmark('get() identity map hit')
+def get_identity_map():
+    # the identity map holds objects weakly: keep this one alive
+    state['user'] = User.query.get(state['id'])
+
+
+@suite.benchmark(f'orm hydration x{PAGE}')
+def orm_hydration():
+    db.session.expunge_all()
+    User.query.order_by(User.id).limit(PAGE).all()
+
+
+@suite.benchmark(f'column tuples x{PAGE}')
+def column_tuples():
+    db.session.query(*columns).order_by(User.id).limit(PAGE).all()
+
+
+@suite.benchmark(f'core execute x{PAGE}')
+def core_execute():
+    db.session.execute(
+        select(columns).order_by(User.id).limit(PAGE)).fetchall()
+
+
+@suite.benchmark('add: session.add + commit')
+def add_orm():
+    row = new_row()
+    db.session.add(User(username=row['username'], email=row['email']))
+    db.session.commit()
+
+
+@suite.benchmark('add: insert_new + commit')
+def add_insert_new():
+    insert_new(User, 'email', [new_row()])
+    db.session.commit()
+
+
+@suite.benchmark('add: insert_new + bump_version + commit')
+def add_endpoint_path():
+    insert_new(User, 'email', [new_row()])
+    bump_version(users_version)
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    sys.exit(main(suite, setup=setup, teardown=teardown))
@@ -0,0 +1,52 @@
+# services/users/project/tests/bench/bench_serialization.py
+
+"""Compare list-endpoint serialization strategies on 100k in-memory rows.
+
+    python -m project.tests.bench.bench_serialization
+"""
+
+
+import json
+import timeit
+
+from project.api.models import User
+from project.serializers import FastJSONProvider, JSONProvider, row_encoder
+
+
+COUNT = 100000
+
+
+def sample(column, i):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return i % 2 == 0
+    if python_type is int:
+        return i
+    return f'{column.key}-{i}'
+
+
+def main():
+    columns = [User.__table__.c[key] for key in User.json_keys]
+    rows = [tuple(sample(column, i) for column in columns)
+            for i in range(COUNT)]
+    keys = [column.key for column in columns]
+    encode = row_encoder(columns)
+    stdlib, fast = JSONProvider(), FastJSONProvider()
+
+    cases = {
+        'dict + json.dumps': lambda: json.dumps(
+            [dict(zip(keys, row)) for row in rows],
+            separators=(',', ':'), sort_keys=True),
+        'dict + FastJSONProvider': lambda: fast.dumps(
+            [dict(zip(keys, row)) for row in rows]),
+        'row_encoder': lambda: '[' + ','.join(map(encode, rows)) + ']'
+    }
+    baseline = stdlib.dumps([dict(zip(keys, row)) for row in rows])
+    assert json.loads(cases['row_encoder']()) == json.loads(baseline)
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=5))
+        print(f'{name:<26} {best * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# services/users/project/tests/bench/bench_startup.py
+
+"""Startup time and per-request overhead, with and without coverage
+tracing.
+
+Startup is timed in fresh interpreters: importing wsgi (what gunicorn
+loads), importing manage (what the CLI loads) and importing wsgi with a
+coverage tracer already running, as every worker used to when gunicorn
+loaded manage:app.  Requests go through the test client against the
+TestingConfig database, which is dropped and reseeded.
+
+    python -m project.tests.bench.bench_startup --save startup.json
+"""
+
+
+import contextlib
+import subprocess
+import sys
+
+import coverage
+
+from project import db
+from project.api.models import User, users_version
+from project.tests.bench.harness import Suite, main
+from project.tests.bench.load import seed
+from wsgi import app
+
+
+SEED_ROWS = 100
+TRACE = ("import coverage; "
+         "coverage.coverage(branch=True, include='project/*').start(); ")
+
+app.config.from_object('project.config.TestingConfig')
+context = app.app_context()
+client = app.test_client()
+
+suite = Suite('users startup')
+
+
+def python(code):
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+@contextlib.contextmanager
+def traced():
+    tracer = coverage.coverage(branch=True, include='project/*')
+    tracer.start()
+    try:
+        yield
+    finally:
+        tracer.stop()
+
+
+def setup():
+    context.push()
+    seed(User, users_version, SEED_ROWS)
+    db.session.remove()
+
+
+def teardown():
+    db.session.remove()
+    db.drop_all()
+    context.pop()
+
+
+suite.add('startup: import wsgi', lambda: python('import wsgi'))
+suite.add('startup: import wsgi, traced',
+          lambda: python(TRACE + 'import wsgi'))
+suite.add('startup: import manage', lambda: python('import manage'))
+
+
+def ping():
+    client.get('/users/ping')
+
+
+def list_users():
+    client.get('/users')
+
+
+suite.add('request: GET /users/ping', ping)
+suite.add('request: GET /users/ping, traced', ping, around=traced)
+suite.add(f'request: GET /users x{SEED_ROWS}', list_users)
+suite.add(f'request: GET /users x{SEED_ROWS}, traced', list_users,
+          around=traced)
+
+
+if __name__ == '__main__':
+    sys.exit(main(suite, setup=setup, teardown=teardown))
@@ -0,0 +1,121 @@
+# services/users/project/tests/bench/harness.py
+
+"""A small timeit harness with stored baselines.
+
+Each benchmark is timed with timeit's autorange (enough calls to take at
+least 0.2 s) and then repeated; the best run per call is the figure that
+gets saved and compared, being the least disturbed by the rest of the
+machine.  Baselines are only comparable on the machine that wrote them.
+"""
+
+
+import argparse
+import contextlib
+import json
+import statistics
+import sys
+import timeit
+
+
+class Suite:
+    """Named benchmarks, each a function to call repeatedly."""
+
+    def __init__(self, name):
+        self.name = name
+        self.benchmarks = {}
+        self.around = {}
+
+    def add(self, name, func, around=None):
+        """Add `func` as benchmark `name`; `around`, if given, returns a
+        context manager to time it in, such as a tracer."""
+        self.benchmarks[name] = func
+        if around is not None:
+            self.around[name] = around
+
+    def benchmark(self, name, around=None):
+        """Decorator form of add()."""
+        def register(func):
+            self.add(name, func, around)
+            return func
+        return register
+
+    def run(self, repeat=5, only=None, out=sys.stderr):
+        results = {}
+        for name, func in self.benchmarks.items():
+            if only and only not in name:
+                continue
+            around = self.around.get(name, contextlib.ExitStack)
+            with around():
+                timer = timeit.Timer(func)
+                number = autorange(timer)
+                times = [t / number for t in timer.repeat(repeat, number)]
+            results[name] = {
+                'best_us': round(min(times) * 1e6, 3),
+                'median_us': round(statistics.median(times) * 1e6, 3),
+                'number': number
+            }
+            print(f'{name:<40} {results[name]["best_us"]:>12.3f} us',
+                  file=out)
+        return results
+
+
+def autorange(timer, minimum=0.2):
+    """The number of calls that take at least `minimum` seconds, stepping
+    1, 2, 5, 10, ... like timeit's autorange since Python 3.7; before that
+    it starts at 10 calls, too many for benchmarks that take seconds."""
+    i = 1
+    while True:
+        for j in 1, 2, 5:
+            number = i * j
+            if timer.timeit(number) >= minimum:
+                return number
+        i *= 10
+
+
+def compare(results, baseline, threshold):
+    """Return (name, before_us, after_us) for every benchmark more than
+    `threshold` (a fraction) slower than in `baseline`."""
+    slower = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['best_us'] > before['best_us'] * (1 + threshold):
+            slower.append((name, before['best_us'], result['best_us']))
+    return slower
+
+
+def main(suite, argv=None, setup=None, teardown=None):
+    """Command line entry point: run `suite`, optionally saving the results
+    as a baseline or comparing them with one.  Returns the exit status."""
+    parser = argparse.ArgumentParser(description=f'{suite.name} benchmarks')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='flag benchmarks slower than the FILE baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown as a fraction (default 0.1)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', metavar='TEXT',
+                        help='run only benchmarks whose name contains TEXT')
+    args = parser.parse_args(argv)
+    if setup is not None:
+        setup()
+    try:
+        results = suite.run(args.repeat, args.only)
+    finally:
+        if teardown is not None:
+            teardown()
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold)
+        for name, before, after in slower:
+            print(f'slower: {name} {before:.3f} -> {after:.3f} us '
+                  f'(+{(after / before - 1) * 100:.0f}%)')
+        return 1 if slower else 0
+    return 0
@@ -0,0 +1,113 @@
+# services/users/project/tests/test_asgi.py
+
+
+import asyncio
+import unittest
+
+from project import db
+from project.api.models import User
+from project.asgi import create_asgi_app
+from project.serializers import FastJSONProvider, JSONProvider
+from project.tests.base import BaseTestCase
+
+
+def add_user(username, email):
+    user = User(username=username, email=email)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestAsyncApp(BaseTestCase):
+    """Tests for the asyncio variant of the Users Service."""
+
+    # the async app reads through its own asyncpg connections
+    transactional = False
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.asgi = create_asgi_app('project.config.TestingConfig')
+        self.loop.run_until_complete(self.asgi.startup())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.asgi.shutdown())
+        self.loop.close()
+        super().tearDown()
+
+    def get(self, path, query_string=b''):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string
+        }
+        self.loop.run_until_complete(self.asgi(scope, receive, send))
+        return messages[0]['status'], messages[1]['body']
+
+    def assertSameResponse(self, path, query_string=b''):
+        """Ensure the async app answers exactly like the Flask app."""
+        url = path + ('?' + query_string.decode() if query_string else '')
+        response = self.client.get(url)
+        status, body = self.get(path, query_string)
+        self.assertEqual(status, response.status_code)
+        self.assertEqual(body, response.data)
+
+    def test_ping(self):
+        """Ensure the /ping route matches the Flask app."""
+        self.assertSameResponse('/users/ping')
+
+    def test_single_user(self):
+        """Ensure get single user matches the Flask app."""
+        user = add_user('michael', 'michael@mherman.org')
+        self.assertSameResponse(f'/users/{user.id}')
+        self.assertSameResponse('/users/999')
+        self.assertSameResponse('/users/blah')
+        # past int4, and past int8
+        self.assertSameResponse('/users/99999999999')
+        self.assertSameResponse('/users/99999999999999999999')
+        self.assertSameResponse(f'/users/{user.id}', b'fields=email')
+        self.assertSameResponse(f'/users/{user.id}', b'fields=')
+
+    def test_all_users(self):
+        """Ensure get all users matches the Flask app page by page."""
+        add_user('michael', 'michael@mherman.org')
+        add_user('fletcher', 'fletcher@notreal.com')
+        add_user('rick', 'rick@notreal.com')
+        self.assertSameResponse('/users')
+        self.assertSameResponse('/users', b'limit=2')
+        self.assertSameResponse('/users', b'limit=2&after=2')
+        self.assertSameResponse('/users', b'limit=0')
+        self.assertSameResponse('/users', b'after=blah')
+        self.assertSameResponse('/users', b'after=99999999999')
+        self.assertSameResponse('/users', b'after=-99999999999999999999')
+        self.assertSameResponse('/users', b'ids=1,99999999999999999999')
+        self.assertSameResponse('/users', b'ids=1,3000000000')
+        self.assertSameResponse('/users', b'fields=username&limit=1&after=1')
+        self.assertSameResponse('/users', b'fields=id,email')
+        self.assertSameResponse('/users', b'fields=bogus')
+        self.assertSameResponse('/users', b'ids=3,99,1&fields=username')
+        self.assertSameResponse('/users', b'ids=1,x')
+
+    def test_non_ascii(self):
+        """Ensure non-ASCII characters are escaped like the Flask app
+        escapes them, whichever JSON provider is configured."""
+        user = add_user('josé', 'josé@example.com')
+        provider = self.app.json_provider
+        self.addCleanup(setattr, self.app, 'json_provider', provider)
+        for provider in (JSONProvider(), FastJSONProvider()):
+            self.app.json_provider = self.asgi.json_provider = provider
+            self.assertSameResponse(f'/users/{user.id}')
+            self.assertSameResponse('/users')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -49,6 +49,16 @@ class TestProductionConfig(TestCase):
     def test_app_is_production(self):
         self.assertTrue(app.config['SECRET_KEY'] == 'my_precious')
         self.assertFalse(app.config['TESTING'])
+        self.assertTrue(app.config['SQLALCHEMY_POOL_PRE_PING'])
+        self.assertLess(app.config['REPEATED_QUERY_SAMPLE_RATE'], 1)
+        self.assertTrue(
+            app.config['SQLALCHEMY_POOL_SIZE'] ==
+            int(os.environ.get('DATABASE_POOL_SIZE', 10))
+        )
+        self.assertEqual(
+            app.config['DATABASE_REPLICA_URLS'],
+            os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+            if os.environ.get('DATABASE_REPLICA_URLS') else [])
 
 
 if __name__ == '__main__':
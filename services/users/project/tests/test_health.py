@@ -0,0 +1,136 @@
+# services/users/project/tests/test_health.py
+
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, exc
+
+from project import db, db_probe
+from project.health import DatabaseProbe, probe, wait_for_db
+from project.tests.base import BaseTestCase
+
+
+# nothing listens on port 1
+UNREACHABLE = 'postgresql://postgres@127.0.0.1:1/users'
+
+
+class TestHealth(BaseTestCase):
+    """Tests for the liveness and readiness endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        db_probe.reset()
+
+    def test_live(self):
+        """Ensure the liveness endpoint answers without the database."""
+        with self.assertMaxQueries(0):
+            response = self.client.get('/users/health/live')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('success', data['status'])
+
+    def test_ready(self):
+        """Ensure the readiness endpoint probes the database once per
+        HEALTH_CHECK_INTERVAL."""
+        with mock.patch('project.health.probe', wraps=probe) as probed, \
+                self.assertMaxQueries(0):
+            response = self.client.get('/users/health/ready')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertTrue(data['data']['database']['ok'])
+            for _ in range(5):
+                response = self.client.get('/users/health/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(probed.call_count, 1)
+
+    def test_ready_pool_exhausted(self):
+        """Ensure the readiness probe does not use the app's pool, and
+        answers 503 rather than 500 when it times out on one."""
+        with mock.patch.object(db.engine, 'connect',
+                               side_effect=AssertionError('pooled')):
+            response = self.client.get('/users/health/ready')
+        self.assertEqual(response.status_code, 200)
+        engine = mock.Mock()
+        engine.connect.side_effect = exc.TimeoutError('QueuePool limit')
+        self.assertEqual(probe(engine), (False, 'QueuePool limit'))
+
+    def test_ready_database_down(self):
+        """Ensure the readiness endpoint answers 503 when the database is
+        unreachable."""
+        with mock.patch('project.health.probe',
+                        return_value=(False, 'connection refused')):
+            response = self.client.get('/users/health/ready')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Database unavailable.', data['message'])
+        self.assertFalse(data['data']['database']['ok'])
+
+
+class TestDatabaseProbe(unittest.TestCase):
+    """Tests for the cached probe and waiting for the database."""
+
+    def test_failures_cached(self):
+        """Ensure a failed probe is reused for the interval too."""
+        probe = DatabaseProbe()
+        probe.interval = 60
+        engine = create_engine(UNREACHABLE)
+        first = probe.check(engine)
+        self.assertFalse(first['ok'])
+        self.assertIn('port 1', first['error'])
+        engine.dispose()
+        self.assertEqual(probe.check(None)['error'], first['error'])
+
+    def test_probe_does_not_block(self):
+        """Ensure callers get the last result while another probe runs."""
+        probe = DatabaseProbe()
+        probe.fail('connection refused')
+        started, release = threading.Event(), threading.Event()
+
+        def slow(engine):
+            started.set()
+            release.wait(5)
+            return True, None
+        with mock.patch('project.health.probe', slow):
+            thread = threading.Thread(target=probe.check, args=(None,))
+            thread.start()
+            self.assertTrue(started.wait(5))
+            self.assertEqual(probe.check(None)['error'], 'connection refused')
+            release.set()
+            thread.join()
+        probe.interval = 60
+        self.assertTrue(probe.check(None)['ok'])
+
+    def test_wait_for_db_times_out(self):
+        """Ensure waiting backs off exponentially and gives up."""
+        delays = []
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            wait_for_db(UNREACHABLE, timeout=0.5, delay=0.05,
+                        log=delays.append)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertIn('retrying in 0.1 s', delays[1])
+        self.assertIn('retrying in 0.2 s', delays[2])
+
+
+    def test_wait_for_db_connect_timeout(self):
+        """Ensure each attempt gives up connecting within the time left."""
+        timeouts = []
+
+        def engine(url, timeout):
+            timeouts.append(timeout)
+            return create_engine(url)
+        with mock.patch('project.health.probe_engine', engine):
+            with self.assertRaises(TimeoutError):
+                wait_for_db(UNREACHABLE, timeout=1.5, delay=1,
+                            connect_timeout=5)
+        self.assertEqual(timeouts[0], 2)
+        self.assertEqual(timeouts[-1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+# services/users/project/tests/test_importing.py
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from project import db
+from project.api.models import User, users_version
+from project.importing import (
+    CheckpointMismatch, import_file, read_records, save_checkpoint,
+    validate)
+from project.tests.base import BaseTestCase
+
+
+FIELDS = ('username', 'email')
+CSV = ('\ufeffusername,email,team\n'
+       'alice,alice@example.com,red\n'
+       '"bob\nsmith",bob@example.com,blue\n'
+       ',nobody@example.com,red\n'
+       'alice2,alice@example.com,red\n'
+       'carol,carol@example.com,blue\n')
+
+
+def add_user(username, email):
+    user = User(username=username, email=email)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TempDirMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            f.write(data)
+        return path
+
+
+class TestReadRecords(TempDirMixin, unittest.TestCase):
+    """Tests for reading and validating import files."""
+
+    def test_csv(self):
+        """Ensure CSV records come with the line they end on, byte order
+        mark stripped."""
+        records = list(read_records(self.write('users.csv', CSV), 'csv'))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], (2, {
+            'username': 'alice', 'email': 'alice@example.com',
+            'team': 'red'}, None))
+        self.assertEqual(records[1][0], 4)
+        self.assertEqual(records[1][1]['username'], 'bob\nsmith')
+
+    def test_ndjson(self):
+        """Ensure blank lines are skipped and bad JSON reported."""
+        path = self.write('users.ndjson', '{"username": "a"}\n\n{oops\n')
+        records = list(read_records(path, 'ndjson'))
+        self.assertEqual(records[0], (1, {'username': 'a'}, None))
+        self.assertEqual(records[1][:2], (3, None))
+        self.assertIn('invalid JSON', records[1][2])
+
+    def test_validate(self):
+        """Ensure records missing a field, or with values the column cannot
+        hold, are rejected."""
+        columns = [User.__table__.c[field] for field in FIELDS]
+        self.assertIsNone(validate(
+            {'username': 'a', 'email': 'a@example.com'}, columns))
+        self.assertIn('email is missing', validate(
+            {'username': 'a'}, columns))
+        self.assertIn('username is missing', validate(
+            {'username': 7, 'email': 'a@example.com'}, columns))
+        self.assertIn('longer than 128', validate(
+            {'username': 'a' * 129, 'email': 'a@example.com'}, columns))
+        self.assertIn('NUL', validate(
+            {'username': 'a\x00', 'email': 'a@example.com'}, columns))
+        self.assertEqual(validate([1], columns), 'not an object')
+
+
+class TestImport(TempDirMixin, BaseTestCase):
+    """Tests for merging import files into the users table."""
+
+    def import_csv(self, **kwargs):
+        rejected = []
+        counts = import_file(
+            self.write('users.csv', CSV), 'csv', User, FIELDS, 'email',
+            users_version, 2, reject=rejected.append, **kwargs)
+        return counts, rejected
+
+    def test_import(self):
+        """Ensure valid records are added and repeated emails skipped."""
+        add_user('carol', 'carol@example.com')
+        counts, rejected = self.import_csv()
+        self.assertEqual(
+            {key: counts[key] for key in
+             ('records', 'added', 'updated', 'skipped', 'invalid')},
+            {'records': 5, 'added': 2, 'updated': 0, 'skipped': 2,
+             'invalid': 1})
+        self.assertEqual(rejected, ['line 5: username is missing or not '
+                                    'a string'])
+        self.assertEqual(User.query.count(), 3)
+        self.assertEqual(User.query.filter_by(
+            email='alice@example.com').one().username, 'alice')
+        self.assertTrue(User.query.filter_by(
+            email='bob@example.com').one().active)
+
+    def test_import_update(self):
+        """Ensure --update overwrites changed rows, the last record for an
+        email winning."""
+        add_user('carol', 'carol@example.com')
+        add_user('old bob', 'bob@example.com')
+        counts, _ = self.import_csv(update=True)
+        self.assertEqual((counts['added'], counts['updated'],
+                          counts['skipped']), (1, 2, 1))
+        self.assertEqual(User.query.filter_by(
+            email='alice@example.com').one().username, 'alice2')
+        self.assertEqual(User.query.filter_by(
+            email='bob@example.com').one().username, 'bob\nsmith')
+
+    def test_import_update_detail(self):
+        """Ensure a user changed by an import is served fresh, though the
+        import cannot clear the workers' caches."""
+        user = add_user('old bob', 'bob@example.com')
+        response = self.client.get(f'/users/{user.id}')
+        etag = response.headers['ETag']
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['username'], 'old bob')
+        self.import_csv(update=True)
+        response = self.client.get(f'/users/{user.id}',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['username'], 'bob\nsmith')
+
+    def test_resume(self):
+        """Ensure an import resumes after the records its checkpoint
+        covers, and removes the checkpoint when done."""
+        path = self.write('users.csv', CSV)
+        checkpoint = f'{path}.checkpoint'
+        stat = os.stat(path)
+        save_checkpoint(checkpoint, {
+            'source': {'path': os.path.abspath(path),
+                       'size': stat.st_size, 'mtime': stat.st_mtime},
+            'records': 4, 'added': 2, 'updated': 0, 'skipped': 1,
+            'invalid': 1})
+        counts = import_file(path, 'csv', User, FIELDS, 'email',
+                             users_version, 2, checkpoint=checkpoint)
+        self.assertEqual((counts['records'], counts['added']), (5, 3))
+        self.assertEqual([user.username for user in User.query.all()],
+                         ['carol'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_checkpoint_mismatch(self):
+        """Ensure a checkpoint written for another file is refused."""
+        path = self.write('users.csv', CSV)
+        with open(f'{path}.checkpoint', 'w') as f:
+            json.dump({'source': {'path': 'other.csv'}, 'records': 4}, f)
+        with self.assertRaises(CheckpointMismatch):
+            import_file(path, 'csv', User, FIELDS, 'email', users_version,
+                        2, checkpoint=f'{path}.checkpoint')
+        self.assertEqual(User.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# services/users/project/tests/test_metrics.py
+
+
+import re
+import unittest
+
+from flask import Response, g
+from sqlalchemy import exc
+
+from project import db, metrics
+from project.api.models import User
+from project.metrics import Histogram
+from project.tests.base import BaseTestCase
+
+
+def add_user(username, email):
+    user = User(username=username, email=email)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def server_timing(response):
+    """The Server-Timing metrics of `response` as {name: (ms, desc)}."""
+    timings = {}
+    for metric in response.headers['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        timings[name] = (float(params['dur']),
+                         params.get('desc', '').strip('"'))
+    return timings
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for the Prometheus histogram."""
+
+    def test_expose(self):
+        """Ensure buckets are cumulative and le is inclusive."""
+        histogram = Histogram('latency', 'Latency.', ('path',), (1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(('/a',), value)
+        lines = histogram.expose().splitlines()
+        self.assertEqual(lines, [
+            '# HELP latency Latency.',
+            '# TYPE latency histogram',
+            'latency_bucket{path="/a",le="1"} 2',
+            'latency_bucket{path="/a",le="5"} 3',
+            'latency_bucket{path="/a",le="+Inf"} 4',
+            'latency_sum{path="/a"} 14.5',
+            'latency_count{path="/a"} 4'
+        ])
+
+
+class TestMetrics(BaseTestCase):
+    """Tests for request timing and the /metrics endpoint."""
+
+    def test_server_timing_counts_queries(self):
+        """Ensure responses report their SQL statements and time."""
+        user = add_user('michael', 'michael@mherman.org')
+        response = self.client.get(f'/users/{user.id}')
+        self.assertEqual(response.status_code, 200)
+        timings = server_timing(response)
+        self.assertEqual(set(timings), {'db', 'serialize', 'total'})
+        queries = int(timings['db'][1].split()[0])
+        self.assertGreaterEqual(queries, 1)
+        self.assertGreaterEqual(timings['total'][0], timings['db'][0])
+
+    def test_server_timing_without_queries(self):
+        """Ensure requests that touch no tables report zero queries."""
+        response = self.client.get('/users/ping')
+        self.assertEqual(server_timing(response)['db'], (0.0, '0 queries'))
+
+    def test_metrics_endpoint(self):
+        """Ensure /metrics reports per-endpoint histograms."""
+        self.client.get('/users/ping')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.data.decode()
+        for name in ('http_request_duration_seconds',
+                     'http_request_db_duration_seconds',
+                     'http_request_db_statements',
+                     'http_request_serialize_duration_seconds'):
+            self.assertIn(f'# TYPE {name} histogram', body)
+        self.assertRegex(body, re.compile(
+            r'^http_request_duration_seconds_count'
+            r'\{endpoint="/users/ping",method="GET",status="200"\} [1-9]',
+            re.MULTILINE))
+
+    def test_statements_outside_requests_ignored(self):
+        """Ensure queries run outside a request are not counted."""
+        add_user('michael', 'michael@mherman.org')
+        response = self.client.get('/users/ping')
+        self.assertEqual(server_timing(response)['db'][1], '0 queries')
+
+
+class TestQueryLog(BaseTestCase):
+    """Tests for the slow and repeated query logs and the query budget."""
+
+    def run_statements(self, count):
+        with self.app.test_request_context('/users/ping'):
+            metrics.before_request()
+            for _ in range(count):
+                db.session.execute('SELECT 1')
+            metrics.after_request(Response())
+
+    def test_slow_query_logged(self):
+        """Ensure statements over SLOW_QUERY_THRESHOLD are logged with
+        their endpoint and parameters."""
+        self.app.config['SLOW_QUERY_THRESHOLD'] = 0
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            self.client.get('/users/987')
+        self.assertIn('slow query', logs.output[0])
+        self.assertIn('GET /users/<user_id>', logs.output[0])
+        self.assertTrue(any("'id_1': 987" in line for line in logs.output))
+
+    def test_repeated_statement_logged_with_stack(self):
+        """Ensure a statement repeated REPEATED_QUERY_THRESHOLD times in one
+        request is logged once, with the project frames that ran it."""
+        self.app.config['REPEATED_QUERY_THRESHOLD'] = 3
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            self.run_statements(5)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('statement repeated 3 times in GET /users/ping',
+                      logs.output[0])
+        self.assertIn('test_metrics.py', logs.output[0])
+
+    def test_repeated_statement_unsampled(self):
+        """Ensure requests left out of REPEATED_QUERY_SAMPLE_RATE are not
+        checked for repeats."""
+        self.app.config['REPEATED_QUERY_THRESHOLD'] = 3
+        self.app.config['REPEATED_QUERY_SAMPLE_RATE'] = 0
+        with self.assertRaises(AssertionError):
+            with self.assertLogs(self.app.logger, 'WARNING'):
+                self.run_statements(5)
+
+    def test_failed_statement(self):
+        """Ensure a statement that fails leaves nothing behind on its
+        connection and is not counted."""
+        with self.app.test_request_context('/users/ping'):
+            metrics.before_request()
+            db.session.connection()
+            queries = g.timing['queries']
+            with self.assertRaises(exc.ProgrammingError):
+                db.session.execute('SELECT * FROM nowhere')
+            self.assertEqual(g.timing['queries'], queries)
+            db.session.rollback()
+            self.assertNotIn('query_start', db.session.connection().info)
+            metrics.after_request(Response())
+
+    def test_query_budget_exceeded(self):
+        """Ensure assertMaxQueries fails listing the statements."""
+        with self.assertRaisesRegex(AssertionError, 'SELECT 1'):
+            with self.assertMaxQueries(1):
+                db.session.execute('SELECT 1')
+                db.session.execute('SELECT 1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# services/users/project/tests/test_parallel.py
+
+
+import unittest
+
+from project.tests.parallel import iter_tests, shard, shard_url
+
+
+def make_case(name, count):
+    """A TestCase class with `count` empty tests, built here so that
+    discovery does not pick it up."""
+    tests = {f'test_{i}': lambda self: None for i in range(count)}
+    return type(name, (unittest.TestCase,), tests)
+
+
+class TestParallel(unittest.TestCase):
+    """Tests for splitting the suite across processes."""
+
+    def suite(self):
+        loader = unittest.TestLoader()
+        return unittest.TestSuite(
+            loader.loadTestsFromTestCase(case)
+            for case in (make_case('Small', 1), make_case('Large', 3),
+                         make_case('Medium', 2)))
+
+    def test_shard_url(self):
+        """Ensure each shard gets its own database on the same server."""
+        self.assertEqual(
+            shard_url('postgresql://postgres:pw@users-db:5432/users_test', 2),
+            'postgresql://postgres:pw@users-db:5432/users_test_2')
+
+    def test_shards_cover_suite(self):
+        """Ensure every test runs in exactly one shard, classes kept
+        together and the largest dealt out first."""
+        shards = [[test.id() for test in iter_tests(shard(self.suite(), i, 2))]
+                  for i in range(2)]
+        self.assertEqual([len(tests) for tests in shards], [3, 3])
+        self.assertTrue(all(test.split('.')[-2] == 'Large'
+                            for test in shards[0]))
+        self.assertEqual(
+            sorted(shards[0] + shards[1]),
+            sorted(test.id() for test in iter_tests(self.suite())))
+
+    def test_more_shards_than_classes(self):
+        """Ensure surplus shards are left empty."""
+        self.assertEqual(shard(self.suite(), 3, 4).countTestCases(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+# services/users/project/tests/test_replicas.py
+
+
+import json
+import unittest
+
+from sqlalchemy import create_engine, event, exc
+
+from project import db, cache
+from project.api.models import User, users_version
+from project.api.versioning import bump_version, current_version
+from project.replicas import PRIMARY_COOKIE, ReplicaSet
+from project.tests.base import BaseTestCase
+
+
+# nothing listens on port 1
+UNREACHABLE = 'postgresql://postgres@127.0.0.1:1/users'
+
+
+def add_user(username, email):
+    user = User(username=username, email=email)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestReplicaRouting(BaseTestCase):
+    """Tests for sending GET handler reads to a replica.
+
+    The replica is a second engine on the test database.  It cannot see
+    the rows the test transaction has not committed, which shows where
+    each read went.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.replica = create_engine(
+            self.app.config['SQLALCHEMY_DATABASE_URI'])
+        self.statements = []
+        event.listen(self.replica, 'before_cursor_execute', self.record)
+        self.replicas = self.app.extensions['replicas']
+        self.app.extensions['replicas'] = ReplicaSet([self.replica], 60, 2)
+
+    def tearDown(self):
+        self.app.extensions['replicas'] = self.replicas
+        self.replica.dispose()
+        super().tearDown()
+
+    def record(self, conn, cursor, statement, parameters, context,
+               executemany):
+        self.statements.append(statement)
+
+    def next_request(self):
+        # the test client reuses the test's session; a new request would
+        # start without the writes of the previous one
+        db.session.info.pop('wrote', None)
+
+    def test_get_reads_replica(self):
+        """Ensure the GET handlers read from the replica."""
+        add_user('michael', 'michael@mherman.org')
+        self.next_request()
+        response = self.client.get('/users')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['data']['users'], [])
+        self.assertTrue(self.statements)
+        self.assertNotIn(PRIMARY_COOKIE, response.headers.get(
+            'Set-Cookie', ''))
+
+    def test_version_read_on_replica(self):
+        """Ensure the ETag and cache key carry the version the replica
+        holds, read there with the rows, not the primary's newer one."""
+        add_user('michael', 'michael@mherman.org')
+        bump_version(users_version)
+        db.session.commit()
+        self.next_request()
+        response = self.client.get('/users')
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['data']['users'], [])
+        self.assertEqual(response.headers['ETag'], 'W/"users-0"')
+        self.assertTrue(any('table_versions' in statement
+                            for statement in self.statements))
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache.stats()['size'], 1)
+        self.assertEqual(current_version(users_version), 1)
+
+    def test_one_replica_per_request(self):
+        """Ensure every read in a request goes to the replica picked for
+        its first read."""
+        other = create_engine(self.app.config['SQLALCHEMY_DATABASE_URI'])
+        self.addCleanup(other.dispose)
+        event.listen(other, 'before_cursor_execute', self.record)
+        self.app.extensions['replicas'] = ReplicaSet(
+            [self.replica, other], 60, 2)
+        with self.app.test_request_context('/users'):
+            db.session.info['replica'] = True
+            User.query.count()
+            engine = db.session.info['replica_engine']
+            User.query.count()
+            self.assertIs(db.session.info['replica_engine'], engine)
+            db.session.info.pop('replica')
+            db.session.info.pop('replica_engine')
+        self.assertEqual(len(self.statements), 2)
+
+    def test_write_reads_primary(self):
+        """Ensure a POST writes to the primary and the client's next reads
+        go there too."""
+        response = self.client.post(
+            '/users',
+            data=json.dumps({'username': 'michael',
+                             'email': 'michael@mherman.org'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(self.statements)
+        self.assertIn(f'{PRIMARY_COOKIE}=1', response.headers['Set-Cookie'])
+        self.next_request()
+        response = self.client.get('/users')
+        data = json.loads(response.data.decode())
+        self.assertEqual(len(data['data']['users']), 1)
+        self.assertFalse(self.statements)
+
+    def test_read_after_write_in_request(self):
+        """Ensure reads in a request that has written go to the primary."""
+        with self.app.test_request_context('/users'):
+            db.session.info['replica'] = True
+            add_user('michael', 'michael@mherman.org')
+            self.assertEqual(User.query.count(), 1)
+            db.session.info.pop('replica')
+        self.assertFalse(self.statements)
+
+    def test_no_replicas(self):
+        """Ensure the GET handlers read from the primary when no replica is
+        configured, and tag what they read with its version."""
+        self.app.extensions['replicas'] = ReplicaSet([], 60, 2)
+        add_user('michael', 'michael@mherman.org')
+        self.next_request()
+        response = self.client.get('/users')
+        data = json.loads(response.data.decode())
+        self.assertEqual(len(data['data']['users']), 1)
+        self.assertIn('ETag', response.headers)
+
+
+class TestReplicaSet(unittest.TestCase):
+    """Tests for choosing a healthy replica."""
+
+    def setUp(self):
+        from project.tests.base import app
+        self.url = app.config['SQLALCHEMY_DATABASE_URI']
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.dispose()
+
+    def engine(self, url):
+        self.engines.append(create_engine(url))
+        return self.engines[-1]
+
+    def test_round_robin(self):
+        """Ensure healthy replicas take turns."""
+        first, second = self.engine(self.url), self.engine(self.url)
+        replicas = ReplicaSet([first, second], 60, 2)
+        self.assertEqual([replicas.choose() for _ in range(4)],
+                         [first, second, first, second])
+
+    def test_unhealthy_skipped(self):
+        """Ensure a replica that fails its probe is skipped, and none is
+        chosen when all are down."""
+        down, up = self.engine(UNREACHABLE), self.engine(self.url)
+        replicas = ReplicaSet([down, up], 60, 2)
+        self.assertEqual([replicas.choose() for _ in range(3)], [up] * 3)
+        self.assertIsNone(ReplicaSet([down], 60, 2).choose())
+
+    def test_connection_error_ejects(self):
+        """Ensure a failed connection ejects the replica without another
+        probe."""
+        down = self.engine(UNREACHABLE)
+        replicas = ReplicaSet([down], 60, 2)
+        with self.assertRaises(exc.OperationalError):
+            down.connect()
+        _, probe, _ = replicas.replicas[0]
+        self.assertIn('port 1', probe.check(None)['error'])
+        self.assertIsNone(replicas.choose())
+
+
+if __name__ == '__main__':
+    unittest.main()
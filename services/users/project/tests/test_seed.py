@@ -0,0 +1,72 @@
+# services/users/project/tests/test_seed.py
+
+
+import unittest
+
+from project import db, seed
+from project.api.bulk import (
+    PLAIN_INDEXES, copy_rows, copy_text, deferred_indexes)
+from project.api.models import User
+from project.tests.base import BaseTestCase
+
+
+class TestGenerate(unittest.TestCase):
+    """Tests for the generated sample users."""
+
+    def test_deterministic(self):
+        """Ensure a seed always generates the same users, and another seed
+        different ones."""
+        self.assertEqual(list(seed.generate(50, 7)),
+                         list(seed.generate(50, 7)))
+        self.assertNotEqual(list(seed.generate(50, 7)),
+                            list(seed.generate(50, 8)))
+
+    def test_unique_emails(self):
+        """Ensure generated emails do not repeat."""
+        emails = [row[1] for row in seed.generate(5000)]
+        self.assertEqual(len(set(emails)), 5000)
+
+    def test_copy_text_escapes(self):
+        """Ensure values holding COPY's delimiters are escaped, and the
+        rest passed through."""
+        self.assertEqual(copy_text([('a', True), ('b', None)], 2),
+                         'a\tt\nb\t\\N\n')
+        self.assertEqual(copy_text([('a\tb', 'c\nd\\')], 2),
+                         'a\\tb\tc\\nd\\\\\n')
+
+
+class TestCopy(BaseTestCase):
+    """Tests for loading rows with COPY."""
+
+    def test_copy_rows(self):
+        """Ensure rows are copied in batches and the indexes rebuilt."""
+        indexes = db.session.execute(
+            PLAIN_INDEXES, {'table': 'users'}).fetchall()
+        with deferred_indexes('users'):
+            self.assertFalse(db.session.execute(
+                PLAIN_INDEXES, {'table': 'users'}).fetchall())
+            copied = copy_rows(
+                'users', seed.COLUMNS, seed.generate(250), 100)
+        self.assertEqual(copied, 250)
+        self.assertEqual(User.query.count(), 250)
+        self.assertEqual(db.session.execute(
+            PLAIN_INDEXES, {'table': 'users'}).fetchall(), indexes)
+        username, email, active, _ = next(seed.generate(1))
+        user = User.query.filter_by(email=email).one()
+        self.assertEqual(user.username, username)
+        self.assertEqual(user.active, active)
+
+    def test_copy_rows_escaped(self):
+        """Ensure strings holding tabs, newlines and backslashes arrive
+        intact."""
+        username = 'tab\there\nnew line\\back\rslash'
+        copy_rows('users', seed.COLUMNS,
+                  [(username, 'odd@example.com', False,
+                    '2018-01-01 00:00:00')], 10)
+        user = User.query.filter_by(email='odd@example.com').one()
+        self.assertEqual(user.username, username)
+        self.assertFalse(user.active)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,13 @@
 import json
 import unittest
 
+from sqlalchemy import exc
+
 from project import db
-from project.api.models import User
+from project.api.models import TableVersion, User, users_version
+from project.api.upsert import create_unique_index
+from project.api.versioning import (bump_version, create_version,
+                                    current_version)
 from project.tests.base import BaseTestCase
 
 
@@ -96,6 +101,89 @@ class TestUserService(BaseTestCase):
                 'Sorry. That email already exists.', data['message'])
             self.assertIn('fail', data['status'])
 
+    def test_user_email_is_unique(self):
+        """Ensure the database rejects a duplicate email."""
+        add_user('michael', 'michael@mherman.org')
+        with self.assertRaises(exc.IntegrityError):
+            add_user('michael', 'michael@mherman.org')
+        db.session.rollback()
+
+    def test_create_unique_index(self):
+        """Ensure the unique index on email is added to a table that lacks
+        it, but not while duplicate emails exist."""
+        index = next(index for index in User.__table__.indexes
+                     if index.unique)
+        index.drop(db.session.connection())
+        first = add_user('michael', 'michael@mherman.org')
+        add_user('michael', 'michael@mherman.org')
+        self.assertEqual(create_unique_index(User, 'email'),
+                         ['michael@mherman.org'])
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(create_unique_index(User, 'email'), [])
+        with self.assertRaises(exc.IntegrityError):
+            add_user('michael', 'michael@mherman.org')
+        db.session.rollback()
+
+    def test_create_version(self):
+        """Ensure the version table is created when the database lacks it,
+        and left alone when it has it."""
+        TableVersion.__table__.drop(db.session.connection())
+        create_version()
+        self.assertEqual(current_version(users_version), 0)
+        bump_version(users_version)
+        create_version()
+        self.assertEqual(current_version(users_version), 1)
+        bump_version(users_version)
+        self.assertEqual(current_version(users_version), 2)
+
+    def test_add_users_bulk(self):
+        """Ensure a list of users is added with one result per item."""
+        add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.post(
+                '/users/bulk',
+                data=json.dumps([
+                    {'username': 'fletcher',
+                     'email': 'fletcher@notreal.com'},
+                    {'username': 'michael',
+                     'email': 'michael@mherman.org'},
+                    {'username': 'rick',
+                     'email': 'fletcher@notreal.com'},
+                    {'email': 'morty@notreal.com'},
+                ]),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertIn('1 of 4 users were added.', data['message'])
+            self.assertIn('success', data['status'])
+            results = data['data']['results']
+            self.assertEqual(
+                [result['status'] for result in results],
+                ['success', 'fail', 'fail', 'fail'])
+            self.assertIn(
+                'fletcher@notreal.com was added!', results[0]['message'])
+            for result in results[1:3]:
+                self.assertIn(
+                    'Sorry. That email already exists.', result['message'])
+            self.assertIn('Invalid payload.', results[3]['message'])
+        self.assertEqual(User.query.count(), 2)
+
+    def test_add_users_bulk_invalid_json(self):
+        """Ensure error is thrown if the bulk payload is not a list."""
+        with self.client:
+            for payload in [{}, [], 'blah']:
+                response = self.client.post(
+                    '/users/bulk',
+                    data=json.dumps(payload),
+                    content_type='application/json',
+                )
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid payload.', data['message'])
+                self.assertIn('fail', data['status'])
+
     def test_single_user(self):
         """Ensure get single user behaves correctly."""
         user = add_user('michael', 'michael@mherman.org')
@@ -107,6 +195,43 @@ class TestUserService(BaseTestCase):
             self.assertIn('michael@mherman.org', data['data']['email'])
             self.assertIn('success', data['status'])
 
+    def test_single_user_cached(self):
+        """Ensure get single user is served from the cache until a write."""
+        user = add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.get('/users/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get(f'/users/{user.id}')
+            self.client.get(f'/users/{user.id}')
+            response = self.client.get('/users/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data']['hits'] - before['hits'], 1)
+            self.assertEqual(data['data']['misses'] - before['misses'], 1)
+            self.assertEqual(data['data']['size'], 1)
+            self.client.post(
+                '/users',
+                data=json.dumps(
+                    {'username': 'fletcher', 'email': 'fletcher@notreal.com'}),
+                content_type='application/json',
+            )
+            response = self.client.get('/users/_cache')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['size'], 0)
+
+    def test_user_pool_stats(self):
+        """Ensure the /_pool route reports connection pool statistics."""
+        with self.client:
+            self.client.get('/users')
+            response = self.client.get('/users/_pool')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(data['data']['size'], 2)
+            self.assertGreater(data['data']['checkouts'], 0)
+            latency = data['data']['checkout_latency']
+            self.assertEqual(latency['buckets']['+Inf'], latency['count'])
+
     def test_single_user_no_id(self):
         """Ensure error is thrown if an id is not provided."""
         with self.client:
@@ -142,6 +267,183 @@ class TestUserService(BaseTestCase):
                 'fletcher@notreal.com', data['data']['users'][1]['email'])
             self.assertIn('success', data['status'])
 
+    def test_all_users_paginated(self):
+        """Ensure get all users pages through the table by id."""
+        add_user('michael', 'michael@mherman.org')
+        add_user('fletcher', 'fletcher@notreal.com')
+        add_user('rick', 'rick@notreal.com')
+        with self.client:
+            response = self.client.get('/users?limit=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['users']), 2)
+            self.assertIn('michael', data['data']['users'][0]['username'])
+            self.assertIn('fletcher', data['data']['users'][1]['username'])
+            self.assertEqual(
+                data['data']['next'], data['data']['users'][1]['id'])
+            response = self.client.get(
+                f'/users?limit=2&after={data["data"]["next"]}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['users']), 1)
+            self.assertIn('rick', data['data']['users'][0]['username'])
+            self.assertIsNone(data['data']['next'])
+
+    def test_all_users_invalid_pagination(self):
+        """Ensure error is thrown if the pagination arguments are invalid."""
+        with self.client:
+            for query in ['limit=0', 'limit=blah', 'limit=100000', 'after=x']:
+                response = self.client.get(f'/users?{query}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(
+                    'Invalid pagination parameters.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_all_users_fields(self):
+        """Ensure ?fields= returns only the requested columns."""
+        user = add_user('michael', 'michael@mherman.org')
+        add_user('fletcher', 'fletcher@notreal.com')
+        with self.client:
+            response = self.client.get('/users?fields=email,id&limit=1')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                data['data']['users'],
+                [{'id': user.id, 'email': 'michael@mherman.org'}])
+            response = self.client.get(
+                '/users?fields=username&after=' + str(data['data']['next']))
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['users'], [{'username': 'fletcher'}])
+            self.assertIsNone(data['data']['next'])
+
+    def test_single_user_fields(self):
+        """Ensure ?fields= on get single user returns only those columns."""
+        user = add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.get(f'/users/{user.id}?fields=username')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['data'], {'username': 'michael'})
+            response = self.client.get(f'/users/{user.id}')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data']['email'], 'michael@mherman.org')
+
+    def test_users_invalid_fields(self):
+        """Ensure error is thrown if ?fields= names an unknown column."""
+        user = add_user('michael', 'michael@mherman.org')
+        with self.client:
+            for path in ['/users', f'/users/{user.id}', '/users/export']:
+                for fields in ['', 'id,password', 'created_date']:
+                    response = self.client.get(f'{path}?fields={fields}')
+                    data = json.loads(response.data.decode())
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(
+                        'Invalid fields parameter.', data['message'])
+                    self.assertIn('fail', data['status'])
+
+    def test_all_users_by_ids(self):
+        """Ensure ?ids= returns those users in order and reports the missing
+        ones."""
+        first = add_user('michael', 'michael@mherman.org')
+        second = add_user('fletcher', 'fletcher@notreal.com')
+        with self.client:
+            response = self.client.get(
+                f'/users?ids={second.id},3000000000,{first.id},{second.id}'
+                '&fields=username')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('success', data['status'])
+            self.assertEqual(
+                data['data']['users'],
+                [{'username': 'fletcher'}, {'username': 'michael'}])
+            self.assertEqual(data['data']['missing'], [3000000000])
+
+    def test_all_users_invalid_ids(self):
+        """Ensure error is thrown if ?ids= is malformed, out of range or too
+        long."""
+        too_many = ','.join(str(i) for i in range(1, 1002))
+        with self.client:
+            for ids in ['', '1,blah', '1,,2', '1,99999999999999999999',
+                        too_many]:
+                response = self.client.get(f'/users?ids={ids}')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid ids parameter.', data['message'])
+                self.assertIn('fail', data['status'])
+
+    def test_export_users(self):
+        """Ensure export streams every user as one JSON object per line."""
+        add_user('michael', 'michael@mherman.org')
+        add_user('fletcher', 'fletcher@notreal.com')
+        response = self.client.get('/users/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('michael', json.loads(lines[0])['username'])
+        self.assertIn('fletcher', json.loads(lines[1])['username'])
+
+    def test_all_users_not_modified(self):
+        """Ensure get all users answers a matching ETag with 304 until the
+        table changes."""
+        add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.get('/users')
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+            response = self.client.get(
+                '/users', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            self.client.post(
+                '/users/bulk',
+                data=json.dumps([{}]),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                '/users', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+
+    def test_single_user_etag_changes_on_write(self):
+        """Ensure a write changes the ETag of get single user."""
+        user = add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.get(f'/users/{user.id}')
+            etag = response.headers['ETag']
+            self.client.post(
+                '/users',
+                data=json.dumps(
+                    {'username': 'fletcher', 'email': 'fletcher@notreal.com'}),
+                content_type='application/json',
+            )
+            response = self.client.get(
+                f'/users/{user.id}', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_query_budget(self):
+        """Ensure the JSON endpoints stay within their SQL statement budgets,
+        whatever the number of rows."""
+        ids = [add_user(f'user{i}', f'user{i}@notreal.com').id
+               for i in range(20)]
+        with self.assertMaxQueries(2):
+            self.client.get('/users')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/users?ids={ids[0]},{ids[1]},{ids[2]}')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/users/{ids[0]}')
+        with self.assertMaxQueries(1):
+            self.client.get(f'/users/{ids[0]}')
+        with self.assertMaxQueries(2):
+            self.client.post(
+                '/users',
+                data=json.dumps(
+                    {'username': 'michael', 'email': 'michael@mherman.org'}),
+                content_type='application/json',
+            )
+
     def test_main_no_users(self):
         """Ensure the main route behaves correctly when no users have been
         added to the database."""
@@ -176,6 +478,51 @@ class TestUserService(BaseTestCase):
             self.assertNotIn(b'<p>No users!</p>', response.data)
             self.assertIn(b'michael', response.data)
 
+    def test_main_paginated(self):
+        """Ensure the main route shows one page at a time with a link to
+        the next."""
+        first = add_user('michael', 'michael@mherman.org')
+        add_user('fletcher', 'fletcher@notreal.com')
+        with self.client:
+            response = self.client.get('/?limit=1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'michael', response.data)
+            self.assertNotIn(b'fletcher', response.data)
+            self.assertIn(f'after={first.id}'.encode(), response.data)
+            response = self.client.get(f'/?limit=1&after={first.id}')
+            self.assertIn(b'fletcher', response.data)
+            self.assertNotIn(b'Next page', response.data)
+            response = self.client.get('/?limit=blah')
+            self.assertEqual(response.status_code, 400)
+
+    def test_main_cached(self):
+        """Ensure the main route reuses the rendered page until a
+        write."""
+        add_user('michael', 'michael@mherman.org')
+        with self.client:
+            response = self.client.get('/users/_cache')
+            before = json.loads(response.data.decode())['data']
+            self.client.get('/')
+            response = self.client.get('/')
+            self.assertIn(b'michael', response.data)
+            response = self.client.get('/users/_cache')
+            data = json.loads(response.data.decode())['data']
+            self.assertEqual(data['hits'] - before['hits'], 1)
+            self.client.post(
+                '/',
+                data=dict(username='fletcher', email='fletcher@notreal.com'))
+            response = self.client.get('/')
+            self.assertIn(b'fletcher', response.data)
+
+    def test_main_add_user_redirects(self):
+        """Ensure the form post redirects back to the main route."""
+        with self.client:
+            response = self.client.post(
+                '/',
+                data=dict(username='michael', email='michael@mherman.org'))
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response.location.endswith('/'))
+
 
 if __name__ == '__main__':
     unittest.main()
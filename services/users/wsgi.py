@@ -0,0 +1,6 @@
+# services/users/wsgi.py
+
+
+from project import create_app
+
+app = create_app()